@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------
+# Direct submission benchmark: posts defects to the mock site with the
+# direct backend at a few concurrency levels and reports latency, defects
+# per minute and the CPU time it took, then checks that the mock recorded
+# every defect with the fields the form plan describes.
+#
+#     python benchmarks/bench_direct_submit.py --defects 500 --concurrency 1 8 32
+#
+# Needs no browser and no network.
+#
+# (C) 2019 Isaak Meier
+# Released under MIT License
+# email isaakmeier12@gmail.com
+# -----------------------------------------------------------
+
+from collections import Counter
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SOURCE = os.path.normpath(os.path.join(HERE, '..', 'src', 'main', 'python'))
+RESOURCES = os.path.normpath(os.path.join(HERE, '..', 'src', 'main', 'resources', 'base'))
+sys.path.insert(0, SOURCE)
+
+import urllib3
+from agilecraft_automation.direct_submit import DirectDefect, DirectSubmitter, build_payload
+from agilecraft_automation.form_plan import FormPlan
+from agilecraft_automation.instrumentation import percentile
+from agilecraft_automation.scheduler import JobScheduler
+from agilecraft_automation.session_cache import SessionCache
+from mock_agilecraft import SESSION_COOKIE, MockAgileCraft, submit_plan
+
+CREDS = {"user": "bench@example.com", "pass": "bench"}
+NAMES = [f"Person {number}" for number in range(1, 21)]
+CARRIERS = ["ATT", "Sprint", "TMO", "Verizon"]
+PLATFORMS = ["iOS", "Android"]
+
+
+class ListSink:
+    def __init__(self):
+        self.events = []
+        self._lock = threading.Lock()
+
+    def emit(self, event):
+        with self._lock:
+            self.events.append(event)
+
+
+def log_in(server, session_cache):
+    # Logs in over plain HTTP and keeps the cookie, like a browser login would.
+    response = urllib3.PoolManager().request("POST", server.base_url + "/login", redirect=False,
+                                             fields={"sso_id": CREDS["user"], "sso_password": CREDS["pass"]},
+                                             encode_multipart=False)
+    name, _, value = response.headers["Set-Cookie"].split(";")[0].partition("=")
+    assert name == SESSION_COOKIE
+    session_cache.remember(CREDS["user"], [{"name": name, "value": value, "domain": "127.0.0.1", "path": "/"}])
+
+
+def run_level(server, form_plan, session_cache, concurrency, defects):
+    # Posts `defects` defects with `concurrency` at a time.
+
+    # Returns:
+    #     dict -- wall time, cpu time, per defect latencies and failures
+    submitter = DirectSubmitter(server.base_url, form_plan.submit, session_cache, max_connections=concurrency)
+    sink = ListSink()
+
+    def run_job(job):
+        return DirectDefect(job.carrier, NAMES, job.platform, CREDS, submitter, form_plan, job.overrides, sink=sink).run()
+
+    scheduler = JobScheduler(run_job, lambda job: None, max_workers=concurrency)
+    entries = [(CARRIERS[number % len(CARRIERS)], PLATFORMS[number % len(PLATFORMS)], {}) for number in range(defects)]
+    started, cpu = time.perf_counter(), time.process_time()
+    jobs = scheduler.submit_batch(entries)
+    scheduler.shutdown(wait=True)
+    wall, cpu = time.perf_counter() - started, time.process_time() - cpu
+    submitter.close()
+    latencies = sorted(event["seconds"] for event in sink.events if event["type"] == "run")
+    failures = [job.result for job in jobs if job.result != "Success"]
+    return {"wall": wall, "cpu": cpu, "latencies": latencies, "failures": failures}
+
+
+def check_recorded(server, form_plan, defects):
+    # Defects land in whatever order they finish, so they're compared as a whole.
+
+    # Returns:
+    #     int -- how many of the expected defects weren't recorded exactly as the plan says
+    expected = Counter()
+    for number in range(defects):
+        carrier, platform = CARRIERS[number % len(CARRIERS)], PLATFORMS[number % len(PLATFORMS)]
+        expected[json.dumps(build_payload(form_plan.steps_for(carrier, platform), carrier, platform, NAMES, {}), sort_keys=True)] += 1
+    recorded = Counter(json.dumps(fields, sort_keys=True) for fields in server.defects[-defects:])
+    return sum((expected - recorded).values())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the direct backend against the local mock site.")
+    parser.add_argument("--defects", type=int, default=200, help="defects to post at each concurrency level")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--latency", type=int, default=50, help="ms the mock takes to store a defect")
+    args = parser.parse_args()
+
+    server = MockAgileCraft(0, xhr_latency=args.latency).start()
+    with open(os.path.join(RESOURCES, "form_plan.json")) as json_file:
+        form_plan = FormPlan(submit_plan(json.load(json_file)))
+    temp_dir = tempfile.TemporaryDirectory()
+    session_cache = SessionCache(os.path.join(temp_dir.name, "sessions.json"))
+    log_in(server, session_cache)
+
+    print(f"mock site {server.base_url}, {args.latency}ms per defect, {args.defects} defects per level")
+    print(f"{'workers':>8}{'p50 s':>8}{'p95 s':>8}{'wall s':>8}{'defects/min':>13}{'cpu ms/defect':>15}{'failed':>8}{'wrong':>7}")
+    try:
+        for concurrency in args.concurrency:
+            result = run_level(server, form_plan, session_cache, concurrency, args.defects)
+            latencies = result["latencies"] or [0.0]
+            per_minute = args.defects / result["wall"] * 60 if result["wall"] else 0.0
+            print(f"{concurrency:>8}{percentile(latencies, 0.5):>8.3f}{percentile(latencies, 0.95):>8.3f}"
+                  f"{result['wall']:>8.2f}{per_minute:>13.0f}{result['cpu'] / args.defects * 1000:>15.2f}"
+                  f"{len(result['failures']):>8}{check_recorded(server, form_plan, args.defects):>7}")
+            for failure in sorted(set(result["failures"])):
+                print(f"    {failure}")
+    finally:
+        server.stop()
+        temp_dir.cleanup()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------
+# Notify list benchmark: fills the mock site's tag-it box with rosters of
+# a few sizes, once with a send_keys per name and once in chunked script
+# calls, and reports how long each took and which names were dropped.
+#
+#     python benchmarks/bench_notify.py --names 10 50 200 --unknown 2
+#
+# Needs selenium and a chromedriver, but no network.
+#
+# (C) 2019 Isaak Meier
+# Released under MIT License
+# email isaakmeier12@gmail.com
+# -----------------------------------------------------------
+
+import argparse
+import os
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SOURCE = os.path.normpath(os.path.join(HERE, '..', 'src', 'main', 'python'))
+sys.path.insert(0, SOURCE)
+
+from selenium.webdriver.common.by import By
+from selenium.webdriver.common.keys import Keys
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+from agilecraft_automation.automation import GRID_PATH, create_driver, sign_in
+from agilecraft_automation.browser_profile import create_profile
+from agilecraft_automation.notify import add_tags, missing_names, wait_for_tags
+from agilecraft_automation.settings import DEFAULTS
+from mock_agilecraft import UNKNOWN_PERSON, MockAgileCraft
+
+CREDS = {"user": "bench@example.com", "pass": "bench"}
+NOTIFY_INPUT = (By.CSS_SELECTOR, "#txtNotifyTagIt > ul:nth-of-type(1) > li > input")
+
+
+def roster(size, unknown):
+    # Returns:
+    #     list -- size names, the last `unknown` of which the mock won't resolve
+    return [f"Person {number}" for number in range(1, size - unknown + 1)] + \
+           [f"{UNKNOWN_PERSON} {number}" for number in range(1, unknown + 1)]
+
+
+def open_form(driver, base_url):
+    driver.get(base_url + GRID_PATH)
+    WebDriverWait(driver, 5).until(EC.element_to_be_clickable((By.CLASS_NAME, "btn-secondary"))).click()
+    return WebDriverWait(driver, 5).until(EC.element_to_be_clickable(NOTIFY_INPUT))
+
+
+def fill(driver, base_url, names, bulk, chunk_size):
+    # Fills a fresh form's notify list and waits for the widget to settle.
+
+    # Returns:
+    #     tuple -- seconds to type the names, seconds until confirmed, the names that were dropped
+    notify_input = open_form(driver, base_url)
+    started = time.perf_counter()
+    if bulk:
+        add_tags(driver, notify_input, names, chunk_size)
+    else:
+        for name in names:
+            notify_input.send_keys(name + Keys.TAB)
+    typed = time.perf_counter() - started
+    tags = wait_for_tags(driver, notify_input, names, timeout=30)
+    return typed, time.perf_counter() - started, missing_names(names, tags)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark bulk notify list entry against the per-name loop.")
+    parser.add_argument("--names", type=int, nargs="+", default=[10, 50, 200], help="roster sizes to try")
+    parser.add_argument("--unknown", type=int, default=0, help="names per roster the mock can't resolve")
+    parser.add_argument("--chunk-size", type=int, default=25)
+    parser.add_argument("--chromedriver", default="chromedriver")
+    parser.add_argument("--visible", action="store_true", help="show the browser")
+    parser.add_argument("--xhr-latency", type=int, default=50, help="ms for every people lookup")
+    args = parser.parse_args()
+
+    server = MockAgileCraft(0, xhr_latency=args.xhr_latency).start()
+    driver = create_driver(args.chromedriver, create_profile(DEFAULTS, headless=not args.visible))
+    print(f"mock site {server.base_url}, lookups {args.xhr_latency}ms, chunks of {args.chunk_size}")
+    print(f"{'names':>6}{'mode':>10}{'typing s':>10}{'total s':>9}{'names/s':>9}{'dropped':>9}")
+    try:
+        driver.get(server.base_url + GRID_PATH)
+        sign_in(driver, CREDS, server.base_url)
+        for size in args.names:
+            names = roster(size, min(args.unknown, size))
+            for mode, bulk in (("per name", False), ("bulk", True)):
+                typed, total, dropped = fill(driver, server.base_url, names, bulk, args.chunk_size)
+                print(f"{size:>6}{mode:>10}{typed:>10.2f}{total:>9.2f}{size / total if total else 0.0:>9.1f}{len(dropped):>9}")
+    finally:
+        driver.quit()
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
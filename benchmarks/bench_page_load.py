@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------
+# Page load benchmark: loads the mock site's defects grid over and over,
+# once with the default browser profile and once with the lean one, and
+# reports how long until the page could be used and what it downloaded.
+#
+#     python benchmarks/bench_page_load.py --loads 20 --asset-latency 150
+#
+# Needs selenium and a chromedriver, but no network.
+#
+# (C) 2019 Isaak Meier
+# Released under MIT License
+# email isaakmeier12@gmail.com
+# -----------------------------------------------------------
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SOURCE = os.path.normpath(os.path.join(HERE, '..', 'src', 'main', 'python'))
+sys.path.insert(0, SOURCE)
+
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+from agilecraft_automation.automation import GRID_PATH, create_driver, sign_in
+from agilecraft_automation.browser_profile import create_profile
+from agilecraft_automation.settings import DEFAULTS, merge
+from mock_agilecraft import MockAgileCraft
+
+CREDS = {"user": "bench@example.com", "pass": "bench"}
+PROFILES = ["default", "lean"]
+
+
+def load(driver, server):
+    # Loads the grid once, with an empty browser cache so every load downloads the same things.
+
+    # Returns:
+    #     tuple -- seconds until driver.get returned, seconds until Create Defect was clickable,
+    #              requests made and KB downloaded
+    driver.execute_cdp_cmd("Network.clearBrowserCache", {})
+    server.reset_counters()
+    started = time.perf_counter()
+    driver.get(server.base_url + GRID_PATH)
+    returned = time.perf_counter() - started
+    WebDriverWait(driver, 10).until(EC.element_to_be_clickable((By.CLASS_NAME, "btn-secondary")))
+    ready = time.perf_counter() - started
+    # Let whatever the page still loads in the background finish, so it's counted against this load.
+    WebDriverWait(driver, 10).until(lambda driver: driver.execute_script("return document.readyState") == "complete")
+    time.sleep(0.2)
+    return returned, ready, server.requests, server.bytes_sent / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare page loads with the default and the lean browser profile.")
+    parser.add_argument("--loads", type=int, default=20, help="page loads per profile")
+    parser.add_argument("--chromedriver", default="chromedriver")
+    parser.add_argument("--visible", action="store_true", help="show the browser")
+    parser.add_argument("--page-latency", type=int, default=150, help="ms added to every page load")
+    parser.add_argument("--asset-latency", type=int, default=150, help="ms for every image, font and third party script")
+    args = parser.parse_args()
+
+    server = MockAgileCraft(0, page_latency=args.page_latency, asset_latency=args.asset_latency).start()
+    print(f"mock site {server.base_url}, page {args.page_latency}ms, assets {args.asset_latency}ms, {args.loads} loads each")
+    # Keeps the benchmark's cookies and browser registry out of the app's real profile.
+    temp_dir = tempfile.TemporaryDirectory()
+    scratch = {"session_cache": {"path": os.path.join(temp_dir.name, "sessions.json")},
+               "supervisor": {"registry": os.path.join(temp_dir.name, "browsers")}}
+    print(f"{'profile':<10}{'get() s':>9}{'usable s':>10}{'requests':>10}{'KB':>8}")
+    try:
+        for name in PROFILES:
+            settings = merge(merge(DEFAULTS, scratch), {"browser": {"profile": name}})
+            driver = create_driver(args.chromedriver, create_profile(settings, headless=not args.visible))
+            try:
+                driver.get(server.base_url + GRID_PATH)
+                sign_in(driver, CREDS, server.base_url)
+                results = [load(driver, server) for _ in range(args.loads)]
+            finally:
+                driver.quit()
+            returned, ready, requests, kilobytes = (statistics.median(column) for column in zip(*results))
+            print(f"{name:<10}{returned:>9.3f}{ready:>10.3f}{requests:>10.0f}{kilobytes:>8.0f}")
+    finally:
+        server.stop()
+        temp_dir.cleanup()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------
+# Startup benchmark: how long it takes (and how much memory it costs)
+# to get the automation loaded through the GUI modules compared with
+# the Qt-free command line.
+#
+#     python benchmarks/bench_startup.py [--runs 10]
+#
+# (C) 2019 Isaak Meier
+# Released under MIT License
+# email isaakmeier12@gmail.com
+# -----------------------------------------------------------
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+SOURCE = os.path.normpath(os.path.join(os.path.dirname(__file__), '..', 'src', 'main', 'python'))
+
+# Each case is a separate cold python process.
+CASES = [
+    ("gui adapter (Qt + selenium)", ["-c", "import script_runner"]),
+    ("automation core (selenium, no Qt)", ["-c", "import agilecraft_automation.automation"]),
+    ("cli --help (no Qt, no selenium)", ["-m", "agilecraft_automation", "--help"]),
+]
+
+
+def measure(args):
+    # Runs python with the given arguments once.
+
+    # Returns:
+    #     tuple -- (seconds, peak rss in MB), or None if the process failed
+    started = time.perf_counter()
+    process = subprocess.Popen([sys.executable] + args, cwd=SOURCE, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    _, status, usage = os.wait4(process.pid, 0)
+    elapsed = time.perf_counter() - started
+    if status != 0:
+        return None
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS.
+    rss = usage.ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+    return elapsed, rss
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare cold start of the GUI modules and the command line.")
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"{'case':<38}{'median s':>10}{'min s':>10}{'peak MB':>10}")
+    for name, case_args in CASES:
+        results = [measure(case_args) for _ in range(args.runs)]
+        if any(result is None for result in results):
+            print(f"{name:<38}{'unavailable (missing dependency?)':>30}")
+            continue
+        times = [elapsed for elapsed, _ in results]
+        rss = max(rss for _, rss in results)
+        print(f"{name:<38}{statistics.median(times):>10.3f}{min(times):>10.3f}{rss:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------
+# Offline throughput benchmark: runs the real automation, headless,
+# against the mock AgileCraft site at a few concurrency levels and
+# reports per-defect latency and defects per minute.
+#
+#     python benchmarks/bench_throughput.py --defects 12 --concurrency 1 2 4
+#
+# Needs selenium and a chromedriver, but no network.
+#
+# (C) 2019 Isaak Meier
+# Released under MIT License
+# email isaakmeier12@gmail.com
+# -----------------------------------------------------------
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SOURCE = os.path.normpath(os.path.join(HERE, '..', 'src', 'main', 'python'))
+RESOURCES = os.path.normpath(os.path.join(HERE, '..', 'src', 'main', 'resources', 'base'))
+sys.path.insert(0, SOURCE)
+
+from agilecraft_automation.async_engine import AsyncScheduler
+from agilecraft_automation.automation import DefectAutomation, create_pool
+from agilecraft_automation.form_plan import load_form_plan
+from agilecraft_automation.instrumentation import percentile
+from agilecraft_automation.scheduler import JobScheduler
+from agilecraft_automation.settings import load_settings, merge
+from mock_agilecraft import MockAgileCraft
+
+CARRIERS = ["ATT", "Sprint", "TMO", "Verizon"]
+PLATFORMS = ["iOS", "Android"]
+CREDS = {"user": "bench@example.com", "pass": "bench"}
+NAMES = [f"Person {number}" for number in range(1, 8)]
+
+
+class ListSink:
+    # Keeps events in memory so the benchmark can read the run totals back.
+    def __init__(self):
+        self.events = []
+
+    def emit(self, event):
+        self.events.append(event)
+
+
+class MemorySampler:
+    # Samples the total memory of every process this benchmark started (chromedriver,
+    # Chrome and its helpers) on a background thread and keeps the peak. Needs psutil.
+    def __init__(self, interval=0.5):
+        try:
+            import psutil
+        except ImportError:
+            psutil = None
+        self.psutil = psutil
+        self.interval = interval
+        self.peak = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+
+    def __enter__(self):
+        if self.psutil is not None:
+            self.peak = 0.0
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+    def _sample(self):
+        me = self.psutil.Process()
+        while not self._stop.wait(self.interval):
+            total = 0
+            for child in me.children(recursive=True):
+                try:
+                    total += child.memory_info().rss
+                except self.psutil.Error:
+                    pass
+            self.peak = max(self.peak, total / 2 ** 20)
+
+
+def run_level(settings, form_plan, chrome_driver_path, concurrency, defects, headless):
+    # Fills `defects` defects with `concurrency` browsers working at once.
+
+    # Returns:
+    #     dict -- warm up time, wall time, per defect latencies and failures
+    if settings["scheduler"]["mode"] == "async":
+        return run_async_level(settings, form_plan, chrome_driver_path, concurrency, defects, headless)
+    pool = create_pool(settings, chrome_driver_path, headless=headless, size=concurrency, max_browsers=concurrency)
+    sink = ListSink()
+    started = time.perf_counter()
+    pool.warm(CREDS)
+    warm_up = time.perf_counter() - started
+
+    def run_job(job):
+        automation = DefectAutomation(job.carrier, NAMES, job.platform, CREDS, pool, settings, form_plan,
+                                      keep_for_user=False, sink=sink)
+        return automation.run()
+
+    scheduler = JobScheduler(run_job, lambda job: None, max_workers=concurrency)
+    entries = [(CARRIERS[number % len(CARRIERS)], PLATFORMS[number % len(PLATFORMS)], {}) for number in range(defects)]
+    started = time.perf_counter()
+    jobs = scheduler.submit_batch(entries)
+    scheduler.shutdown(wait=True)
+    wall = time.perf_counter() - started
+    pool.close()
+
+    return summarize_level(sink, jobs, warm_up, wall)
+
+
+def run_async_level(settings, form_plan, chrome_driver_path, concurrency, defects, headless):
+    # run_level for the asyncio engine. It has nothing to warm up ahead of time,
+    # so logging the browsers in is part of the first defects' latency.
+    sink = ListSink()
+    config = {"settings": settings, "form_plan": form_plan, "chrome_driver_path": chrome_driver_path,
+              "headless": headless, "keep_for_user": False}
+    scheduler = AsyncScheduler(config, lambda job: (NAMES, CREDS), lambda job: None, sink=sink, max_workers=concurrency)
+    entries = [(CARRIERS[number % len(CARRIERS)], PLATFORMS[number % len(PLATFORMS)], {}) for number in range(defects)]
+    started = time.perf_counter()
+    jobs = scheduler.submit_batch(entries)
+    scheduler.shutdown(wait=True)
+    return summarize_level(sink, jobs, 0.0, time.perf_counter() - started)
+
+
+def summarize_level(sink, jobs, warm_up, wall):
+    latencies = sorted(event["seconds"] for event in sink.events if event["type"] == "run")
+    failures = [job.result for job in jobs if job.result != "Success"]
+    return {"warm_up": warm_up, "wall": wall, "latencies": latencies, "failures": failures}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the automation against the local mock site.")
+    parser.add_argument("--defects", type=int, default=8, help="defects to fill at each concurrency level")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--chromedriver", default="chromedriver")
+    parser.add_argument("--visible", action="store_true", help="show the browsers")
+    parser.add_argument("--page-latency", type=int, default=150, help="ms added to every page load")
+    parser.add_argument("--xhr-latency", type=int, default=300, help="ms added to every background request")
+    parser.add_argument("--overlay-ms", type=int, default=400, help="ms the overlay stays up after a request")
+    parser.add_argument("--asset-latency", type=int, default=100, help="ms for every image, font and third party script")
+    parser.add_argument("--settings", action="append", default=[], metavar="KEY=JSON",
+                        help='override a setting, e.g. fast_fill={"enabled": false}')
+    args = parser.parse_args()
+
+    server = MockAgileCraft(0, args.page_latency, args.xhr_latency, args.overlay_ms, args.asset_latency).start()
+    settings = load_settings(os.path.join(RESOURCES, "settings.json"))
+    # Cookies for the mock site and the browser registry go to a throwaway folder,
+    # so nothing of the benchmark ends up in the app's real profile.
+    temp_dir = tempfile.TemporaryDirectory()
+    settings = merge(settings, {"site": {"base_url": server.base_url}, "instrumentation": {"enabled": False},
+                                "session_cache": {"path": os.path.join(temp_dir.name, "sessions.json")},
+                                "supervisor": {"registry": os.path.join(temp_dir.name, "browsers")}})
+    for override in args.settings:
+        key, _, value = override.partition("=")
+        settings = merge(settings, {key: json.loads(value)})
+    form_plan = load_form_plan(os.path.join(RESOURCES, "form_plan.json"))
+
+    print(f"mock site {server.base_url}, page {args.page_latency}ms, xhr {args.xhr_latency}ms, overlay {args.overlay_ms}ms, "
+          f"assets {args.asset_latency}ms, {settings['browser']['profile']} browser profile")
+    print(f"{'browsers':>8}{'warm up s':>11}{'p50 s':>8}{'p95 s':>8}{'wall s':>8}{'defects/min':>13}{'failed':>8}{'peak MB':>9}")
+    try:
+        for concurrency in args.concurrency:
+            with MemorySampler() as memory:
+                result = run_level(settings, form_plan, args.chromedriver, concurrency, args.defects, not args.visible)
+            latencies = result["latencies"] or [0.0]
+            rate = args.defects / result["wall"] * 60 if result["wall"] else 0.0
+            peak = f"{memory.peak:>9.0f}" if memory.peak is not None else f"{'-':>9}"
+            print(f"{concurrency:>8}{result['warm_up']:>11.2f}{percentile(latencies, 0.5):>8.2f}{percentile(latencies, 0.95):>8.2f}"
+                  f"{result['wall']:>8.2f}{rate:>13.1f}{len(result['failures']):>8}{peak}")
+            for failure in sorted(set(result["failures"])):
+                print(f"         failure: {failure.splitlines()[0] if failure else failure}")
+    finally:
+        server.stop()
+        temp_dir.cleanup()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------
+# A local stand-in for xci.agilecraft.com: the SSO login page, the defects
+# grid and the AddDefectForm, with made up latency so the automation can be
+# measured without a network.
+#
+#     python benchmarks/mock_agilecraft.py --port 8000 --page-latency 200
+#
+# (C) 2019 Isaak Meier
+# Released under MIT License
+# email isaakmeier12@gmail.com
+# -----------------------------------------------------------
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+import argparse
+import copy
+import json
+import os
+import threading
+import time
+
+SITE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'mock_site')
+SESSION_COOKIE = "mock_session"
+# People lookups for names starting with this fail, like a name that isn't in the directory.
+UNKNOWN_PERSON = "Unknown"
+# Images and fonts the pages pull in, in KB. Their content is filler, only the size matters.
+ASSETS = {
+    ".png": ("image/png", 40),
+    ".jpg": ("image/jpeg", 150),
+    ".woff2": ("font/woff2", 60),
+}
+# Where the mock's Add Defect form posts to, and the fields it insists on.
+DEFECTS_PATH = "/api/defects"
+REQUIRED_FIELDS = ("Title", "Priority", "Product", "Release", "Platform", "Description", "Notify")
+# What each step of the shipped form plan sets in that post, on the mock.
+# Product and platform depend on the carrier and platform like their options do.
+MOCK_FIELDS = {
+    "title": {"field": "Title"},
+    "priority": {"field": "Priority", "value": "Blocker"},
+    "severity": {"field": "Severity", "value": "2"},
+    "status": {"field": "Status", "value": "Open"},
+    "state": {"field": "State", "value": "New"},
+    "category": {"field": "Category", "value": "Functional"},
+    "frequency": {"field": "Frequency", "value": "Low"},
+    "product": {"field": "Product"},
+    "release": {"field": "Release", "value": "Release 9"},
+    "team": {"field": "Team", "value": "Team B"},
+    "description": {"field": "Description"},
+    "release_vehicle": {"field": "ReleaseVehicle", "value": "Vehicle 3"},
+    "platform": {"field": "Platform"},
+    "phase": {"field": "Phase", "value": "Journey Validation"},
+    "solution": {"field": "Solution", "value": "Standard"},
+    "notify": {"field": "Notify"},
+}
+MOCK_PRODUCTS = {"ATT": "Product 3", "Sprint": "Product 6", "TMO": "Product 8", "Verizon": "Product 9"}
+
+
+def submit_plan(spec):
+    # The shipped form plan with a "submit" section and fields for the mock,
+    # so the direct backend can be pointed at it.
+
+    # Returns:
+    #     dict -- a new spec, ready for FormPlan
+    spec = copy.deepcopy(spec)
+    spec["submit"] = {"path": DEFECTS_PATH, "encoding": "json"}
+    for step in spec["steps"]:
+        step.update(MOCK_FIELDS.get(step["name"], {}))
+        if step["name"] == "product":
+            for carrier, product in MOCK_PRODUCTS.items():
+                step["variants"]["carrier"].setdefault(carrier, {})["value"] = product
+        elif step["name"] == "platform":
+            for platform in step["variants"]["platform"]:
+                step["variants"]["platform"][platform]["value"] = platform
+    return spec
+
+
+# Stands in for a tracker on another host. The host is part of the path, so the lean
+# browser profile's url patterns match it just like they would the real thing.
+THIRD_PARTY_PATH = "/third-party/"
+
+
+class MockAgileCraft(ThreadingHTTPServer):
+    # The server. Latencies are in milliseconds and can be changed between runs.
+
+    # Attributes:
+    #     page_latency (int): added to every page load
+    #     xhr_latency (int): added to every background request (release lists, people lookups)
+    #     overlay_ms (int): how long the loading overlay stays up after a background request finishes
+    #     asset_latency (int): added to every image, font and third party script
+    #     logins (int): how many times someone went through the login form
+    #     requests (int): requests served since the last reset_counters()
+    #     bytes_sent (int): response bytes sent since the last reset_counters()
+    #     defects (list): every defect posted to DEFECTS_PATH, as the field dict it came with
+    daemon_threads = True
+
+    def __init__(self, port=0, page_latency=0, xhr_latency=0, overlay_ms=0, asset_latency=0):
+        ThreadingHTTPServer.__init__(self, ("127.0.0.1", port), MockHandler)
+        self.page_latency = page_latency
+        self.xhr_latency = xhr_latency
+        self.overlay_ms = overlay_ms
+        self.asset_latency = asset_latency
+        self.logins = 0
+        self.requests = 0
+        self.bytes_sent = 0
+        self.defects = []
+        self._counter_lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def start(self):
+        # Serves on a background thread.
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def reset_counters(self):
+        with self._counter_lock:
+            self.requests = 0
+            self.bytes_sent = 0
+
+    def record_defect(self, fields):
+        # Returns:
+        #     int -- the new defect's id
+        with self._counter_lock:
+            self.defects.append(fields)
+            return len(self.defects)
+
+    def count(self, size):
+        with self._counter_lock:
+            self.requests += 1
+            self.bytes_sent += size
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    STATIC = {
+        "/mock.js": "application/javascript",
+        "/mock.css": "text/css",
+    }
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        if url.path == "/login":
+            self.page("login.html")
+        elif url.path == "/DefectsGrid":
+            if self.logged_in():
+                self.page("grid.html")
+            else:
+                self.redirect("/login?ReturnUrl=%2fDefectsGrid%3fBugID%3d&BugID=")
+        elif url.path.startswith("/assets/") and os.path.splitext(url.path)[1] in ASSETS:
+            content_type, size = ASSETS[os.path.splitext(url.path)[1]]
+            self.asset()
+            self.send_body(b"\0" * size * 1024, content_type)
+        elif url.path.startswith(THIRD_PARTY_PATH):
+            self.asset()
+            self.send_body("window.mockTracker = true;" + " " * 40 * 1024, "application/javascript")
+        elif url.path in self.STATIC:
+            self.send_file(url.path.lstrip("/"), self.STATIC[url.path])
+        elif url.path == "/config.js":
+            self.send_body(f"window.MOCK_CONFIG = {json.dumps({'overlayMs': self.server.overlay_ms})};", "application/javascript")
+        elif url.path == "/api/releases":
+            self.background()
+            product = query.get("product", [""])[0]
+            self.send_body(json.dumps([f"{product} Release {number}" for number in range(1, 13)]), "application/json")
+        elif url.path == "/api/teams":
+            self.background()
+            self.send_body("[]", "application/json")
+        elif url.path == "/api/people":
+            self.background()
+            if query.get("q", [""])[0].startswith(UNKNOWN_PERSON):
+                self.send_error(404)
+            else:
+                self.send_body("[]", "application/json")
+        else:
+            self.send_error(404)
+
+    def do_POST(self):
+        if urlparse(self.path).path == DEFECTS_PATH:
+            self.post_defect()
+            return
+        if urlparse(self.path).path != "/login":
+            self.send_error(404)
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        form = parse_qs(self.rfile.read(length).decode())
+        if not form.get("sso_id") or not form.get("sso_password"):
+            self.redirect("/login")
+            return
+        self.server.logins += 1
+        self.send_response(302)
+        self.send_header("Set-Cookie", f"{SESSION_COOKIE}={time.time_ns()}; Path=/")
+        self.send_header("Location", form.get("ReturnUrl", ["/DefectsGrid?BugID="])[0])
+        self.end_headers()
+
+    def post_defect(self):
+        # Records a posted defect. Like the real site, it sends anyone without a session to the login page.
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0))).decode()
+        if not self.logged_in():
+            self.redirect("/login")
+            return
+        self.background()
+        if self.headers.get("Content-Type", "").startswith("application/json"):
+            fields = json.loads(body)
+        else:
+            fields = {key: values if len(values) > 1 else values[0] for key, values in parse_qs(body).items()}
+        missing = [field for field in REQUIRED_FIELDS if not fields.get(field)]
+        if missing:
+            self.send_body(json.dumps({"missing": missing}), "application/json", status=400)
+            return
+        defect_id = self.server.record_defect(fields)
+        self.send_body(json.dumps({"id": defect_id}), "application/json", status=201)
+
+    def logged_in(self):
+        return f"{SESSION_COOKIE}=" in self.headers.get("Cookie", "")
+
+    def page(self, name):
+        time.sleep(self.server.page_latency / 1000)
+        self.send_file(name, "text/html")
+
+    def background(self):
+        time.sleep(self.server.xhr_latency / 1000)
+
+    def asset(self):
+        time.sleep(self.server.asset_latency / 1000)
+
+    def redirect(self, location):
+        self.send_response(302)
+        self.send_header("Location", location)
+        self.end_headers()
+
+    def send_file(self, name, content_type):
+        with open(os.path.join(SITE, name), "rb") as static_file:
+            self.send_body(static_file.read(), content_type)
+
+    def send_body(self, body, content_type, status=200):
+        if isinstance(body, str):
+            body = body.encode()
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        self.server.count(len(body))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the mock AgileCraft site.")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--page-latency", type=int, default=0, help="ms added to every page load")
+    parser.add_argument("--xhr-latency", type=int, default=0, help="ms added to every background request")
+    parser.add_argument("--overlay-ms", type=int, default=0, help="ms the loading overlay stays up after a request")
+    args = parser.parse_args()
+    server = MockAgileCraft(args.port, args.page_latency, args.xhr_latency, args.overlay_ms)
+    print(f"Mock AgileCraft on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
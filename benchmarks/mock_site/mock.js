@@ -0,0 +1,136 @@
+// Just enough behaviour to stand in for the real AddDefectForm:
+// bootstrap style menus, chosen.js style dropdowns, a loading overlay while
+// Product and Release load their dependent lists, and a tag-it notify box.
+(function () {
+    var config = window.MOCK_CONFIG || {overlayMs: 0};
+
+    function request(url, done) {
+        var xhr = new XMLHttpRequest();
+        xhr.open('GET', url);
+        xhr.onload = function () { done(xhr.status, xhr.responseText); };
+        xhr.send();
+    }
+
+    function busy(url, done) {
+        var overlay = document.querySelector('.blockUI.blockOverlay');
+        overlay.classList.add('shown');
+        request(url, function (status, body) {
+            done(status, body);
+            setTimeout(function () { overlay.classList.remove('shown'); }, config.overlayMs);
+        });
+    }
+
+    function setupMenus() {
+        Array.prototype.forEach.call(document.querySelectorAll('.menu-toggle'), function (toggle) {
+            toggle.addEventListener('click', function (event) {
+                var entry = event.target.closest('li');
+                if (entry && toggle.contains(entry)) {
+                    toggle.setAttribute('data-value', entry.textContent.trim());
+                    toggle.classList.remove('open');
+                } else {
+                    toggle.classList.toggle('open');
+                }
+                event.stopPropagation();
+            });
+        });
+    }
+
+    function chosen(select) {
+        var container = document.createElement('div');
+        container.id = select.id + '_chosen';
+        container.className = 'chosen-container';
+        container.innerHTML = (select.multiple
+            ? '<ul class="chosen-choices"><li class="search-field"></li></ul>'
+            : '<a class="chosen-single"><span></span></a>') +
+            '<div class="chosen-drop"><ul class="chosen-results"></ul></div>';
+        select.parentNode.insertBefore(container, select.nextSibling);
+
+        function render() {
+            var results = container.querySelector('.chosen-results');
+            results.innerHTML = '';
+            Array.prototype.forEach.call(select.options, function (option, index) {
+                var entry = document.createElement('li');
+                entry.className = 'active-result';
+                entry.setAttribute('data-option-array-index', index);
+                entry.textContent = option.text;
+                results.appendChild(entry);
+            });
+            var chosenText = Array.prototype.filter.call(select.options, function (option) { return option.selected; })
+                .map(function (option) { return option.text; }).join(', ');
+            if (select.multiple) {
+                container.querySelector('.search-field').textContent = chosenText;
+            } else {
+                container.querySelector('.chosen-single span').textContent = chosenText;
+            }
+        }
+
+        container.firstChild.addEventListener('click', function () {
+            Array.prototype.forEach.call(document.querySelectorAll('.chosen-with-drop'), function (open) {
+                if (open !== container) { open.classList.remove('chosen-with-drop'); }
+            });
+            container.classList.toggle('chosen-with-drop');
+        });
+        container.querySelector('.chosen-results').addEventListener('click', function (event) {
+            var entry = event.target.closest('li');
+            if (!entry) { return; }
+            var index = parseInt(entry.getAttribute('data-option-array-index'), 10);
+            if (select.multiple) {
+                select.options[index].selected = true;
+            } else {
+                select.selectedIndex = index;
+            }
+            container.classList.remove('chosen-with-drop');
+            select.dispatchEvent(new Event('change', {bubbles: true}));
+        });
+        select.addEventListener('change', render);
+        select.addEventListener('chosen:updated', render);
+        render();
+    }
+
+    function setupDependentLists() {
+        var product = document.getElementById('txtProduct');
+        var release = document.getElementById('txtRelease');
+        product.addEventListener('change', function () {
+            busy('/api/releases?product=' + encodeURIComponent(product.value), function (status, body) {
+                release.innerHTML = JSON.parse(body).map(function (name) { return '<option>' + name + '</option>'; }).join('');
+                release.dispatchEvent(new Event('chosen:updated'));
+            });
+        });
+        release.addEventListener('change', function () {
+            busy('/api/teams?release=' + encodeURIComponent(release.value), function () {});
+        });
+    }
+
+    function setupTagIt() {
+        var box = document.getElementById('txtNotifyTagIt');
+        var input = box.querySelector('.tagit-new input');
+        input.addEventListener('keydown', function (event) {
+            if (event.key !== 'Tab' && event.key !== 'Enter' && event.key !== ',') { return; }
+            event.preventDefault();
+            var name = input.value.trim();
+            input.value = '';
+            if (!name) { return; }
+            // The real widget looks the person up before it accepts the tag.
+            request('/api/people?q=' + encodeURIComponent(name), function (status) {
+                if (status !== 200) { return; }
+                var tag = document.createElement('li');
+                tag.className = 'tagit-choice';
+                tag.innerHTML = '<span class="tagit-label"></span>';
+                tag.firstChild.textContent = name;
+                box.querySelector('.tagit').insertBefore(tag, box.querySelector('.tagit-new'));
+            });
+        });
+    }
+
+    document.addEventListener('DOMContentLoaded', function () {
+        var dialog = document.getElementById('defect-dialog');
+        if (!dialog) { return; }
+        setupMenus();
+        Array.prototype.forEach.call(document.querySelectorAll('select.chosen-select'), chosen);
+        setupDependentLists();
+        setupTagIt();
+        document.querySelector('.btn-secondary').addEventListener('click', function () { dialog.classList.add('open'); });
+        document.getElementById('btnSaveDefect').addEventListener('click', function () { dialog.classList.remove('open'); });
+        document.getElementById('btnCancelDefect').addEventListener('click', function () { dialog.classList.remove('open'); });
+    });
+})();
@@ -0,0 +1,2 @@
+# The automation core. Nothing in this package imports Qt, so it can be driven
+# from the command line (python -m agilecraft_automation) as well as the GUI.
@@ -0,0 +1,1199 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------
+#
+# (C) 2019 Isaak Meier
+# Released under MIT License
+# email isaakmeier12@gmail.com
+# icon made by Eucalyp from www.flaticon.com
+# -----------------------------------------------------------
+
+from selenium.webdriver.common.by import By
+from .automation import GRID_PATH, LOGIN_PATH
+from .browser_profile import create_profile
+from .fast_fill import FILL_JS, MENU_STATE_JS, READ_BACK_JS, can_fast_fill, fill_fields, menu_arguments, sort_results
+from .instrumentation import NullSink, Timeline
+from .notify import ADD_TAGS_JS, TAGS_JS, UnresolvedNamesError, missing_names
+from .preflight import PREFLIGHT_JS, preflight_for, record_report
+from .retry import StepFailed, create_policies
+from .scheduler import CANCELLED, DONE, QUEUED, RUNNING, Job
+from .session_cache import create_session_cache
+from .supervisor import create_policy, create_supervisor
+from .waits import AT_BOTTOM_JS, READY_JS
+from contextlib import asynccontextmanager
+import asyncio
+import base64
+import itertools
+import json
+import os
+import socket
+import struct
+import subprocess
+import time
+
+# How W3C WebDriver marks an element reference in requests and responses.
+ELEMENT_KEY = "element-6066-11e4-a52e-4f735466cecf"
+
+# Keys as WebDriver expects them in send_keys.
+TAB = "\ue004"
+ESCAPE = "\ue00c"
+END = "\ue010"
+
+# W3C WebDriver only finds elements by css and xpath, the other selenium strategies become css.
+W3C_STRATEGIES = {
+    By.CSS_SELECTOR: lambda value: ("css selector", value),
+    By.XPATH: lambda value: ("xpath", value),
+    By.TAG_NAME: lambda value: ("css selector", value),
+    By.ID: lambda value: ("css selector", f'[id="{value}"]'),
+    By.NAME: lambda value: ("css selector", f'[name="{value}"]'),
+    By.CLASS_NAME: lambda value: ("css selector", f".{value}"),
+}
+
+# Like the "eager" strategy: the HTML is parsed. Every step waits for its element and the page to settle anyway.
+LOADED_JS = "return !window.__agilecraftLeaving && document.readyState !== 'loading';"
+
+FORM_CLOSED_JS = """
+var form = document.getElementById('AddDefectForm');
+return !form || !(form.offsetWidth || form.offsetHeight || form.getClientRects().length);
+"""
+
+# Older chromedrivers put this in front of the DevTools target id to make a window handle.
+HANDLE_PREFIX = "CDwindow-"
+
+HEADER = (By.ID, "header-menu-strSubNavButtons")
+SSO_ID = (By.NAME, "sso_id")
+
+
+class WebDriverError(Exception):
+    # An error answer from chromedriver, e.g. "no such element".
+    def __init__(self, error, message):
+        Exception.__init__(self, f"{error}: {message}")
+        self.error = error
+
+
+class ChromeDriverService:
+    # One chromedriver process. Every browser session of the async engine talks to it.
+
+    def __init__(self, chrome_driver_path, supervisor=None):
+        # Arguments:
+        #     supervisor {ResourceSupervisor} -- tracks chromedriver and every browser it starts, None to not track them
+        self.chrome_driver_path = chrome_driver_path
+        self.supervisor = supervisor
+        self.port = None
+        self.process = None
+
+    async def start(self, timeout=10):
+        with socket.socket() as probe:
+            probe.bind(("127.0.0.1", 0))
+            self.port = probe.getsockname()[1]
+        self.process = subprocess.Popen([self.chrome_driver_path, f"--port={self.port}"],
+                                        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        if self.supervisor is not None:
+            self.supervisor.track(self, self.process.pid)
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                connection = HttpConnection("127.0.0.1", self.port)
+                status = await connection.request("GET", "/status")
+                connection.close()
+                if status.get("ready", True):
+                    return
+            except (OSError, WebDriverError):
+                pass
+            if time.monotonic() > deadline or self.process.poll() is not None:
+                self.stop()
+                raise RuntimeError(f"chromedriver at {self.chrome_driver_path} didn't start.")
+            await asyncio.sleep(0.1)
+
+    def stop(self, leave_browsers=False):
+        # Arguments:
+        #     leave_browsers {bool} -- keep the browsers running, because some still have a form the user hasn't saved
+        processes = self.supervisor.forget(self) if self.supervisor is not None else []
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        if processes and not leave_browsers:
+            self.supervisor.reap(processes)
+
+
+class HttpConnection:
+    # Just enough HTTP/1.1 to talk json to chromedriver over one kept alive connection.
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self._reader = None
+        self._writer = None
+
+    async def request(self, method, path, payload=None):
+        # Returns:
+        #     object -- the "value" of chromedriver's answer
+
+        # Raises:
+        #     WebDriverError: chromedriver answered with an error
+        if self._writer is None:
+            self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        try:
+            status, data = await self._exchange(method, path, payload)
+        except BaseException:
+            # Cancelled or broken halfway, whatever is left on the connection belongs to this
+            # request, so start the next one on a fresh connection.
+            self.close()
+            raise
+        value = json.loads(data.decode() or "{}").get("value")
+        if status >= 400:
+            value = value or {}
+            raise WebDriverError(value.get("error", str(status)), value.get("message", ""))
+        return value
+
+    async def _exchange(self, method, path, payload):
+        body = json.dumps(payload).encode() if payload is not None else b""
+        head = (f"{method} {path} HTTP/1.1\r\nHost: {self.host}:{self.port}\r\nConnection: keep-alive\r\n"
+                f"Content-Type: application/json;charset=utf-8\r\nContent-Length: {len(body)}\r\n\r\n")
+        self._writer.write(head.encode() + body)
+        await self._writer.drain()
+        status_line = await self._reader.readline()
+        if not status_line:
+            self.close()
+            raise OSError("chromedriver closed the connection")
+        status = int(status_line.split()[1])
+        headers = {}
+        while True:
+            line = (await self._reader.readline()).decode().strip()
+            if not line:
+                break
+            key, _, value = line.partition(":")
+            headers[key.strip().lower()] = value.strip()
+        if headers.get("transfer-encoding") == "chunked":
+            data = b""
+            while True:
+                size = int((await self._reader.readline()).strip(), 16)
+                if size == 0:
+                    await self._reader.readline()
+                    break
+                data += await self._reader.readexactly(size)
+                await self._reader.readline()
+        else:
+            data = await self._reader.readexactly(int(headers.get("content-length", 0)))
+        if headers.get("connection", "").lower() == "close":
+            self.close()
+        return status, data
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+        self._reader = self._writer = None
+
+
+class DevToolsConnection:
+    # A WebSocket to one tab's DevTools target, next to chromedriver's own. Scripts run
+    # there without chromedriver switching to the tab, which would bring it to the front.
+
+    def __init__(self, address, window):
+        host, _, port = address.rpartition(":")
+        self.host = host
+        self.port = int(port)
+        target = window[len(HANDLE_PREFIX):] if window.startswith(HANDLE_PREFIX) else window
+        self.path = f"/devtools/page/{target}"
+        self._reader = None
+        self._writer = None
+        self._ids = itertools.count(1)
+        self._lock = asyncio.Lock()
+
+    async def evaluate(self, expression):
+        # Returns:
+        #     object -- the expression's value
+
+        # Raises:
+        #     WebDriverError: the script threw
+        #     OSError: the tab or the browser is gone
+        async with self._lock:
+            try:
+                if self._writer is None:
+                    await self._connect()
+                message_id = next(self._ids)
+                self._send(json.dumps({"id": message_id, "method": "Runtime.evaluate",
+                                       "params": {"expression": expression, "returnByValue": True}}).encode())
+                await self._writer.drain()
+                while True:
+                    # Events of the domains chromedriver enabled come in here as well.
+                    message = json.loads(await self._receive())
+                    if message.get("id") == message_id:
+                        break
+            except asyncio.IncompleteReadError:
+                self.close()
+                raise OSError("DevTools closed the connection")
+            except BaseException:
+                self.close()
+                raise
+        if "error" in message:
+            raise WebDriverError("unknown error", message["error"].get("message", ""))
+        result = message["result"]
+        if "exceptionDetails" in result:
+            raise WebDriverError("javascript error", result["exceptionDetails"].get("text", ""))
+        return result["result"].get("value")
+
+    async def _connect(self):
+        self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        key = base64.b64encode(os.urandom(16)).decode()
+        self._writer.write((f"GET {self.path} HTTP/1.1\r\nHost: {self.host}:{self.port}\r\nUpgrade: websocket\r\n"
+                            f"Connection: Upgrade\r\nSec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n").encode())
+        await self._writer.drain()
+        status_line = await self._reader.readline()
+        while (await self._reader.readline()).strip():
+            pass
+        if status_line.split()[1:2] != [b"101"]:
+            raise OSError(f"DevTools turned the connection down: {status_line.decode().strip()}")
+
+    def _send(self, payload, opcode=0x1):
+        # A client's frames have to be masked.
+        mask = os.urandom(4)
+        size = len(payload)
+        if size < 126:
+            head = struct.pack("!BB", 0x80 | opcode, 0x80 | size)
+        elif size < 1 << 16:
+            head = struct.pack("!BBH", 0x80 | opcode, 0x80 | 126, size)
+        else:
+            head = struct.pack("!BBQ", 0x80 | opcode, 0x80 | 127, size)
+        self._writer.write(head + mask + bytes(byte ^ mask[i % 4] for i, byte in enumerate(payload)))
+
+    async def _receive(self):
+        # Returns:
+        #     str -- the next text message, put together from its frames
+        data = b""
+        while True:
+            first, second = await self._reader.readexactly(2)
+            size = second & 0x7f
+            if size == 126:
+                size, = struct.unpack("!H", await self._reader.readexactly(2))
+            elif size == 127:
+                size, = struct.unpack("!Q", await self._reader.readexactly(8))
+            mask = await self._reader.readexactly(4) if second & 0x80 else None
+            payload = await self._reader.readexactly(size)
+            if mask is not None:
+                payload = bytes(byte ^ mask[i % 4] for i, byte in enumerate(payload))
+            opcode = first & 0x0f
+            if opcode == 0x8:
+                raise OSError("DevTools closed the connection")
+            if opcode == 0x9:
+                self._send(payload, 0xA)
+                continue
+            if opcode == 0xA:
+                continue
+            data += payload
+            if first & 0x80:
+                return data.decode()
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+        self._reader = self._writer = None
+
+
+class Browser:
+    # One W3C session, i.e. one Chrome window with one or more tabs. Commands are
+    # sent one at a time, switching to the caller's tab first when another tab
+    # went last, so defects in different tabs can take turns at every await.
+
+    def __init__(self, service, session_id, user, page_load_strategy="normal"):
+        self.service = service
+        self.id = session_id
+        self.user = user
+        self.page_load_strategy = page_load_strategy
+        self.created = time.time()
+        # Defects run in any of its tabs, what RecyclePolicy counts.
+        self.jobs = 0
+        # Handles of the open tabs, and how many are being opened right now.
+        self.windows = []
+        self.opening = 0
+        self.current_window = None
+        # Where Chrome's DevTools listen, for evaluate().
+        self.debugger_address = None
+        self._connection = HttpConnection("127.0.0.1", service.port)
+        self._devtools = {}
+        self._lock = asyncio.Lock()
+        self._holder = None
+
+    @classmethod
+    async def create(cls, service, capabilities, user):
+        connection = HttpConnection("127.0.0.1", service.port)
+        try:
+            value = await connection.request("POST", "/session", {"capabilities": {"alwaysMatch": capabilities}})
+        finally:
+            connection.close()
+        browser = cls(service, value["sessionId"], user, capabilities.get("pageLoadStrategy", "normal"))
+        browser.debugger_address = value.get("capabilities", {}).get("goog:chromeOptions", {}).get("debuggerAddress")
+        browser.current_window = await browser.command(None, "GET", "/window")
+        browser.windows.append(browser.current_window)
+        return browser
+
+    async def command(self, window, method, path, payload=None):
+        # Sends a command for the given tab, None for whichever tab is current.
+        if self._holder is not None and self._holder == window:
+            return await self._send(window, method, path, payload)
+        async with self._lock:
+            return await self._send(window, method, path, payload)
+
+    @asynccontextmanager
+    async def exclusive(self, window):
+        # Keeps the other tabs out for a few commands in a row, e.g. while switched into a frame.
+        async with self._lock:
+            self._holder = window
+            try:
+                yield
+            finally:
+                self._holder = None
+
+    async def evaluate(self, window, expression):
+        # Runs a script in the given tab without switching to it, through the tab's own DevTools connection.
+
+        # Returns:
+        #     object -- the script's value, None if chromedriver didn't say where DevTools listen
+        if self.debugger_address is None:
+            return None
+        if window not in self._devtools:
+            self._devtools[window] = DevToolsConnection(self.debugger_address, window)
+        return await self._devtools[window].evaluate(expression)
+
+    async def new_tab(self):
+        # Returns:
+        #     str -- the handle of a new, empty tab
+        self.opening += 1
+        try:
+            value = await self.command(None, "POST", "/window/new", {"type": "tab"})
+        finally:
+            self.opening -= 1
+        self.windows.append(value["handle"])
+        return value["handle"]
+
+    async def close_tab(self, window):
+        self.windows.remove(window)
+        if window in self._devtools:
+            self._devtools.pop(window).close()
+        try:
+            await self.command(window, "DELETE", "/window")
+        except (OSError, WebDriverError):
+            pass
+        self.current_window = None
+
+    async def quit(self):
+        try:
+            await self.command(None, "DELETE", "")
+        except (OSError, WebDriverError):
+            pass
+        self.windows = []
+        self._connection.close()
+        for devtools in self._devtools.values():
+            devtools.close()
+        self._devtools = {}
+
+    async def _send(self, window, method, path, payload):
+        if window is not None and window != self.current_window:
+            await self._connection.request("POST", f"/session/{self.id}/window", {"handle": window})
+            self.current_window = window
+        return await self._connection.request(method, f"/session/{self.id}{path}", payload)
+
+
+class AsyncSession:
+    # One tab of a Browser, which is what a defect runs in.
+
+    def __init__(self, browser, window):
+        self.browser = browser
+        self.window = window
+        self.user = browser.user
+        self.created = time.time()
+        self.idle_since = self.created
+        self.jobs = 0
+
+    async def command(self, method, path, payload=None):
+        return await self.browser.command(self.window, method, path, payload)
+
+    def exclusive(self):
+        return self.browser.exclusive(self.window)
+
+    async def get(self, url, timeout=30, poll=0.1):
+        # With the "none" page load strategy navigating returns right away, so the tab
+        # waits for the new page here, without holding up the browser's other tabs.
+        if self.browser.page_load_strategy != "none":
+            await self.command("POST", "/url", {"url": url})
+            return
+        await self.execute("window.__agilecraftLeaving = true;")
+        await self.command("POST", "/url", {"url": url})
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                if await self.execute(LOADED_JS):
+                    return
+            except WebDriverError:
+                # The old page went away in the middle of the check.
+                pass
+            if time.monotonic() > deadline:
+                raise WebDriverError("timeout", f"{url} didn't load in {timeout}s")
+            await asyncio.sleep(poll)
+
+    async def find_all(self, locator):
+        using, value = W3C_STRATEGIES[locator[0]](locator[1])
+        elements = await self.command("POST", "/elements", {"using": using, "value": value})
+        return [element[ELEMENT_KEY] for element in elements]
+
+    async def active_element(self):
+        return (await self.command("GET", "/element/active"))[ELEMENT_KEY]
+
+    async def displayed(self, element):
+        return await self.command("GET", f"/element/{element}/displayed")
+
+    async def enabled(self, element):
+        return await self.command("GET", f"/element/{element}/enabled")
+
+    async def click(self, element):
+        await self.command("POST", f"/element/{element}/click", {})
+
+    async def send_keys(self, element, text):
+        await self.command("POST", f"/element/{element}/value", {"text": text})
+
+    async def clear(self, element):
+        await self.command("POST", f"/element/{element}/clear", {})
+
+    async def execute(self, script, *args):
+        args = [{ELEMENT_KEY: arg.element} if isinstance(arg, ElementArgument) else arg for arg in args]
+        return await self.command("POST", "/execute/sync", {"script": script, "args": args})
+
+    async def switch_to_frame(self, frame):
+        await self.command("POST", "/frame", {"id": frame})
+
+    async def cdp(self, cmd, params):
+        return await self.command("POST", "/goog/cdp/execute", {"cmd": cmd, "params": params})
+
+    async def form_closed(self):
+        # Whether the user is done with the form left in this tab. Unless the tab is current
+        # anyway, it's asked over DevTools, since switching to it would bring it to the front
+        # of the form the user may be busy with in another tab.
+        if self.window == self.browser.current_window:
+            return bool(await self.execute(FORM_CLOSED_JS))
+        return bool(await self.browser.evaluate(self.window, f"(function () {{{FORM_CLOSED_JS}}})()"))
+
+
+class ElementArgument:
+    # Marks an element id passed to execute(), so it's sent as an element reference.
+    def __init__(self, element):
+        self.element = element
+
+
+class AsyncSessionPool:
+    # The DriverPool of the async engine: logged in sessions are reused, and
+    # sessions left with the user come back once their form is closed.
+    #
+    # With tabs_per_browser above 1 a session is a tab, and a new defect gets a new
+    # tab in an already logged in browser before another browser is launched.
+    # Tabs share the browser's memory and cookies, so that's a lot cheaper.
+    #
+    # Every command switches to its tab, which brings it to the front. So a browser
+    # with a form left open for the user gets no new defects until it's closed, and
+    # whether it is gets asked without switching to its tab.
+
+    def __init__(self, service, capabilities, base_url, session_cache=None, max_browsers=20, tabs_per_browser=1,
+                 blocked_urls=(), poll=0.5, policy=None):
+        self.service = service
+        self.capabilities = capabilities
+        self.base_url = base_url
+        self.session_cache = session_cache
+        self.max_browsers = max(max_browsers, 1)
+        self.tabs_per_browser = max(tabs_per_browser, 1)
+        self.blocked_urls = list(blocked_urls)
+        self.poll = poll
+        # Job counts are per browser, a browser due to be replaced gets no new tabs and
+        # is quit once none of its tabs are busy. One chromedriver runs every browser,
+        # so there's no memory figure per browser.
+        self.policy = policy
+        self.recycled = 0
+        self._idle = []
+        self._handed_off = []
+        self._browsers = []
+        self._launching = 0
+        self._waiting_for_launch = 0
+        self._warming = 0
+        self._waiting_for_warm = 0
+        self._closed = False
+
+    async def acquire(self, creds):
+        while True:
+            if self._closed:
+                raise RuntimeError("The browser pool has been shut down.")
+            await self.reclaim()
+            while True:
+                session = next((session for session in reversed(self._idle) if not self._with_user(session.browser)), None)
+                if session is None:
+                    break
+                self._idle.remove(session)
+                if not self._retiring(session.browser) and session.user == creds["user"] and await self.is_alive(session):
+                    self._count_job(session)
+                    return session
+                await self._discard(session)
+            browser = next((browser for browser in self._browsers if browser.user == creds["user"] and not self._retiring(browser)
+                            and not self._with_user(browser) and len(browser.windows) + browser.opening < self.tabs_per_browser), None)
+            if browser is not None:
+                session = await self._open_tab(browser)
+            elif self._waiting_for_warm < self._warming:
+                # The browser warming up goes idle before a new one could be launched.
+                self._waiting_for_warm += 1
+                try:
+                    await asyncio.sleep(0.1)
+                finally:
+                    self._waiting_for_warm -= 1
+                continue
+            elif self._waiting_for_launch < self._launching * (self.tabs_per_browser - 1):
+                # A browser that's starting up will have a free tab for us, no need to launch another.
+                self._waiting_for_launch += 1
+                try:
+                    await asyncio.sleep(0.1)
+                finally:
+                    self._waiting_for_launch -= 1
+                continue
+            elif len(self._browsers) + self._launching < self.max_browsers:
+                session = await self._launch(creds)
+            else:
+                await asyncio.sleep(self.poll)
+                continue
+            self._count_job(session)
+            return session
+
+    def release(self, session):
+        session.idle_since = time.time()
+        self._idle.append(session)
+
+    async def warm(self, creds):
+        # Launches one logged in browser ahead of the first defect and leaves it idle.
+        if self._closed or self._browsers or self._launching:
+            return
+        self._warming += 1
+        try:
+            session = await self._launch(creds)
+        finally:
+            self._warming -= 1
+        self.release(session)
+
+    def hand_off(self, session):
+        self._handed_off.append(session)
+
+    async def reclaim(self):
+        # The sessions stay in _handed_off while they're checked, so their browser stays
+        # off limits to other defects in the meantime.
+        for session in list(self._handed_off):
+            try:
+                done = await session.form_closed()
+                gone = False
+            except (OSError, WebDriverError):
+                done = gone = True
+            if not done or session not in self._handed_off:
+                continue
+            self._handed_off.remove(session)
+            if gone:
+                await self._discard(session)
+            else:
+                self.release(session)
+
+    async def recycle_idle(self):
+        # Closes the idle tabs of browsers that are due to be replaced, and tabs idle
+        # for longer than max_idle. A browser is quit with its last tab.
+        if self.policy is None:
+            return
+        idle, self._idle = self._idle, []
+        expired = [session for session in idle if self._retiring(session.browser) or self.policy.idle_too_long(session.idle_since)]
+        self._idle = [session for session in idle if session not in expired] + self._idle
+        for session in expired:
+            await self._discard(session, recycled=True)
+
+    async def is_alive(self, session):
+        try:
+            await session.command("GET", "/window")
+            return True
+        except (OSError, WebDriverError):
+            return False
+
+    async def close(self, quit_open=False):
+        # Quits idle browsers, and the ones the user is done with. Sessions with a form
+        # still open stay open like with the DriverPool, unless quit_open.
+
+        # Returns:
+        #     bool -- whether any browser was left open for the user
+        self._closed = True
+        idle, self._idle = self._idle, []
+        handed_off, self._handed_off = self._handed_off, []
+        left = False
+        for session in handed_off:
+            try:
+                done = quit_open or await session.form_closed()
+            except (OSError, WebDriverError):
+                done = True
+            if done:
+                idle.append(session)
+            else:
+                left = True
+        for session in idle:
+            await self._discard(session)
+        return left
+
+    async def sign_in(self, session, creds):
+        # Same as automation.sign_in: cached cookies first, the SSO form if the site turns them down.
+        user = creds["user"]
+        cookies = None
+        if await session.find_all(SSO_ID):
+            if self.session_cache is not None:
+                self.session_cache.forget(user)
+        elif self.session_cache is not None:
+            cookies = self.session_cache.usable_cookies(user)
+        if cookies:
+            await session.cdp("Network.setCookies", {"cookies": cookies})
+            await session.get(self.base_url + GRID_PATH)
+            if not await session.find_all(SSO_ID):
+                await wait_for_element(session, HEADER)
+                return
+            self.session_cache.forget(user)
+        elif not await session.find_all(SSO_ID):
+            await session.get(self.base_url + LOGIN_PATH)
+        email_input = await wait_for_element(session, (By.NAME, "sso_id"), clickable=True)
+        pass_input = await wait_for_element(session, (By.NAME, "sso_password"), clickable=True)
+        await session.send_keys(email_input, creds["user"])
+        await session.send_keys(pass_input, creds["pass"])
+        await session.click(await wait_for_element(session, (By.NAME, "btnLogin"), clickable=True))
+        await wait_for_element(session, HEADER)
+        if self.session_cache is not None:
+            try:
+                self.session_cache.remember(user, (await session.cdp("Network.getAllCookies", {}))["cookies"])
+            except (OSError, WebDriverError):
+                pass
+
+    async def block_urls(self, session):
+        # Same as automation.block_urls. The block list is per tab, so every new tab needs it.
+        if not self.blocked_urls:
+            return
+        try:
+            await session.cdp("Network.enable", {})
+            await session.cdp("Network.setBlockedURLs", {"urls": self.blocked_urls})
+        except WebDriverError:
+            pass
+
+    async def _launch(self, creds):
+        # Starts a browser and logs its first tab in.
+        self._launching += 1
+        browser = None
+        try:
+            browser = await Browser.create(self.service, self.capabilities, creds["user"])
+            session = AsyncSession(browser, browser.windows[0])
+            await self.block_urls(session)
+            await self.sign_in(session, creds)
+        except BaseException:
+            if browser is not None:
+                await browser.quit()
+            raise
+        finally:
+            self._launching -= 1
+        self._browsers.append(browser)
+        return session
+
+    async def _open_tab(self, browser):
+        # The browser is already logged in and tabs share cookies, so the new tab needs no login.
+        try:
+            session = AsyncSession(browser, await browser.new_tab())
+            await self.block_urls(session)
+            return session
+        except (OSError, WebDriverError):
+            # The browser itself is gone.
+            self._browsers.remove(browser)
+            await browser.quit()
+            raise
+
+    async def _discard(self, session, recycled=False):
+        # Closes the session's tab, and its browser once no tabs are left.
+        # recycled counts the browser as replaced even if it isn't used up.
+        browser = session.browser
+        if session.window in browser.windows and len(browser.windows) > 1:
+            await browser.close_tab(session.window)
+            return
+        if browser in self._browsers:
+            self._browsers.remove(browser)
+            if recycled or (self._retiring(browser) and not self._closed):
+                self.recycled += 1
+        await browser.quit()
+
+    def _count_job(self, session):
+        session.jobs += 1
+        session.browser.jobs += 1
+
+    def _with_user(self, browser):
+        # Returns:
+        #     bool -- whether one of the browser's tabs has a form left open for the user
+        return any(session.browser is browser for session in self._handed_off)
+
+    def _retiring(self, browser):
+        # Returns:
+        #     bool -- whether the browser is due to be replaced, by the policy's job count
+        return self.policy is not None and self.policy.reason(browser) is not None
+
+
+async def wait_for_element(session, locator, clickable=False, timeout=5, poll=0.1):
+    # The async version of WebDriverWait with presence_of_element_located or element_to_be_clickable.
+
+    # Returns:
+    #     str -- the element id
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            for element in (await session.find_all(locator))[:1]:
+                if not clickable or (await session.displayed(element) and await session.enabled(element)):
+                    return element
+        except WebDriverError:
+            # The page was replaced between the find and the check, or is still loading. Look again.
+            pass
+        if time.monotonic() > deadline:
+            raise WebDriverError("timeout", f"Waited {timeout}s for {locator[1]}")
+        await asyncio.sleep(poll)
+
+
+class AsyncDefectAutomation:
+    # DefectAutomation for the event loop. Same form plan, same steps and the same
+    # timing events, but every browser command is awaited, so one thread can keep
+    # many defects going at once.
+
+    def __init__(self, carrier, specific_names, platform, creds, pool, settings, form_plan, overrides=None, keep_for_user=True, sink=None, on_progress=None):
+        self.carrier = carrier
+        self.specific_names = specific_names
+        self.platform = platform
+        self.creds = creds
+        self.pool = pool
+        self.settings = settings
+        self.form_plan = form_plan
+        self.overrides = overrides or {}
+        self.keep_for_user = keep_for_user
+        self.fast_fill = settings["fast_fill"]["enabled"]
+        self.retries = create_policies(settings)
+        self.completed = []
+        self.waits = settings["waits"]
+        self.sink = sink or NullSink()
+        self.on_progress = on_progress
+        self.actions = {
+            "type": self.type_text,
+            "type_in_frame": self.type_in_frame,
+            "choose": self.choose,
+            "scroll": self.scroll_to_bottom,
+            "tags": self.put_names,
+        }
+
+    async def run(self):
+        # Returns:
+        #     str -- "Success", or the error message if something went wrong
+        self.timeline = Timeline(self.sink, self.carrier, self.platform, self.on_progress)
+        started = time.perf_counter()
+        self.timeline.progress("Waiting for a browser")
+        try:
+            self.session = await self.pool.acquire(self.creds)
+        except Exception as e:
+            self.timeline.emit("step", "acquire_browser", time.perf_counter() - started, ok=False)
+            self.timeline.finish(str(e))
+            return str(e)
+        self.timeline.emit("step", "acquire_browser", time.perf_counter() - started)
+        result = "Success"
+        try:
+            steps = self.form_plan.steps_for(self.carrier, self.platform)
+            await self.checkpoint("open_form", "Opening the form", lambda retry: self.open_defect_form())
+            if self.settings["preflight"]["enabled"]:
+                await self.step("preflight", "Checking the form", self.check_form())
+            await self.execute_plan(steps)
+        except Exception as e:
+            result = str(e)
+        finally:
+            self.timeline.finish(result)
+            if self.keep_for_user:
+                self.pool.hand_off(self.session)
+            else:
+                self.pool.release(self.session)
+        return result
+
+    async def step(self, name, progress, work):
+        # Timeline.step for a coroutine.
+        self.timeline.progress(progress)
+        started = time.perf_counter()
+        try:
+            await work
+        except Exception:
+            self.timeline.emit("step", name, time.perf_counter() - started, ok=False)
+            raise
+        self.timeline.emit("step", name, time.perf_counter() - started)
+
+    async def open_defect_form(self):
+        await self.session.get(self.settings["site"]["base_url"] + GRID_PATH)
+        if await self.session.find_all(SSO_ID):
+            await self.pool.sign_in(self.session, self.creds)
+        await self.wait_until(HEADER, "open_form.header")
+        create_btn = await self.wait_until((By.CLASS_NAME, "btn-secondary"), "open_form.create", clickable=True)
+        # ReadinessWaiter.install, before the click so the form's own requests are counted.
+        await self.session.execute(READY_JS, self.waits["overlay_selectors"], self.waits["settle_ms"])
+        await self.session.execute("arguments[0].click();", ElementArgument(create_btn))
+
+    async def check_form(self):
+        # Same as DefectAutomation.check_form.
+        preflight = preflight_for(self.form_plan)
+        checks, known_hash = preflight.script_arguments(self.carrier, self.platform)
+        started = time.perf_counter()
+        deadline = time.monotonic() + self.settings["preflight"]["timeout"]
+        while True:
+            report = preflight.evaluate(self.carrier, self.platform, await self.session.execute(PREFLIGHT_JS, checks, known_hash))
+            if report is not None:
+                break
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"The Add Defect form didn't open within {self.settings['preflight']['timeout']} seconds.")
+            await asyncio.sleep(self.waits["poll"])
+        record_report(self.timeline, report, time.perf_counter() - started, self.settings["preflight"]["abort"])
+
+    async def execute_plan(self, steps):
+        # Same batching as DefectAutomation.execute_plan.
+        batch = []
+        for number, step in enumerate(steps, 1):
+            if self.fast_fill and can_fast_fill(step):
+                batch.append(step)
+                if step.wait:
+                    await self.fill_batch(batch, number, len(steps))
+                    batch = []
+                continue
+            await self.fill_batch(batch, number - 1, len(steps))
+            batch = []
+            await self.checkpoint(step.name, f"{step.name} ({number}/{len(steps)})", lambda retry, step=step: self.perform(step, retry), [step])
+        await self.fill_batch(batch, len(steps), len(steps))
+
+    async def checkpoint(self, name, progress, make_work, steps=()):
+        # DefectAutomation.checkpoint. make_work is called with retry and returns the coroutine to run.
+        attempt = 1
+        while True:
+            try:
+                await self.step(name, progress if attempt == 1 else f"{progress}, try {attempt}", make_work(attempt > 1))
+                break
+            except Exception as e:
+                delay = self.retries.delay_for(e, attempt) if self.retries is not None else None
+                if delay is None:
+                    raise StepFailed(name, e, len(self.completed), len(self.form_plan.steps_for(self.carrier, self.platform)))
+                self.timeline.emit("retry", name, delay, error=type(e).__name__, attempt=attempt)
+                try:
+                    await self.session.switch_to_frame(None)
+                except (OSError, WebDriverError):
+                    pass
+                await asyncio.sleep(delay)
+                attempt += 1
+        self.completed.extend(step.name for step in steps)
+
+    async def perform(self, step, retry=False):
+        if retry:
+            await self.redo(step)
+        else:
+            await self.actions[step.action](step)
+        await self.after_step(step)
+
+    async def redo(self, step):
+        # DefectAutomation.redo: checks what the failed try left behind, so nothing ends up in the form twice.
+        if step.action == "type":
+            field = await self.wait_until(step.target, f"{step.name}.target")
+            if await self.session.execute("return arguments[0].value;", ElementArgument(field)) != self.step_text(step):
+                await self.session.clear(field)
+                await self.session.send_keys(field, self.step_text(step))
+        elif step.action == "type_in_frame":
+            async with self.session.exclusive():
+                await self.session.switch_to_frame(step.frame)
+                try:
+                    field = await self.wait_until(step.target, f"{step.name}.target")
+                    text = await self.session.execute("return arguments[0].innerText;", ElementArgument(field))
+                    if text.split() != self.step_text(step).split():
+                        await self.session.execute("arguments[0].innerHTML = '';", ElementArgument(field))
+                        await self.session.send_keys(field, self.step_text(step))
+                finally:
+                    await self.session.switch_to_frame(None)
+        elif step.action == "choose" and self.fast_fill and can_fast_fill(step):
+            await self.fill([step], retry=True)
+        elif step.action == "choose":
+            await self.rechoose(step)
+        elif step.action == "tags":
+            await self.put_names(step, retry=True)
+        else:
+            await self.actions[step.action](step)
+
+    async def rechoose(self, step):
+        # DefectAutomation.rechoose: skipped if the entry got in, an open menu is shut first.
+        arguments = menu_arguments(step)
+        if arguments is None:
+            await self.choose(step)
+            return
+        state = await self.session.execute(MENU_STATE_JS, *arguments)
+        if state["done"]:
+            return
+        if state["open"]:
+            await self.session.send_keys(await self.session.active_element(), ESCAPE)
+            if (await self.session.execute(MENU_STATE_JS, *arguments))["open"]:
+                await self.session.click(await self.wait_until(step.toggle, f"{step.name}.toggle", clickable=True))
+        await self.choose(step)
+
+    async def fill_batch(self, steps, number, total):
+        if not steps:
+            return
+        names = [step.name for step in steps]
+        await self.checkpoint("fast_fill:" + "+".join(names), f"{', '.join(names)} ({number}/{total})",
+                              lambda retry: self.fill_and_check(steps, retry), steps)
+
+    async def fill_and_check(self, steps, retry=False):
+        await self.fill(steps, retry)
+        await self.after_step(steps[-1])
+
+    async def fill(self, steps, retry=False):
+        # fast_fill.fast_fill, and the fields that didn't take their value are clicked,
+        # on a retry after checking what the failed try left behind (rechoose).
+        results = await self.session.execute(FILL_JS, fill_fields(steps))
+        filled, failed = sort_results(steps, results)
+        if filled:
+            stuck = await self.session.execute(READ_BACK_JS, [field for _, field in filled])
+            failed.update(id(step) for (step, _), ok in zip(filled, stuck) if not ok)
+        for step in steps:
+            if id(step) in failed:
+                await (self.rechoose(step) if retry else self.choose(step))
+
+    async def after_step(self, step):
+        if step.action == "scroll":
+            await self.wait_ready(step.wait or "scroll", AT_BOTTOM_JS)
+        elif step.wait:
+            await self.wait_ready(step.wait)
+
+    async def wait_ready(self, name, first=None):
+        # ReadinessWaiter.wait_for on the event loop: running out of time is recorded, not raised.
+        timeout = self.waits["timeouts"].get(name, self.waits["default_timeout"])
+        started = time.perf_counter()
+        ready = False
+        while not ready and time.perf_counter() - started < timeout:
+            ready = (first is None or await self.session.execute(first)) and \
+                await self.session.execute(READY_JS, self.waits["overlay_selectors"], self.waits["settle_ms"])
+            if not ready:
+                await asyncio.sleep(self.waits["poll"])
+        self.timeline.wait(f"ready:{name}", time.perf_counter() - started, bool(ready))
+
+    def step_text(self, step):
+        if step.override and step.override in self.overrides:
+            return self.overrides[step.override]
+        return step.text.format(carrier=self.carrier, platform=self.platform)
+
+    async def wait_until(self, locator, label, clickable=False, timeout=5):
+        started = time.perf_counter()
+        try:
+            element = await wait_for_element(self.session, locator, clickable, timeout, self.waits["poll"])
+        except Exception:
+            self.timeline.wait(label, time.perf_counter() - started, ok=False)
+            raise
+        self.timeline.wait(label, time.perf_counter() - started)
+        return element
+
+    async def type_text(self, step):
+        field = await self.wait_until(step.target, f"{step.name}.target")
+        await self.session.send_keys(field, self.step_text(step))
+
+    async def type_in_frame(self, step):
+        # Other tabs would switch the browser out of the frame, so they wait until we're back out.
+        async with self.session.exclusive():
+            await self.session.switch_to_frame(step.frame)
+            try:
+                field = await self.wait_until(step.target, f"{step.name}.target")
+                await self.session.send_keys(field, self.step_text(step))
+            finally:
+                await self.session.switch_to_frame(None)
+
+    async def choose(self, step):
+        await self.session.click(await self.wait_until(step.toggle, f"{step.name}.toggle", clickable=True))
+        await self.session.click(await self.wait_until(step.option, f"{step.name}.option", clickable=True))
+
+    async def scroll_to_bottom(self, step):
+        await self.session.execute("window.scrollTo(0, document.body.scrollHeight);")
+        html = (await self.session.find_all((By.TAG_NAME, "html")))[0]
+        await self.session.send_keys(html, END)
+
+    async def put_names(self, step, retry=False):
+        # DefectAutomation.put_names, including the check for names the tag box didn't take.
+        notify = self.settings["notify"]
+        field = (await self.session.find_all(step.target) or [None])[0]
+        if field is None:
+            raise WebDriverError("no such element", f"Unable to locate {step.target[1]}")
+        names = self.specific_names
+        if retry:
+            names = missing_names(self.specific_names, await self.session.execute(TAGS_JS, ElementArgument(field)))
+        if notify["bulk"]:
+            for start in range(0, len(names), notify["chunk_size"]):
+                await self.session.execute(ADD_TAGS_JS, ElementArgument(field), names[start:start + notify["chunk_size"]])
+        else:
+            for name in names:
+                await self.session.send_keys(field, name + TAB)
+        started = time.perf_counter()
+        missing = await self.confirm_names(field, notify["confirm_timeout"], notify["settle_ms"])
+        self.timeline.wait(f"{step.name}.confirm", time.perf_counter() - started, ok=not missing)
+        if missing:
+            raise UnresolvedNamesError(missing)
+
+    async def confirm_names(self, field, timeout, settle_ms):
+        # notify.wait_for_tags on the event loop.
+
+        # Returns:
+        #     list -- names that never became tags
+        deadline = time.monotonic() + timeout
+        count, since = -1, time.monotonic()
+        while True:
+            missing = missing_names(self.specific_names, await self.session.execute(TAGS_JS, ElementArgument(field)))
+            if not missing or time.monotonic() > deadline:
+                return missing
+            tags = len(self.specific_names) - len(missing)
+            if tags != count:
+                count, since = tags, time.monotonic()
+            elif (time.monotonic() - since) * 1000 >= settle_ms:
+                return missing
+            await asyncio.sleep(self.waits["poll"])
+
+
+def chrome_capabilities(profile, page_load_strategy=None):
+    # Arguments:
+    #     profile {BrowserProfile} -- what the browser is started with
+    #     page_load_strategy {str} -- instead of the profile's own
+
+    # Returns:
+    #     dict -- W3C capabilities for a Chrome window like automation.create_driver makes
+    chrome_options = {"args": profile.arguments()}
+    if profile.prefs():
+        chrome_options["prefs"] = profile.prefs()
+    return {"browserName": "chrome", "pageLoadStrategy": page_load_strategy or profile.page_load_strategy(),
+            "goog:chromeOptions": chrome_options}
+
+
+class AsyncScheduler:
+    # Same interface as JobScheduler, but every defect is a task on one asyncio
+    # event loop. The GUI hands in a SteppedEventLoop that Qt's event loop runs, so
+    # it stays single threaded. Without one, jobs run in shutdown(wait=True).
+
+    def __init__(self, config, prepare_job, on_finished, on_progress=None, sink=None, max_workers=20, loop=None):
+        # Arguments:
+        #     config {dict} -- "settings", "form_plan", "chrome_driver_path", "headless" (None for the
+        #                      "browser.headless" setting) and "keep_for_user"
+        #     prepare_job {callable} -- called with a Job, returns (names, creds) for it
+        #     on_finished {callable} -- called with the Job once it's done
+        #     on_progress {callable} -- called with the Job and a short status string
+        #     sink {object} -- where timing events go
+        #     max_workers {int} -- how many defects are filled at the same time
+        #     loop {AbstractEventLoop} -- the loop to run on, a new one if None
+        self.config = config
+        self.prepare_job = prepare_job
+        self.on_finished = on_finished
+        self.on_progress = on_progress
+        self.sink = sink
+        self.jobs = {}
+        self._ids = itertools.count(1)
+        self._tasks = {}
+        self.loop = loop if loop is not None else asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self._slots = asyncio.Semaphore(max(max_workers, 1))
+        settings = config["settings"]
+        tabs = max(settings["driver_pool"]["tabs_per_browser"], 1)
+        # Tabs only overlap if a page load doesn't hold up the whole browser, so they load in the background.
+        profile = create_profile(settings, config["headless"])
+        capabilities = chrome_capabilities(profile, "none" if tabs > 1 else None)
+        supervisor = create_supervisor(settings["supervisor"])
+        # Its thread keeps the registry up to date as browsers start under chromedriver.
+        supervisor.start()
+        self.service = ChromeDriverService(config["chrome_driver_path"], supervisor)
+        self.pool = AsyncSessionPool(self.service, capabilities, settings["site"]["base_url"],
+                                     create_session_cache(settings["session_cache"]),
+                                     max_browsers=max(settings["driver_pool"]["max_browsers"], -(-max_workers // tabs)),
+                                     tabs_per_browser=tabs, blocked_urls=profile.blocked_urls,
+                                     policy=create_policy(settings["supervisor"]))
+        self._service_started = None
+        self._warm_task = None
+        self._recycler = self.loop.create_task(self._recycle(settings["supervisor"]["interval"]))
+
+    def warm(self, creds, on_done=None):
+        # Starts chromedriver, and a logged in browser if there are creds, before the first
+        # defect needs them. Runs on the loop like a job.
+
+        # Arguments:
+        #     creds {dict} -- the login, None to only start chromedriver
+        #     on_done {callable} -- called with "Success" or the error message
+        self._warm_task = self.loop.create_task(self._warm(creds, on_done))
+
+    def submit(self, carrier, platform, overrides=None):
+        job = Job(next(self._ids), carrier, platform, overrides)
+        self.jobs[job.id] = job
+        self._tasks[job.id] = self.loop.create_task(self._run(job))
+        return job
+
+    def submit_batch(self, entries):
+        return [self.submit(carrier, platform, overrides) for carrier, platform, overrides in entries]
+
+    def active(self):
+        return [job for job in self.jobs.values() if job.state in (QUEUED, RUNNING)]
+
+    def forget(self, job_id):
+        return self.jobs.pop(job_id, None)
+
+    def shutdown(self, wait=False):
+        # With wait, every job is finished first, otherwise queued and running jobs are cancelled.
+        tasks = list(self._tasks.values())
+        if self._warm_task is not None:
+            self._warm_task.cancel()
+            tasks.append(self._warm_task)
+        if not wait:
+            for task in tasks:
+                task.cancel()
+        if tasks:
+            self.loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+        self._recycler.cancel()
+        self.loop.run_until_complete(asyncio.gather(self._recycler, return_exceptions=True))
+        left = self.loop.run_until_complete(self.pool.close(self.config["settings"]["supervisor"]["close_open_forms"]))
+        self.service.stop(leave_browsers=left)
+        self.loop.close()
+
+    async def _run(self, job):
+        try:
+            async with self._slots:
+                job.state = RUNNING
+                await self._start_service()
+                names, creds = self.prepare_job(job)
+                automation = AsyncDefectAutomation(
+                    job.carrier, names, job.platform, creds, self.pool, self.config["settings"], self.config["form_plan"],
+                    job.overrides, keep_for_user=self.config["keep_for_user"], sink=self.sink,
+                    on_progress=lambda text: self.on_progress(job, text) if self.on_progress is not None else None)
+                job.result = await automation.run()
+        except asyncio.CancelledError:
+            job.state = CANCELLED
+            self._tasks.pop(job.id, None)
+            raise
+        except Exception as e:
+            job.result = str(e)
+        job.state = DONE
+        self._tasks.pop(job.id, None)
+        self.on_finished(job)
+
+    async def _start_service(self):
+        # Every job (and the warm up) waits on the same start, chromedriver is only launched once.
+        if self._service_started is None:
+            self._service_started = self.loop.create_task(self.service.start())
+        await asyncio.shield(self._service_started)
+
+    async def _recycle(self, interval):
+        # What the supervisor's thread does for the DriverPool, on the loop the pool belongs to.
+        while True:
+            await asyncio.sleep(interval)
+            await self.pool.recycle_idle()
+
+    async def _warm(self, creds, on_done):
+        try:
+            await self._start_service()
+            if creds is not None:
+                await self.pool.warm(creds)
+            result = "Success"
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            result = str(e)
+        finally:
+            self._warm_task = None
+        if on_done is not None:
+            on_done(result)
@@ -0,0 +1,432 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------
+#
+# (C) 2019 Isaak Meier
+# Released under MIT License
+# email isaakmeier12@gmail.com
+# icon made by Eucalyp from www.flaticon.com
+# -----------------------------------------------------------
+
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.common.keys import Keys
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium import webdriver
+from .browser_profile import create_profile
+from .driver_pool import DriverPool
+from .fast_fill import MENU_STATE_JS, can_fast_fill, fast_fill, menu_arguments
+from .instrumentation import NullSink, Timeline
+from .notify import UnresolvedNamesError, add_tags, missing_names, read_tags, wait_for_tags
+from .preflight import preflight_for, record_report, run_preflight
+from .retry import StepFailed, create_policies
+from .session_cache import create_session_cache
+from .supervisor import create_policy, create_supervisor
+from .waits import ReadinessWaiter
+import time
+
+# Paths on the site, appended to the "site.base_url" setting.
+LOGIN_PATH = '/login?ReturnUrl=%2fDefectsGrid%3fBugID%3d&BugID=#'
+GRID_PATH = '/DefectsGrid?BugID='
+
+def create_driver(chrome_driver_path, profile):
+    # Launches a new Chrome window for the DriverPool, set up the way the browser profile says.
+
+    # Arguments:
+    #     chrome_driver_path {str} -- the chromedriver to start
+    #     profile {BrowserProfile} -- arguments, prefs, page load strategy and blocked urls
+    options = Options()
+    for argument in profile.arguments():
+        options.add_argument(argument)
+    if profile.prefs():
+        options.add_experimental_option("prefs", profile.prefs())
+    capabilities = options.to_capabilities()
+    capabilities["pageLoadStrategy"] = profile.page_load_strategy()
+    driver = webdriver.Chrome(chrome_driver_path, desired_capabilities=capabilities)
+    if profile.blocked_urls:
+        block_urls(driver, profile.blocked_urls)
+    return driver
+
+def block_urls(driver, patterns):
+    # Tells the browser not to download anything matching the patterns ("*" is a wildcard).
+    # Only affects this window, which is the only one a pooled driver has.
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": patterns})
+    except Exception:
+        # An old chromedriver without the devtools commands, the pages just load everything.
+        pass
+
+def create_pool(settings, chrome_driver_path, headless=None, size=None, max_browsers=None):
+    # Builds the DriverPool every front end shares, sized from settings.json unless told otherwise.
+
+    # Arguments:
+    #     headless {bool} -- overrides "browser.headless" from settings.json, None to use it
+
+    # Returns:
+    #     DriverPool -- the pool, with no browsers launched yet
+    pool_settings = settings["driver_pool"]
+    base_url = settings["site"]["base_url"]
+    session_cache = create_session_cache(settings["session_cache"])
+    profile = create_profile(settings, headless)
+    supervisor = create_supervisor(settings["supervisor"])
+    pool = DriverPool(
+        lambda: create_driver(chrome_driver_path, profile),
+        lambda driver, creds: sign_in(driver, creds, base_url, session_cache),
+        form_closed,
+        size=pool_settings["size"] if size is None else size,
+        max_browsers=pool_settings["max_browsers"] if max_browsers is None else max_browsers,
+        policy=create_policy(settings["supervisor"], supervisor),
+        supervisor=supervisor)
+    supervisor.add_task(pool.recycle_idle)
+    supervisor.start()
+    return pool
+
+def sign_in(driver, creds, base_url, session_cache=None):
+    # Gets a browser logged in and onto the defects grid.
+    # If we have cookies from an earlier login they're tried first, which skips SSO
+    # entirely. When the site turns them down (or there are none) we log in for real
+    # and keep the new cookies for next time.
+    user = creds["user"]
+    if driver.find_elements_by_name('sso_id'):
+        # Already looking at the login page, so whatever session this browser had is gone.
+        if session_cache is not None:
+            session_cache.forget(user)
+    elif session_cache is not None and restore_session(driver, user, session_cache):
+        driver.get(url=base_url + GRID_PATH)
+        if not driver.find_elements_by_name('sso_id'):
+            WebDriverWait(driver, 5).until(EC.presence_of_element_located((By.ID,"header-menu-strSubNavButtons")))
+            return
+        session_cache.forget(user)
+    else:
+        driver.get(url=base_url + LOGIN_PATH)
+    submit_login(driver, creds)
+    if session_cache is not None:
+        try:
+            session_cache.save(driver, user)
+        except Exception:
+            pass
+
+def restore_session(driver, user, session_cache):
+    # Returns:
+    #     bool -- whether cached cookies were put into the browser
+    try:
+        return session_cache.restore(driver, user)
+    except Exception:
+        # An old chromedriver without the cookie commands, just log in normally.
+        return False
+
+def submit_login(driver, creds):
+    # Fills out the login form that's currently on screen.
+    email_input  = WebDriverWait(driver, 5).until(EC.element_to_be_clickable((By.NAME,'sso_id')))
+    pass_input = WebDriverWait(driver, 5).until(EC.element_to_be_clickable((By.NAME,'sso_password')))
+    email_input.send_keys(creds["user"])
+    pass_input.send_keys(creds["pass"])
+    login_btn  = WebDriverWait(driver, 5).until(EC.element_to_be_clickable((By.NAME,'btnLogin')))
+    login_btn.click()
+    WebDriverWait(driver, 5).until(EC.presence_of_element_located((By.ID,"header-menu-strSubNavButtons")))
+
+def form_closed(driver):
+    # The user is done with a browser once the Add Defect form isn't showing anymore,
+    # either because they saved the defect or because they cancelled it.
+    forms = driver.find_elements_by_id('AddDefectForm')
+    return not any(form.is_displayed() for form in forms)
+
+class DefectAutomation:
+    # Runs the selenium automation for one defect. Nothing in here knows about Qt,
+    # so the GUI (through ScriptRunner) and the command line share the same code.
+
+    def __init__(self, carrier, specific_names, platform, creds, driver_pool, settings, form_plan, overrides=None, keep_for_user=True, sink=None, on_progress=None):
+        # Sets the data up to be used with the script.
+
+        # Arguments:
+        #     carrier {str} -- ATT, Sprint, TMO, or Verizon
+        #     specific_names {list} -- list of the names to put into the defect
+        #     platform {str} -- iOS or Android
+        #     creds {dict} -- email and password
+        #     driver_pool {DriverPool} -- where we borrow a logged in browser from
+        #     settings {dict} -- everything from settings.json
+        #     form_plan {FormPlan} -- the steps and locators of the Add Defect form
+        #     overrides {dict} -- optional "title" and "description" to use instead of the defaults
+        #     keep_for_user {bool} -- leave the filled form open for the user, or hand the browser straight back
+        #     sink {object} -- where timing events go, anything with emit(event)
+        #     on_progress {callable} -- called with a short status string as the run moves through its steps
+        self.carrier = carrier
+        self.specific_names = specific_names
+        self.platform = platform
+        self.creds = creds
+        self.driver_pool = driver_pool
+        self.settings = settings
+        self.overrides = overrides or {}
+        self.keep_for_user = keep_for_user
+        self.form_plan = form_plan
+        self.fast_fill = settings["fast_fill"]["enabled"]
+        self.retries = create_policies(settings)
+        # Names of the steps that are done, in order. A failed step is retried from here.
+        self.completed = []
+        self.sink = sink or NullSink()
+        self.on_progress = on_progress
+        self.actions = {
+            "type": self.type_text,
+            "type_in_frame": self.type_in_frame,
+            "choose": self.choose,
+            "scroll": self.scroll_to_bottom,
+            "tags": self.put_names,
+        }
+
+    def run(self):
+        # Borrows a browser from the pool and calls the main execute_script method.
+
+        # Returns:
+        #     str -- "Success", or the error message if something went wrong
+        self.timeline = Timeline(self.sink, self.carrier, self.platform, self.on_progress)
+        try:
+            with self.timeline.step("acquire_browser", "Waiting for a browser"):
+                self.session = self.driver_pool.acquire(self.creds)
+        except Exception as e:
+            self.timeline.finish(str(e))
+            return str(e)
+        self.driver = self.session.driver
+        self.waiter = ReadinessWaiter(self.driver, self.settings["waits"], self.timeline.wait)
+        result = "Success"
+        try:
+            self.execute_script()
+        except Exception as e:
+            result = str(e)
+        finally:
+            self.timeline.finish(result)
+            if self.keep_for_user:
+                # The filled (or half filled) form is left for the user to finish,
+                # the pool takes the browser back once they've saved or cancelled it.
+                self.driver_pool.hand_off(self.session)
+            else:
+                self.driver_pool.release(self.session)
+        return result
+
+    def open_defect_form(self):
+        # Takes the pooled browser back to the defects grid and opens a new Add Defect form.
+        # If the site logged us out since the last defect, log in again first.
+        self.driver.get(url=self.settings["site"]["base_url"] + GRID_PATH)
+        if self.driver.find_elements_by_name('sso_id'):
+            self.driver_pool.sign_in(self.driver, self.creds)
+        self.wait_until(EC.presence_of_element_located((By.ID,"header-menu-strSubNavButtons")), "open_form.header")
+        create_btn = self.wait_until(EC.element_to_be_clickable((By.CLASS_NAME,"btn-secondary")), "open_form.create")
+        # Hooked before the click, so the requests the form makes while it opens are counted.
+        self.waiter.install()
+        self.driver.execute_script("arguments[0].click();", create_btn)
+
+    def execute_plan(self, steps):
+        # Runs the compiled form plan in order, timing every step. With fast fill on,
+        # runs of chosen.js dropdowns are set together in one script call. A step with
+        # a wait ends its batch, because the fields after it depend on it (Product -> Release).
+        batch = []
+        for number, step in enumerate(steps, 1):
+            if self.fast_fill and can_fast_fill(step):
+                batch.append(step)
+                if step.wait:
+                    self.fill_batch(batch, number, len(steps))
+                    batch = []
+                continue
+            self.fill_batch(batch, number - 1, len(steps))
+            batch = []
+            self.checkpoint(step.name, f"{step.name} ({number}/{len(steps)})", lambda retry, step=step: self.perform(step, retry), [step])
+        self.fill_batch(batch, len(steps), len(steps))
+
+    def checkpoint(self, name, progress, work, steps=()):
+        # Runs one step (or a batch of them) as a checkpoint. If it fails with an error
+        # that has a retry policy, it's tried again on the same form after a backoff.
+        # work is called with retry=True then, so it checks what the failed try already did first.
+
+        # Raises:
+        #     StepFailed: the step failed and is out of tries
+        attempt = 1
+        while True:
+            try:
+                with self.timeline.step(name, progress if attempt == 1 else f"{progress}, try {attempt}"):
+                    work(attempt > 1)
+                break
+            except Exception as e:
+                delay = self.retries.delay_for(e, attempt) if self.retries is not None else None
+                if delay is None:
+                    raise StepFailed(name, e, len(self.completed), len(self.form_plan.steps_for(self.carrier, self.platform)))
+                self.timeline.emit("retry", name, delay, error=type(e).__name__, attempt=attempt)
+                self.recover()
+                time.sleep(delay)
+                attempt += 1
+        self.completed.extend(step.name for step in steps)
+
+    def recover(self):
+        # Gets the browser back to the page itself before a retry, a failed try may have been in a frame.
+        try:
+            self.driver.switch_to.default_content()
+        except Exception:
+            pass
+
+    def perform(self, step, retry=False):
+        if retry:
+            self.redo(step)
+        else:
+            self.actions[step.action](step)
+        self.after_step(step)
+
+    def redo(self, step):
+        # A step's next try. Looks at what the failed try left behind first, so
+        # nothing ends up in the form twice.
+        if step.action == "type":
+            field = self.wait_until(EC.presence_of_element_located(step.target), f"{step.name}.target")
+            if field.get_attribute("value") != self.step_text(step):
+                field.clear()
+                field.send_keys(self.step_text(step))
+        elif step.action == "type_in_frame":
+            self.driver.switch_to.frame(step.frame)
+            try:
+                field = self.wait_until(EC.presence_of_element_located(step.target), f"{step.name}.target")
+                if field.text.split() != self.step_text(step).split():
+                    self.driver.execute_script("arguments[0].innerHTML = '';", field)
+                    field.send_keys(self.step_text(step))
+            finally:
+                self.driver.switch_to.default_content()
+        elif step.action == "choose" and self.fast_fill and can_fast_fill(step):
+            # Setting the <select> again is harmless, clicking a multi-select's entry again isn't.
+            for failed in fast_fill(self.driver, [step]):
+                self.rechoose(failed)
+        elif step.action == "choose":
+            self.rechoose(step)
+        elif step.action == "tags":
+            self.put_names(step, retry=True)
+        else:
+            self.actions[step.action](step)
+
+    def rechoose(self, step):
+        # Clicks a dropdown's entry again, unless the failed try got it in after all.
+        # A try that failed on the entry usually leaves the menu open, and clicking
+        # the toggle then would close it, so it's shut first.
+        arguments = menu_arguments(step)
+        if arguments is None:
+            self.choose(step)
+            return
+        state = self.driver.execute_script(MENU_STATE_JS, *arguments)
+        if state["done"]:
+            return
+        if state["open"]:
+            self.driver.switch_to.active_element.send_keys(Keys.ESCAPE)
+            if self.driver.execute_script(MENU_STATE_JS, *arguments)["open"]:
+                # The menu doesn't close on Escape, it closes the way it opened.
+                self.wait_until(EC.element_to_be_clickable(step.toggle), f"{step.name}.toggle").click()
+        self.choose(step)
+
+    def fill_batch(self, steps, number, total):
+        # Fast fills a batch of dropdowns, anything that didn't stick gets clicked the old way.
+        # Filling the batch again is harmless. On a retry the clicks check each dropdown first, like redo.
+        if not steps:
+            return
+        names = [step.name for step in steps]
+        self.checkpoint("fast_fill:" + "+".join(names), f"{', '.join(names)} ({number}/{total})", lambda retry: self.fill_and_check(steps, retry), steps)
+
+    def fill_and_check(self, steps, retry=False):
+        for step in fast_fill(self.driver, steps):
+            if retry:
+                self.rechoose(step)
+            else:
+                self.choose(step)
+        self.after_step(steps[-1])
+
+    def after_step(self, step):
+        if step.action == "scroll":
+            self.waiter.wait_until_scrolled(step.wait or "scroll")
+        elif step.wait:
+            # Some dropdowns put up a loading overlay that will intercept clicks unless we wait for it.
+            self.waiter.wait_until_ready(step.wait)
+
+    def step_text(self, step):
+        # The text for a step, from the job's overrides if it has one.
+        if step.override and step.override in self.overrides:
+            return self.overrides[step.override]
+        return step.text.format(carrier=self.carrier, platform=self.platform)
+
+    def wait_until(self, condition, label, timeout=5):
+        # A WebDriverWait that records how long it took under the given label.
+        started = time.perf_counter()
+        try:
+            element = WebDriverWait(self.driver, timeout).until(condition)
+        except Exception:
+            self.timeline.wait(label, time.perf_counter() - started, ok=False)
+            raise
+        self.timeline.wait(label, time.perf_counter() - started)
+        return element
+
+    def type_text(self, step):
+        field = self.wait_until(EC.presence_of_element_located(step.target), f"{step.name}.target")
+        field.send_keys(self.step_text(step))
+
+    def type_in_frame(self, step):
+        # switch to iframe
+        self.driver.switch_to.frame(step.frame)
+        try:
+            field = self.wait_until(EC.presence_of_element_located(step.target), f"{step.name}.target")
+            field.send_keys(self.step_text(step))
+        finally:
+            self.driver.switch_to.default_content()
+
+    def choose(self, step):
+        # Opens a dropdown and clicks one of its entries.
+        dropdown = self.wait_until(EC.element_to_be_clickable(step.toggle), f"{step.name}.toggle")
+        dropdown.click()
+        button = self.wait_until(EC.element_to_be_clickable(step.option), f"{step.name}.option")
+        button.click()
+
+    def scroll_to_bottom(self, step):
+        # scroll to bottom of doc, hard
+        self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+        html = self.driver.find_element_by_tag_name('html')
+        html.send_keys(Keys.END)
+
+    def put_names(self, step, retry=False):
+        # Puts every name on the notify list, then checks which ones the widget actually took.
+        # Big rosters go in as chunks of script calls instead of one send_keys per name.
+        # A retry only puts in the names that aren't tags yet.
+
+        # Raises:
+        #     UnresolvedNamesError: some names never showed up as tags
+        notify = self.settings["notify"]
+        notify_textarea = self.driver.find_element(*step.target)
+        names = missing_names(self.specific_names, read_tags(self.driver, notify_textarea)) if retry else self.specific_names
+        if notify["bulk"]:
+            add_tags(self.driver, notify_textarea, names, notify["chunk_size"])
+        else:
+            for name in names:
+                notify_textarea.send_keys(name + Keys.TAB)
+        started = time.perf_counter()
+        tags = wait_for_tags(self.driver, notify_textarea, self.specific_names, notify["confirm_timeout"], notify["settle_ms"], self.settings["waits"]["poll"])
+        missing = missing_names(self.specific_names, tags)
+        self.timeline.wait(f"{step.name}.confirm", time.perf_counter() - started, ok=not missing)
+        if missing:
+            raise UnresolvedNamesError(missing)
+
+    def execute_script(self):
+        # The meat of the script.
+
+        # Raises:
+        #     StepFailed: a step failed and was out of retries. Wraps what went wrong, most likely an
+        #        ElementClickInterceptedException or a NoSuchElementException. We just display this message
+        #        to the user, because if something goes wrong it means the site's code has changed and some
+        #        locator in form_plan.json needs to be updated.
+        steps = self.form_plan.steps_for(self.carrier, self.platform)
+        # Opening the form starts from the grid every time, so a retry just does it again.
+        self.checkpoint("open_form", "Opening the form", lambda retry: self.open_defect_form())
+        if self.settings["preflight"]["enabled"]:
+            with self.timeline.step("preflight", "Checking the form"):
+                self.check_form()
+        self.execute_plan(steps)
+
+    def check_form(self):
+        # Looks for every locator the plan needs in one script call, before any field is touched.
+
+        # Raises:
+        #     PreflightError: the form has changed, and "preflight.abort" is on
+        preflight = self.settings["preflight"]
+        started = time.perf_counter()
+        report = run_preflight(self.driver, preflight_for(self.form_plan), self.carrier, self.platform,
+                               preflight["timeout"], self.settings["waits"]["poll"])
+        record_report(self.timeline, report, time.perf_counter() - started, preflight["abort"])
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------
+#
+# (C) 2019 Isaak Meier
+# Released under MIT License
+# email isaakmeier12@gmail.com
+# icon made by Eucalyp from www.flaticon.com
+# -----------------------------------------------------------
+
+# Chrome content settings: 2 means blocked.
+LEAN_PREFS = {
+    "profile.managed_default_content_settings.images": 2,
+    "profile.default_content_setting_values.notifications": 2,
+}
+
+LEAN_ARGUMENTS = ["--disable-extensions", "--disable-gpu"]
+
+
+class BrowserProfile:
+    # How Chrome is started, from the "browser" section of settings.json. Both
+    # automation.create_driver and the async engine build their browsers from this.
+    #
+    # The "lean" profile leaves out everything the automation never looks at: images,
+    # web fonts and tracking scripts aren't downloaded, extensions and the GPU are
+    # off, and a page counts as loaded once its HTML is parsed instead of after its
+    # last image. "default" is Chrome as it comes.
+
+    def __init__(self, settings, headless=None):
+        # Arguments:
+        #     settings {dict} -- the "browser" section of settings.json
+        #     headless {bool} -- overrides the "headless" setting, None to use it
+        self.lean = settings["profile"] == "lean"
+        self.headless = settings["headless"] if headless is None else headless
+        self.blocked_urls = list(settings["blocked_urls"]) if self.lean else []
+
+    def arguments(self):
+        # Returns:
+        #     list -- command line switches for Chrome
+        arguments = list(LEAN_ARGUMENTS) if self.lean else []
+        if self.headless:
+            # Headless runs have no screen, so they get a fixed desktop sized window
+            # to keep the same layout (and the same xpaths) as a normal run.
+            arguments += ["--headless", "--window-size=1920,1080"]
+        return arguments
+
+    def prefs(self):
+        # Returns:
+        #     dict -- Chrome preferences, empty for the default profile
+        return dict(LEAN_PREFS) if self.lean else {}
+
+    def page_load_strategy(self):
+        # Returns:
+        #     str -- "eager" returns from a page load at DOMContentLoaded, "normal" waits for the load event
+        return "eager" if self.lean else "normal"
+
+
+def create_profile(settings, headless=None):
+    # Returns:
+    #     BrowserProfile -- the profile described by settings.json
+    return BrowserProfile(settings["browser"], headless)
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------
+# Command line entry point for the automation, no Qt involved.
+#
+#     python -m agilecraft_automation run --carrier TMO --platform iOS
+#     python -m agilecraft_automation batch defects.json
+#     python -m agilecraft_automation report
+#
+# (C) 2019 Isaak Meier
+# Released under MIT License
+# email isaakmeier12@gmail.com
+# icon made by Eucalyp from www.flaticon.com
+# -----------------------------------------------------------
+
+import argparse
+import json
+import os
+import sys
+
+from .instrumentation import create_sink, format_report, read_events
+from .settings import load_settings
+from .store import create_store
+
+# Same files the GUI uses, so the command line picks up the same names and settings.
+RESOURCES = os.path.normpath(os.path.join(os.path.dirname(__file__), '..', '..', 'resources', 'base'))
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="agilecraft_automation", description="Fill out AgileCraft defects without the GUI.")
+    parser.add_argument("--names", default=os.path.join(RESOURCES, "names.json"), help="names.json to import if the store is still empty")
+    parser.add_argument("--store", default=None, help="roster and credentials database, defaults to the one in settings.json")
+    parser.add_argument("--settings", default=os.path.join(RESOURCES, "settings.json"), help="json settings file")
+    parser.add_argument("--plan", default=os.path.join(RESOURCES, "form_plan.json"), help="json description of the Add Defect form")
+    parser.add_argument("--chromedriver", default=None, help="path to chromedriver, defaults to the bundled one or the one on PATH")
+    parser.add_argument("--visible", action="store_true", help="show the browser instead of running headless")
+    commands = parser.add_subparsers(dest="command")
+    commands.required = True
+
+    run = commands.add_parser("run", help="fill out a single defect")
+    run.add_argument("--carrier", required=True, help="ATT, Sprint, TMO, or Verizon")
+    run.add_argument("--platform", required=True, help="iOS or Android")
+    run.add_argument("--title", help="defect title instead of the default")
+
+    batch = commands.add_parser("batch", help="fill out every defect in a json batch file")
+    batch.add_argument("file", help='json list of {"carrier": ..., "platform": ..., "overrides": {...}}')
+
+    report = commands.add_parser("report", help="p50/p95 timings per step across recorded runs")
+    report.add_argument("--events", help="json lines events file, defaults to the one in settings.json")
+    return parser
+
+
+def read_creds(store):
+    # Environment variables win over the store, so CI doesn't need it edited.
+    stored = store.creds() or {}
+    user = os.environ.get("AGILECRAFT_USER", stored.get("user", ""))
+    password = os.environ.get("AGILECRAFT_PASS", stored.get("pass", ""))
+    if not user:
+        return None
+    return {"user": user, "pass": password}
+
+
+def find_chromedriver(path):
+    if path:
+        return path
+    bundled = os.path.join(RESOURCES, "chromedriver")
+    return bundled if os.path.exists(bundled) else "chromedriver"
+
+
+def run_jobs(args, store, creds, settings, entries):
+    # Runs every (carrier, platform, overrides) entry through the scheduler and prints the results.
+
+    # Returns:
+    #     int -- exit code, EXIT_FAILED if any defect failed
+    chrome_driver_path = find_chromedriver(args.chromedriver)
+    workers = min(settings["scheduler"]["max_workers"], len(entries))
+
+    def job_names(job):
+        return job.overrides["names"] if "names" in job.overrides else store.names(job.carrier, job.platform)
+
+    def report(job):
+        print(f"[job {job.id}] {job.carrier} {job.platform}: {job.result}", flush=True)
+
+    if settings["scheduler"]["mode"] == "processes":
+        from .process_pool import ProcessScheduler
+
+        config = {"settings": settings, "plan_path": args.plan, "chrome_driver_path": chrome_driver_path,
+                  "headless": not args.visible, "keep_for_user": False, "max_browsers": 1}
+        scheduler = ProcessScheduler(config, lambda job: (job_names(job), creds), report,
+                                     sink=create_sink(settings["instrumentation"]), max_workers=workers,
+                                     stall_timeout=settings["scheduler"]["stall_timeout"])
+        jobs = scheduler.submit_batch(entries)
+        scheduler.shutdown(wait=True)
+        return EXIT_OK if all(job.result == "Success" for job in jobs) else EXIT_FAILED
+
+    if settings["scheduler"]["mode"] == "async":
+        from .async_engine import AsyncScheduler
+        from .form_plan import load_form_plan
+
+        config = {"settings": settings, "form_plan": load_form_plan(args.plan), "chrome_driver_path": chrome_driver_path,
+                  "headless": not args.visible, "keep_for_user": False}
+        scheduler = AsyncScheduler(config, lambda job: (job_names(job), creds), report,
+                                   sink=create_sink(settings["instrumentation"]), max_workers=workers)
+        jobs = scheduler.submit_batch(entries)
+        scheduler.shutdown(wait=True)
+        return EXIT_OK if all(job.result == "Success" for job in jobs) else EXIT_FAILED
+
+    # Selenium is only imported once there's actual work, so --help and bad arguments stay fast.
+    from .automation import DefectAutomation, create_pool
+    from .direct_submit import DirectDefect, create_submitter
+    from .form_plan import load_form_plan
+    from .scheduler import JobScheduler
+
+    form_plan = load_form_plan(args.plan)
+    sink = create_sink(settings["instrumentation"])
+    pool = create_pool(settings, chrome_driver_path, headless=not args.visible, size=workers, max_browsers=workers)
+    submitter = create_submitter(settings, form_plan)
+
+    def run_job(job):
+        automation = DefectAutomation(job.carrier, job_names(job), job.platform, creds, pool, settings, form_plan, job.overrides,
+                                      keep_for_user=False, sink=sink)
+        if submitter is None:
+            return automation.run()
+        fallback = automation.run if settings["direct_submit"]["fallback"] else None
+        return DirectDefect(job.carrier, job_names(job), job.platform, creds, submitter, form_plan, job.overrides,
+                            fallback=fallback, sink=sink).run()
+
+    scheduler = JobScheduler(run_job, report, max_workers=workers)
+    jobs = scheduler.submit_batch(entries)
+    scheduler.shutdown(wait=True)
+    pool.close()
+    if submitter is not None:
+        submitter.close()
+    return EXIT_OK if all(job.result == "Success" for job in jobs) else EXIT_FAILED
+
+
+def report(path):
+    try:
+        events = read_events(path)
+    except FileNotFoundError:
+        print(f"No events recorded yet at {path}.", file=sys.stderr)
+        return EXIT_FAILED
+    print(format_report(events))
+    return EXIT_OK
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    settings = load_settings(args.settings)
+    if args.command == "report":
+        return report(args.events or settings["instrumentation"]["events_file"])
+
+    store_settings = {"path": args.store} if args.store else settings["store"]
+    store = create_store(store_settings, args.names)
+    try:
+        return run_command(args, store, settings)
+    finally:
+        store.close()
+
+
+def run_command(args, store, settings):
+    creds = read_creds(store)
+    if creds is None:
+        print("No credentials. Set AGILECRAFT_USER and AGILECRAFT_PASS or set them in the app.", file=sys.stderr)
+        return EXIT_USAGE
+
+    if args.command == "run":
+        overrides = {"title": args.title} if args.title else {}
+        entries = [(args.carrier, args.platform, overrides)]
+    else:
+        with open(args.file) as json_file:
+            entries = [(entry["carrier"], entry["platform"], entry.get("overrides", {})) for entry in json.load(json_file)]
+
+    unknown = sorted({f"{carrier} {platform}" for carrier, platform, _ in entries if not store.has_roster(carrier, platform)})
+    if unknown:
+        print(f"No names set up for: {', '.join(unknown)}", file=sys.stderr)
+        return EXIT_USAGE
+    if not entries:
+        return EXIT_OK
+    return run_jobs(args, store, creds, settings, entries)
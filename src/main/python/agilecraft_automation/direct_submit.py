@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------
+#
+# (C) 2019 Isaak Meier
+# Released under MIT License
+# email isaakmeier12@gmail.com
+# icon made by Eucalyp from www.flaticon.com
+# -----------------------------------------------------------
+
+from urllib.parse import urlencode, urlsplit
+import json
+
+import urllib3
+
+from .instrumentation import NullSink, Timeline
+from .session_cache import create_session_cache
+
+# Answers that mean the site wants a login first. Nothing was created.
+SIGNED_OUT_STATUSES = (301, 302, 303, 401, 403)
+
+
+class DirectSubmitError(Exception):
+    # The defect couldn't be posted, and nothing was created on the site,
+    # so it's safe to fill it out in a browser instead.
+    pass
+
+
+class NotSignedIn(DirectSubmitError):
+    # There are no usable login cookies, or the site turned them down.
+    pass
+
+
+class SubmitUncertain(Exception):
+    # The request went out but the site never confirmed it. The defect may or may
+    # not exist, so it's not tried again in a browser.
+    pass
+
+
+def build_payload(steps, carrier, platform, names, overrides):
+    # Turns the compiled form plan into the fields the form would post:
+    # typed text (or its override), the value of every chosen option and the notify list.
+
+    # Returns:
+    #     dict -- field name to value
+
+    # Raises:
+    #     DirectSubmitError: a step doesn't say which field it sets, or what a choice sends
+    payload = {}
+    for step in steps:
+        if step.action == "scroll":
+            continue
+        if step.field is None:
+            raise DirectSubmitError(f"Step '{step.name}' has no \"field\" in the form plan, so it can't be posted directly.")
+        if step.action == "tags":
+            payload[step.field] = list(names)
+        elif step.action in ("type", "type_in_frame"):
+            if step.override and step.override in overrides:
+                payload[step.field] = overrides[step.override]
+            else:
+                payload[step.field] = step.text.format(carrier=carrier, platform=platform)
+        elif step.value is None:
+            raise DirectSubmitError(f"Step '{step.name}' has no \"value\" for {carrier} {platform} in the form plan.")
+        else:
+            payload[step.field] = step.value
+    return payload
+
+
+def cookie_header(cookies, url):
+    # Picks the cookies a browser would send to url, from what the session cache saved.
+
+    # Returns:
+    #     str -- the Cookie header, empty if none apply
+    parts = urlsplit(url)
+    host = parts.hostname or ""
+    path = parts.path or "/"
+    sent = []
+    for cookie in cookies:
+        domain = cookie.get("domain", host).lstrip(".")
+        if host != domain and not host.endswith("." + domain):
+            continue
+        if not path.startswith(cookie.get("path", "/")):
+            continue
+        if cookie.get("secure") and parts.scheme != "https":
+            continue
+        sent.append(f"{cookie['name']}={cookie['value']}")
+    return "; ".join(sent)
+
+
+class DirectSubmitter:
+    # Files defects by posting the Add Defect form's fields straight to the site,
+    # logged in with the cookies the last browser login left in the session cache.
+    # There are no page loads and no browser: one request per defect, over
+    # connections that are kept open between defects.
+    #
+    # Thread safe, so every scheduler worker can share one.
+
+    def __init__(self, base_url, submit, session_cache, max_connections=8, timeout=30):
+        # Arguments:
+        #     base_url {str} -- where AgileCraft lives
+        #     submit {dict} -- the "submit" section of form_plan.json, None if it has none
+        #     session_cache {SessionCache} -- where the login cookies come from
+        #     max_connections {int} -- connections kept open to the site
+        #     timeout {float} -- seconds to wait for the site to answer
+        self.base_url = base_url
+        self.submit_spec = submit
+        self.session_cache = session_cache
+        self.http = urllib3.PoolManager(maxsize=max(max_connections, 1), block=True,
+                                        timeout=urllib3.Timeout(total=timeout), retries=False)
+
+    def submit(self, user, payload):
+        # Posts one defect.
+
+        # Returns:
+        #     str -- the site's answer, usually the new defect
+
+        # Raises:
+        #     DirectSubmitError: nothing was created, it can be filled in a browser instead
+        #     SubmitUncertain: the site may or may not have the defect now
+        if self.submit_spec is None:
+            raise DirectSubmitError("form_plan.json has no \"submit\" section, so there's nowhere to post defects to.")
+        cookies = self.session_cache.usable_cookies(user) if self.session_cache is not None else None
+        if not cookies:
+            raise NotSignedIn("There's no recent browser login to post with.")
+        url = self.base_url + self.submit_spec["path"]
+        headers = {"Cookie": cookie_header(cookies, url), "X-Requested-With": "XMLHttpRequest"}
+        if self.submit_spec.get("encoding", "json") == "form":
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+            body = urlencode(payload, doseq=True)
+        else:
+            headers["Content-Type"] = "application/json"
+            body = json.dumps(payload)
+        try:
+            response = self.http.request("POST", url, body=body, headers=headers, redirect=False)
+        except urllib3.exceptions.NewConnectionError as e:
+            # Never got as far as sending anything.
+            raise DirectSubmitError(f"Couldn't reach {self.base_url}: {e}")
+        except urllib3.exceptions.HTTPError as e:
+            raise SubmitUncertain(f"The site didn't answer ({e}). Check AgileCraft before trying again, the defect may have been created.")
+        if response.status in SIGNED_OUT_STATUSES:
+            self.session_cache.forget(user)
+            raise NotSignedIn("The site turned down the saved login.")
+        if 400 <= response.status < 500:
+            raise DirectSubmitError(f"The site rejected the defect ({response.status}): {response.data.decode(errors='replace')[:200]}")
+        if response.status >= 300:
+            raise SubmitUncertain(f"The site answered {response.status}. Check AgileCraft before trying again, the defect may have been created.")
+        return response.data.decode(errors="replace")
+
+    def close(self):
+        self.http.clear()
+
+
+class DirectDefect:
+    # The DefectAutomation of the direct backend. Posts one defect and, when that
+    # can't be done without a browser, hands it to the browser automation instead.
+    # A browser run also logs in and refreshes the cookies, so the next defect can
+    # usually be posted directly again.
+
+    def __init__(self, carrier, specific_names, platform, creds, submitter, form_plan, overrides=None, fallback=None, sink=None, on_progress=None):
+        # Arguments:
+        #     carrier {str} -- ATT, Sprint, TMO, or Verizon
+        #     specific_names {list} -- list of the names to put into the defect
+        #     platform {str} -- iOS or Android
+        #     creds {dict} -- email and password
+        #     submitter {DirectSubmitter} -- shared by every defect
+        #     form_plan {FormPlan} -- says which field each step sets
+        #     overrides {dict} -- optional "title" and "description" to use instead of the defaults
+        #     fallback {callable} -- fills the defect in a browser and returns its result, None to just report the error
+        #     sink {object} -- where timing events go, anything with emit(event)
+        #     on_progress {callable} -- called with a short status string as the run moves along
+        self.carrier = carrier
+        self.specific_names = specific_names
+        self.platform = platform
+        self.creds = creds
+        self.submitter = submitter
+        self.form_plan = form_plan
+        self.overrides = overrides or {}
+        self.fallback = fallback
+        self.sink = sink or NullSink()
+        self.on_progress = on_progress
+
+    def run(self):
+        # Returns:
+        #     str -- "Success", or the error message if something went wrong
+        timeline = Timeline(self.sink, self.carrier, self.platform, self.on_progress)
+        try:
+            with timeline.step("submit", "Submitting"):
+                steps = self.form_plan.steps_for(self.carrier, self.platform)
+                payload = build_payload(steps, self.carrier, self.platform, self.specific_names, self.overrides)
+                self.submitter.submit(self.creds["user"], payload)
+        except DirectSubmitError as e:
+            if self.fallback is None:
+                timeline.finish(str(e))
+                return str(e)
+            # The browser run records its own timings.
+            timeline.progress("Filling out in a browser")
+            return self.fallback()
+        except Exception as e:
+            timeline.finish(str(e))
+            return str(e)
+        timeline.finish("Success")
+        return "Success"
+
+
+def create_submitter(settings, form_plan):
+    # Builds the direct backend from settings.json and the form plan.
+
+    # Returns:
+    #     DirectSubmitter -- or None when "direct_submit" is turned off
+    if not settings["direct_submit"]["enabled"]:
+        return None
+    return DirectSubmitter(settings["site"]["base_url"], form_plan.submit, create_session_cache(settings["session_cache"]),
+                           max_connections=settings["direct_submit"]["max_connections"],
+                           timeout=settings["direct_submit"]["timeout"])
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------
+#
+# (C) 2019 Isaak Meier
+# Released under MIT License
+# email isaakmeier12@gmail.com
+# icon made by Eucalyp from www.flaticon.com
+# -----------------------------------------------------------
+
+import threading
+import time
+
+from .supervisor import driver_pid
+
+# How often a job waiting for a free browser checks whether the user
+# has finished with one of the forms we handed them.
+RECLAIM_INTERVAL = 1.0
+
+
+class PooledSession:
+    # A single browser owned by the DriverPool.
+
+    # Attributes:
+    #     driver (WebDriver): the selenium driver for this browser
+    #     user (str): the email this browser is logged in as, None if it was warmed up without a login
+    #     created (float): when the browser was launched
+    #     jobs (int): how many defects this browser has been used for
+    #     idle_since (float): when the browser last went back to the idle list
+    def __init__(self, driver, user):
+        self.driver = driver
+        self.user = user
+        self.created = time.time()
+        self.jobs = 0
+        self.idle_since = self.created
+
+
+class DriverPool:
+    # Keeps a few warm, already logged in Chrome sessions around so a defect
+    # doesn't pay for browser startup and SSO every time a button is clicked.
+    #
+    # A job borrows a session with acquire(). When the form is filled the job
+    # calls hand_off(), which leaves the browser with the user so they can finish
+    # and save the defect. Once the form is gone the session goes back to the idle
+    # list for the next job. Jobs that don't need the user use release() instead.
+    # Dead browsers (crashed, or closed by the user) are quit and replaced, and so
+    # are browsers the recycle policy says have done enough (see RecyclePolicy).
+
+    def __init__(self, create_driver, sign_in, is_reusable, size=2, max_browsers=4, policy=None, supervisor=None):
+        # Arguments:
+        #     create_driver {callable} -- launches and returns a new webdriver
+        #     sign_in {callable} -- called with (driver, creds) to log a new browser in
+        #     is_reusable {callable} -- called with a driver, True once the user is done with the form
+        #     size {int} -- how many idle sessions to keep warm
+        #     max_browsers {int} -- cap on how many browsers can be open at once
+        #     policy {RecyclePolicy} -- when a browser is replaced instead of reused, None to keep them until they die
+        #     supervisor {ResourceSupervisor} -- tracks every browser's processes, None to not track them
+        self.create_driver = create_driver
+        self.sign_in = sign_in
+        self.is_reusable = is_reusable
+        self.size = size
+        self.max_browsers = max(max_browsers, 1)
+        self.policy = policy
+        self.supervisor = supervisor
+        self.recycled = 0
+        self._idle = []
+        self._handed_off = []
+        self._live = 0
+        self._warming = 0
+        self._waiting_for_warm = 0
+        self._closed = False
+        self._lock = threading.Condition()
+
+    def acquire(self, creds):
+        # Borrows a logged in session, launching one if there's room.
+        # Blocks while max_browsers are already open and busy.
+
+        # Returns:
+        #     PooledSession -- the session, owned by the caller until released or handed off
+        while True:
+            self.reclaim()
+            with self._lock:
+                if self._closed:
+                    raise RuntimeError("The browser pool has been shut down.")
+                if self._idle:
+                    session = self._idle.pop()
+                elif self._waiting_for_warm < self._warming:
+                    # A browser that's warming up will be idle before a new one could be launched.
+                    self._waiting_for_warm += 1
+                    self._lock.wait(RECLAIM_INTERVAL)
+                    self._waiting_for_warm -= 1
+                    continue
+                elif self._live < self.max_browsers:
+                    self._live += 1
+                    session = None
+                else:
+                    self._lock.wait(RECLAIM_INTERVAL)
+                    continue
+            if session is None:
+                session = self._launch(creds)
+            elif session.user is None and self.is_alive(session):
+                # Warmed up before anyone had logged in, so it's logged in now.
+                try:
+                    self.sign_in(session.driver, creds)
+                except Exception:
+                    self._discard(session)
+                    raise
+                session.user = creds["user"]
+            elif session.user != creds["user"] or not self.is_alive(session):
+                # Either the credentials changed or the browser died, replace it.
+                self._discard(session)
+                continue
+            elif self._should_recycle(session):
+                self._discard(session)
+                continue
+            session.jobs += 1
+            return session
+
+    def release(self, session):
+        # Gives a session straight back to the pool.
+        # If enough sessions are already warm, the browser is quit instead.
+        if self.is_alive(session) and self._park(session):
+            return
+        self._discard(session)
+
+    def hand_off(self, session):
+        # Leaves the session with the user. It is reclaimed once they are done with the form.
+        with self._lock:
+            self._handed_off.append(session)
+            self._lock.notify_all()
+
+    def reclaim(self):
+        # Checks the sessions left with the user and takes back the ones they're done with.
+        with self._lock:
+            waiting = self._handed_off
+            self._handed_off = []
+        still_busy = []
+        for session in waiting:
+            if not self.is_alive(session):
+                self._discard(session)
+            elif self._is_done(session):
+                if not self._park(session):
+                    self._discard(session)
+            else:
+                still_busy.append(session)
+        with self._lock:
+            self._handed_off.extend(still_busy)
+
+    def warm(self, creds, count=None):
+        # Launches and logs in browsers until `count` sessions (at most `size`) are waiting idle.
+        # Jobs that need a browser meanwhile wait for these instead of launching their own.
+
+        # Arguments:
+        #     creds {dict} -- the login, None to only start the browsers and log them in on first use
+        #     count {int} -- how many idle sessions to warm, None for `size`
+        count = self.size if count is None else min(count, self.size)
+        while True:
+            with self._lock:
+                if self._closed or len(self._idle) >= count or self._live >= self.max_browsers:
+                    return
+                self._live += 1
+                self._warming += 1
+            try:
+                session = self._launch(creds)
+            finally:
+                with self._lock:
+                    self._warming -= 1
+                    self._lock.notify_all()
+            if not self._park(session):
+                self._discard(session)
+                return
+
+    def recycle_idle(self):
+        # Quits browsers that have sat idle longer than the policy allows. The supervisor runs this regularly.
+        if self.policy is None or not self.policy.max_idle:
+            return
+        with self._lock:
+            stale = [session for session in self._idle if self.policy.idle_too_long(session.idle_since)]
+            self._idle = [session for session in self._idle if session not in stale]
+            self.recycled += len(stale)
+        for session in stale:
+            self._discard(session)
+
+    def close(self, quit_open=False):
+        # Quits every idle browser, and the ones the user is done with. Sessions with a
+        # form still open are left alone, so closing the app doesn't throw away a defect
+        # they haven't saved yet. Those are the user's from now on and aren't tracked anymore.
+
+        # Arguments:
+        #     quit_open {bool} -- quit the browsers with an open form too
+        with self._lock:
+            self._closed = True
+            idle = self._idle
+            self._idle = []
+            handed_off = self._handed_off
+            self._handed_off = []
+        # The user's browsers go first, the process scheduler may not wait for the rest.
+        for session in handed_off:
+            if quit_open or not self.is_alive(session) or self._is_done(session):
+                idle.append(session)
+            elif self.supervisor is not None:
+                self.supervisor.forget(session.driver)
+        for session in idle:
+            self._discard(session)
+
+    def is_alive(self, session):
+        # Health check, any call that needs the browser window will fail if it's gone.
+        try:
+            session.driver.current_window_handle
+            return True
+        except Exception:
+            return False
+
+    def _is_done(self, session):
+        try:
+            return self.is_reusable(session.driver)
+        except Exception:
+            return False
+
+    def _should_recycle(self, session):
+        if self.policy is None or self.policy.reason(session, session.driver) is None:
+            return False
+        with self._lock:
+            self.recycled += 1
+        return True
+
+    def _park(self, session):
+        # Puts a session on the idle list if there's room for it and it doesn't need replacing.
+
+        # Returns:
+        #     bool -- whether the session was kept
+        if self._should_recycle(session):
+            return False
+        with self._lock:
+            if self._closed or len(self._idle) >= self.size:
+                return False
+            session.idle_since = time.time()
+            self._idle.append(session)
+            self._lock.notify_all()
+            return True
+
+    def _launch(self, creds):
+        # Starts a new browser and logs it in, unless creds is None. The caller has already reserved a slot in _live.
+        driver = None
+        try:
+            driver = self.create_driver()
+            if self.supervisor is not None:
+                self.supervisor.track(driver, driver_pid(driver))
+            if creds is not None:
+                self.sign_in(driver, creds)
+        except Exception:
+            if driver is not None:
+                self._quit(driver)
+            with self._lock:
+                self._live -= 1
+                self._lock.notify_all()
+            raise
+        return PooledSession(driver, creds["user"] if creds is not None else None)
+
+    def _discard(self, session):
+        self._quit(session.driver)
+        with self._lock:
+            self._live -= 1
+            self._lock.notify_all()
+
+    def _quit(self, driver):
+        # Whatever of the browser is still running after quit() (it crashed, or quit
+        # timed out) is stopped by the supervisor.
+        processes = self.supervisor.forget(driver) if self.supervisor is not None else []
+        try:
+            driver.quit()
+        except Exception:
+            pass
+        if processes:
+            self.supervisor.reap(processes)
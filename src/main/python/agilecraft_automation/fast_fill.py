@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------
+#
+# (C) 2019 Isaak Meier
+# Released under MIT License
+# email isaakmeier12@gmail.com
+# icon made by Eucalyp from www.flaticon.com
+# -----------------------------------------------------------
+
+from selenium.webdriver.common.by import By
+
+# How each locator strategy is looked up from inside the page.
+JS_STRATEGIES = {
+    By.ID: "id",
+    By.CSS_SELECTOR: "css",
+    By.XPATH: "xpath",
+}
+
+# Finds an element the same way selenium would.
+FIND_JS = """
+function find(how, what) {
+    if (how === 'id') { return document.getElementById(what); }
+    if (how === 'css') { return document.querySelector(what); }
+    return document.evaluate(what, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+}
+"""
+
+# Sets every field's <select> to the option behind the chosen.js entry the
+# plan would have clicked, then fires the same events a click would. Chosen
+# tags each result <li> with data-option-array-index, which points into the
+# plugin's results_data, and that knows the real index in select.options.
+FILL_JS = FIND_JS + """
+var fields = arguments[0], results = [];
+for (var i = 0; i < fields.length; i++) {
+    var field = fields[i];
+    var select = document.getElementById(field.select);
+    var entry = find(field.how, field.what);
+    if (!select || !entry) {
+        results.push({ok: false, reason: !select ? 'no select' : 'no option'});
+        continue;
+    }
+    var arrayIndex = parseInt(entry.getAttribute('data-option-array-index'), 10);
+    if (isNaN(arrayIndex)) {
+        results.push({ok: false, reason: 'not a chosen entry'});
+        continue;
+    }
+    var index = arrayIndex;
+    var chosen = window.jQuery && jQuery(select).data('chosen');
+    if (chosen && chosen.results_data && chosen.results_data[arrayIndex]) {
+        index = chosen.results_data[arrayIndex].options_index;
+    }
+    if (!select.options[index]) {
+        results.push({ok: false, reason: 'no option ' + index});
+        continue;
+    }
+    select.options[index].selected = true;
+    if (window.jQuery) {
+        jQuery(select).trigger('change').trigger('chosen:updated');
+    } else {
+        select.dispatchEvent(new Event('change', {bubbles: true}));
+        select.dispatchEvent(new Event('chosen:updated', {bubbles: true}));
+    }
+    results.push({ok: true, index: index});
+}
+return results;
+"""
+
+# One read back for the whole batch: is the option we set still selected?
+# A page handler that resets a field on change shows up here.
+READ_BACK_JS = """
+var fields = arguments[0], results = [];
+for (var i = 0; i < fields.length; i++) {
+    var select = document.getElementById(fields[i].select);
+    var option = select && select.options[fields[i].index];
+    results.push(!!(option && option.selected));
+}
+return results;
+"""
+
+# Where a dropdown was left before a step's next try: is its menu still open,
+# and does it already show the entry the step picks? Bootstrap style menus mark
+# the toggle (or its parent) open, chosen.js marks its container. What a toggle
+# shows is its own text without the menu inside it, chosen's search-choice
+# entries for a multi-select, or the data-value some menus keep.
+MENU_STATE_JS = FIND_JS + """
+var toggle = find(arguments[0], arguments[1]), option = find(arguments[2], arguments[3]);
+function text(node) { return (node.textContent || '').replace(/\\s+/g, ' ').trim(); }
+function marked(node, names) {
+    return !!node && !!node.classList && names.some(function (name) { return node.classList.contains(name); });
+}
+if (!toggle) { return {open: false, done: false}; }
+var open = marked(toggle, ['open', 'show']) || marked(toggle.parentElement, ['open', 'show', 'chosen-with-drop']) ||
+    toggle.getAttribute('aria-expanded') === 'true';
+if (!option) { return {open: open, done: false}; }
+var entry = option.closest('li') || option, wanted = text(entry);
+if (marked(entry, ['active', 'selected', 'result-selected']) || entry.getAttribute('aria-selected') === 'true') {
+    return {open: open, done: true};
+}
+var shown = toggle.cloneNode(true);
+Array.prototype.forEach.call(shown.querySelectorAll('ul, .menu, .dropdown-menu, .chosen-drop'), function (menu) {
+    menu.parentNode.removeChild(menu);
+});
+var choices = Array.prototype.map.call(toggle.querySelectorAll('.search-choice'), text);
+return {open: open, done: toggle.getAttribute('data-value') === wanted || text(shown) === wanted || choices.indexOf(wanted) >= 0};
+"""
+
+
+def can_fast_fill(step):
+    # Only chosen.js dropdowns with a known <select> and a locator we can resolve in the page.
+    return step.action == "choose" and step.select is not None and step.option[0] in JS_STRATEGIES
+
+
+def fast_fill(driver, steps):
+    # Fills a batch of chosen.js dropdowns with one script call and checks them with one more.
+
+    # Arguments:
+    #     driver {WebDriver} -- the browser with the form open
+    #     steps {list} -- choose Steps that pass can_fast_fill
+
+    # Returns:
+    #     list -- the steps that didn't stick, for the caller to click through instead
+    results = driver.execute_script(FILL_JS, fill_fields(steps))
+    filled, failed = sort_results(steps, results)
+    if filled:
+        stuck = driver.execute_script(READ_BACK_JS, [field for _, field in filled])
+        failed.update(id(step) for (step, _), ok in zip(filled, stuck) if not ok)
+    return [step for step in steps if id(step) in failed]
+
+
+def fill_fields(steps):
+    # Returns:
+    #     list -- the FILL_JS argument for a batch of steps
+    return [{"select": step.select, "how": JS_STRATEGIES[step.option[0]], "what": step.option[1]} for step in steps]
+
+
+def sort_results(steps, results):
+    # Splits what FILL_JS returned into the fields to read back and the steps that already failed.
+
+    # Returns:
+    #     tuple -- list of (step, READ_BACK_JS field) and a set of ids of the failed steps
+    filled = [(step, {"select": step.select, "index": result["index"]}) for step, result in zip(steps, results) if result["ok"]]
+    failed = {id(step) for step, result in zip(steps, results) if not result["ok"]}
+    return filled, failed
+
+
+def menu_arguments(step):
+    # Returns:
+    #     list -- the MENU_STATE_JS arguments for a choose step, None if its locators can't be resolved in the page
+    if step.toggle[0] not in JS_STRATEGIES or step.option[0] not in JS_STRATEGIES:
+        return None
+    return [JS_STRATEGIES[step.toggle[0]], step.toggle[1], JS_STRATEGIES[step.option[0]], step.option[1]]
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------
+#
+# (C) 2019 Isaak Meier
+# Released under MIT License
+# email isaakmeier12@gmail.com
+# icon made by Eucalyp from www.flaticon.com
+# -----------------------------------------------------------
+
+from selenium.webdriver.common.by import By
+import copy
+import functools
+import json
+import threading
+
+# What each action needs on top of "name" and "action".
+ACTIONS = {
+    "type": ("target", "text"),
+    "type_in_frame": ("frame", "target", "text"),
+    "choose": ("toggle", "option"),
+    "scroll": (),
+    "tags": ("target",),
+}
+STEP_KEYS = {"name", "action", "target", "text", "override", "frame", "toggle", "option", "select", "wait", "variants", "skip",
+             "field", "value"}
+SUBMIT_ENCODINGS = ("json", "form")
+VARIANT_KINDS = ("carrier", "platform")
+LOCATOR_STRATEGIES = {
+    "id": By.ID,
+    "css": By.CSS_SELECTOR,
+    "xpath": By.XPATH,
+    "name": By.NAME,
+}
+
+
+class PlanError(ValueError):
+    # The form plan file is malformed, or has nothing for a carrier/platform.
+    pass
+
+
+class Step:
+    # One compiled step of the form, with every variant already applied.
+
+    # Attributes:
+    #     name (str): unique step name, used in errors and timings
+    #     action (str): one of ACTIONS
+    #     target (tuple): (By, value) of the element to type into
+    #     toggle (tuple): (By, value) of the dropdown to open
+    #     option (tuple): (By, value) of the dropdown entry to pick
+    #     select (str): id of the <select> behind a chosen.js dropdown, lets it be fast filled
+    #     text (str): text template, formatted with the defect's carrier and platform
+    #     override (str): key in the job's overrides that replaces the text
+    #     frame (int): iframe index for type_in_frame
+    #     wait (str): readiness wait to run after the step, see settings.json "waits"
+    #     field (str): name of the field the step sets in the form's POST, for direct submission
+    #     value (str): what a choose step sends in that field
+    def __init__(self, spec):
+        self.name = spec["name"]
+        self.action = spec["action"]
+        self.target = spec.get("target")
+        self.toggle = spec.get("toggle")
+        self.option = spec.get("option")
+        self.select = spec.get("select")
+        self.text = spec.get("text")
+        self.override = spec.get("override")
+        self.frame = spec.get("frame")
+        self.wait = spec.get("wait")
+        self.field = spec.get("field")
+        self.value = spec.get("value")
+
+    def __repr__(self):
+        return f"<Step {self.name} {self.action}>"
+
+
+class FormPlan:
+    # The Add Defect form described as data (form_plan.json).
+    # The file is validated once when loaded, and each (carrier, platform)
+    # is compiled into a list of Steps the first time it's asked for.
+
+    def __init__(self, spec):
+        # Arguments:
+        #     spec {dict} -- the parsed form_plan.json
+        self.spec = spec
+        self.prefixes = spec.get("prefixes", {})
+        # Where the form posts to, only needed for direct submission. See direct_submit.py.
+        self.submit = spec.get("submit")
+        self._compiled = {}
+        self._lock = threading.Lock()
+        self.validate()
+
+    def validate(self):
+        # Checks the structure of the whole plan, so mistakes in the file show up
+        # at startup rather than halfway through filling out a defect.
+        if self.spec.get("version") != 1:
+            raise PlanError(f"Unsupported form plan version {self.spec.get('version')!r}.")
+        steps = self.spec.get("steps")
+        if not isinstance(steps, list) or not steps:
+            raise PlanError("The form plan has no steps.")
+        seen = set()
+        for step in steps:
+            name = step.get("name")
+            if not name:
+                raise PlanError(f"A step has no name: {step!r}")
+            if name in seen:
+                raise PlanError(f"Step '{name}' is defined twice.")
+            seen.add(name)
+            unknown = set(step) - STEP_KEYS
+            if unknown:
+                raise PlanError(f"Step '{name}' has unknown keys: {', '.join(sorted(unknown))}")
+            if step.get("action") not in ACTIONS:
+                raise PlanError(f"Step '{name}' has unknown action {step.get('action')!r}.")
+            for kind, variants in step.get("variants", {}).items():
+                if kind not in VARIANT_KINDS:
+                    raise PlanError(f"Step '{name}' has variants for {kind!r}, only carrier and platform are supported.")
+                for value, changes in variants.items():
+                    if set(changes) & {"name", "action", "variants"}:
+                        raise PlanError(f"Step '{name}' variant {value} can't change name, action or variants.")
+                    self._check_locators(name, changes)
+            self._check_locators(name, step)
+        submit = self.spec.get("submit")
+        if submit is not None:
+            if not isinstance(submit, dict) or not isinstance(submit.get("path"), str):
+                raise PlanError('"submit" needs at least a "path", like {"path": "/api/defects"}.')
+            if submit.get("encoding", "json") not in SUBMIT_ENCODINGS:
+                raise PlanError(f'"submit" encoding should be one of {", ".join(SUBMIT_ENCODINGS)}.')
+
+    def steps_for(self, carrier, platform):
+        # Returns:
+        #     list -- the compiled Steps for this carrier and platform, cached after the first call
+        key = (carrier, platform)
+        with self._lock:
+            if key not in self._compiled:
+                self._compiled[key] = self._compile(carrier, platform)
+            return self._compiled[key]
+
+    def _compile(self, carrier, platform):
+        steps = []
+        for spec in self.spec["steps"]:
+            spec = copy.deepcopy(spec)
+            variants = spec.pop("variants", {})
+            spec.update(variants.get("carrier", {}).get(carrier, {}))
+            spec.update(variants.get("platform", {}).get(platform, {}))
+            if spec.get("skip"):
+                continue
+            missing = [key for key in ACTIONS[spec["action"]] if key not in spec]
+            if missing:
+                raise PlanError(f"Step '{spec['name']}' has no {', '.join(missing)} for {carrier} {platform}.")
+            for key in ("target", "toggle", "option"):
+                if key in spec:
+                    spec[key] = self.locator(spec[key])
+            steps.append(Step(spec))
+        return steps
+
+    def locator(self, spec):
+        # Turns a locator from the file into a (By, value) tuple for selenium.
+        # {"label": ..., "within": ...} picks a dropdown entry by its visible text.
+
+        # Returns:
+        #     tuple -- (By, value)
+        if "label" in spec:
+            return (By.XPATH, f'//*[@id="{spec["within"]}"]//li[normalize-space(.)={xpath_literal(spec["label"])}]')
+        (strategy, value), = spec.items()
+        for prefix, expansion in self.prefixes.items():
+            value = value.replace("{" + prefix + "}", expansion)
+        return (LOCATOR_STRATEGIES[strategy], value)
+
+    def _check_locators(self, name, step):
+        for key in ("target", "toggle", "option"):
+            if key not in step:
+                continue
+            spec = step[key]
+            if not isinstance(spec, dict):
+                raise PlanError(f"Step '{name}' {key} should be an object like {{\"css\": \"...\"}}.")
+            if "label" in spec:
+                if set(spec) != {"label", "within"}:
+                    raise PlanError(f"Step '{name}' {key} picks by label and needs exactly \"label\" and \"within\".")
+            elif len(spec) != 1 or next(iter(spec)) not in LOCATOR_STRATEGIES:
+                raise PlanError(f"Step '{name}' {key} needs exactly one of {', '.join(LOCATOR_STRATEGIES)}.")
+
+
+def xpath_literal(text):
+    # Quotes text for use in an XPath expression, even if it has both kinds of quotes in it.
+    if '"' not in text:
+        return f'"{text}"'
+    if "'" not in text:
+        return f"'{text}'"
+    parts = text.split('"')
+    return "concat(" + ", '\"', ".join(f'"{part}"' for part in parts) + ")"
+
+
+@functools.lru_cache(maxsize=None)
+def load_form_plan(path):
+    # Reads and validates the plan once per path, every later call gets the same FormPlan.
+
+    # Returns:
+    #     FormPlan -- the loaded plan
+    with open(path) as json_file:
+        return FormPlan(json.load(json_file))
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------
+#
+# (C) 2019 Isaak Meier
+# Released under MIT License
+# email isaakmeier12@gmail.com
+# icon made by Eucalyp from www.flaticon.com
+# -----------------------------------------------------------
+
+from contextlib import contextmanager
+import json
+import math
+import os
+import threading
+import time
+import uuid
+
+
+class NullSink:
+    # Throws events away, for when instrumentation is turned off.
+    def emit(self, event):
+        pass
+
+
+class JsonLinesSink:
+    # Appends every event as one line of json. Any object with an emit(event)
+    # method can be used instead, this is just the default.
+
+    def __init__(self, path):
+        # Arguments:
+        #     path {str} -- file to append to, its folder is created if needed
+        self.path = os.path.expanduser(path)
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def emit(self, event):
+        line = json.dumps(event) + "\n"
+        # A full disk or a locked file shouldn't fail the defect, the timings are just lost.
+        try:
+            with self._lock:
+                with open(self.path, "a") as events_file:
+                    events_file.write(line)
+        except OSError:
+            pass
+
+
+def create_sink(settings):
+    # Builds the sink described by the "instrumentation" section of settings.json.
+    if not settings["enabled"]:
+        return NullSink()
+    return JsonLinesSink(settings["events_file"])
+
+
+class Timeline:
+    # Times one defect run. Emits an event for every step, every locator wait
+    # and the run as a whole, all tagged with the same run id.
+
+    def __init__(self, sink, carrier, platform, on_progress=None):
+        # Arguments:
+        #     sink {object} -- where events go, anything with emit(event)
+        #     carrier {str} -- for grouping in reports
+        #     platform {str} -- for grouping in reports
+        #     on_progress {callable} -- called with a short status string when a step starts
+        self.sink = sink
+        self.run_id = uuid.uuid4().hex[:12]
+        self.carrier = carrier
+        self.platform = platform
+        self.on_progress = on_progress
+        self.started = time.perf_counter()
+
+    def emit(self, kind, name, seconds, ok=True, **extra):
+        event = {
+            "type": kind,
+            "run": self.run_id,
+            "carrier": self.carrier,
+            "platform": self.platform,
+            "name": name,
+            "seconds": round(seconds, 4),
+            "ok": ok,
+            "at": time.time(),
+        }
+        event.update(extra)
+        self.sink.emit(event)
+
+    def progress(self, text):
+        if self.on_progress is not None:
+            self.on_progress(text)
+
+    @contextmanager
+    def step(self, name, progress=None):
+        # Times the block as a step. The step is recorded as failed if the block raises.
+        if progress is not None:
+            self.progress(progress)
+        started = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.emit("step", name, time.perf_counter() - started, ok=False)
+            raise
+        self.emit("step", name, time.perf_counter() - started)
+
+    def wait(self, name, seconds, ok=True):
+        # Records one locator or readiness wait that has already happened.
+        self.emit("wait", name, seconds, ok)
+
+    def finish(self, result):
+        self.emit("run", "total", time.perf_counter() - self.started, ok=result == "Success", result=result)
+
+
+class StartupClock:
+    # Times how long the app takes to get going. Every milestone (the window showing,
+    # the engine loaded, the first browser warm, the first defect done) is recorded
+    # once, as a "startup" event with the seconds since launch.
+
+    def __init__(self, sink, launched):
+        # Arguments:
+        #     sink {object} -- where events go, anything with emit(event)
+        #     launched {float} -- time.perf_counter() when the app started
+        self.sink = sink
+        self.launched = launched
+        self.marked = set()
+        self._lock = threading.Lock()
+
+    def mark(self, name, ok=True, **extra):
+        # Returns:
+        #     bool -- False if this milestone was already recorded
+        with self._lock:
+            if name in self.marked:
+                return False
+            self.marked.add(name)
+        event = {"type": "startup", "name": name, "seconds": round(time.perf_counter() - self.launched, 4), "ok": ok, "at": time.time()}
+        event.update(extra)
+        self.sink.emit(event)
+        return True
+
+
+def percentile(values, fraction):
+    # Nearest rank percentile of an already sorted list.
+    rank = max(int(math.ceil(fraction * len(values))) - 1, 0)
+    return values[rank]
+
+
+def read_events(path):
+    # Reads a json lines file, skipping lines that were cut off by a crash.
+    events = []
+    with open(os.path.expanduser(path)) as events_file:
+        for line in events_file:
+            try:
+                events.append(json.loads(line))
+            except ValueError:
+                continue
+    return events
+
+
+def summarize(events, kind="step"):
+    # Groups events of one type by name.
+
+    # Returns:
+    #     list -- (name, count, failures, p50, p95, max) tuples, slowest p95 first
+    durations = {}
+    failures = {}
+    for event in events:
+        if event.get("type") != kind:
+            continue
+        durations.setdefault(event["name"], []).append(event["seconds"])
+        failures[event["name"]] = failures.get(event["name"], 0) + (0 if event.get("ok", True) else 1)
+    rows = []
+    for name, values in durations.items():
+        values.sort()
+        rows.append((name, len(values), failures[name], percentile(values, 0.5), percentile(values, 0.95), values[-1]))
+    rows.sort(key=lambda row: row[4], reverse=True)
+    return rows
+
+
+def format_report(events):
+    # Renders the p50/p95 tables for runs, steps and waits as text.
+    lines = []
+    for kind, title in (("startup", "Startup"), ("run", "Runs"), ("step", "Steps"), ("wait", "Waits")):
+        rows = summarize(events, kind)
+        if not rows:
+            continue
+        width = max(len(row[0]) for row in rows) + 2
+        lines.append(title)
+        lines.append(f"{'name':<{width}}{'count':>7}{'failed':>8}{'p50 s':>9}{'p95 s':>9}{'max s':>9}")
+        for name, count, failed, p50, p95, slowest in rows:
+            lines.append(f"{name:<{width}}{count:>7}{failed:>8}{p50:>9.2f}{p95:>9.2f}{slowest:>9.2f}")
+        lines.append("")
+    return "\n".join(lines) if lines else "No events recorded yet."
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------
+#
+# (C) 2019 Isaak Meier
+# Released under MIT License
+# email isaakmeier12@gmail.com
+# icon made by Eucalyp from www.flaticon.com
+# -----------------------------------------------------------
+
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.support.ui import WebDriverWait
+import re
+import time
+
+# Types a whole chunk of names into the tag-it input from inside the page.
+# Each name goes through the same keydown Tab the widget gets from a real
+# keyboard, so its own lookup and tag creation still run, but without a
+# WebDriver round trip per name. tag-it reads event.which, which a native
+# KeyboardEvent can't set, so the event goes through jQuery when it's there.
+ADD_TAGS_JS = """
+var input = arguments[0], names = arguments[1];
+for (var i = 0; i < names.length; i++) {
+    input.value = names[i];
+    input.dispatchEvent(new Event('input', {bubbles: true}));
+    if (window.jQuery) {
+        jQuery(input).trigger(jQuery.Event('keydown', {which: 9, keyCode: 9, key: 'Tab'}));
+    } else {
+        input.dispatchEvent(new KeyboardEvent('keydown', {key: 'Tab', code: 'Tab', bubbles: true, cancelable: true}));
+    }
+}
+input.value = '';
+"""
+
+# The labels of every tag the widget has accepted so far.
+TAGS_JS = """
+var list = arguments[0].closest('ul');
+var tags = list ? list.querySelectorAll('li.tagit-choice') : [];
+var labels = [];
+for (var i = 0; i < tags.length; i++) {
+    var label = tags[i].querySelector('.tagit-label') || tags[i];
+    labels.push(label.textContent.trim());
+}
+return labels;
+"""
+
+
+class UnresolvedNamesError(Exception):
+    # Some names from the roster never turned into tags on the notify list.
+    def __init__(self, names):
+        Exception.__init__(self, "These names weren't accepted on the notify list, please add them by hand: " + ", ".join(names))
+        self.names = names
+
+
+def add_tags(driver, input_element, names, chunk_size=25):
+    # Sends the names to the widget, chunk_size names per script call.
+    for start in range(0, len(names), chunk_size):
+        driver.execute_script(ADD_TAGS_JS, input_element, names[start:start + chunk_size])
+
+
+def read_tags(driver, input_element):
+    # Returns:
+    #     list -- labels of the tags currently on the notify list
+    return driver.execute_script(TAGS_JS, input_element)
+
+
+def wait_for_tags(driver, input_element, names, timeout=10, settle_ms=500, poll=0.1):
+    # The widget may still be looking names up after the script returns. Waits until
+    # every name has a tag, or the tag count has stopped changing for settle_ms.
+
+    # Returns:
+    #     list -- the accepted tag labels
+    state = {"count": -1, "since": time.monotonic(), "tags": []}
+
+    def settled(driver):
+        tags = read_tags(driver, input_element)
+        state["tags"] = tags
+        if not missing_names(names, tags):
+            return True
+        if len(tags) != state["count"]:
+            state["count"] = len(tags)
+            state["since"] = time.monotonic()
+            return False
+        return (time.monotonic() - state["since"]) * 1000 >= settle_ms
+
+    try:
+        WebDriverWait(driver, timeout, poll_frequency=poll).until(settled)
+    except TimeoutException:
+        pass
+    return state["tags"]
+
+
+def name_key(text):
+    # What a roster name is compared by: whitespace and case don't count.
+
+    # Returns:
+    #     str -- the normalized name
+    return " ".join(text.split()).casefold()
+
+
+def label_key(tag):
+    # A tag label without the trailing "(...)" or "<...>" the site may decorate it
+    # with (an email). Only labels are stripped, in a roster name it tells people apart.
+
+    # Returns:
+    #     str -- the normalized label
+    return re.sub(r"\s*(\([^()]*\)|<[^<>]*>)$", "", name_key(tag))
+
+
+def missing_names(names, tags):
+    # Names without a tag of their own. A tag only counts if its whole label is the
+    # name, with or without its decoration, so "Al" isn't taken as added just because
+    # "Alice" is, and "Bob (QA)" isn't because "Bob (Dev)" is.
+
+    # Returns:
+    #     list -- the missing names, in roster order and without duplicates
+    labels = {name_key(tag) for tag in tags} | {label_key(tag) for tag in tags}
+    missing = []
+    for name in names:
+        wanted = name_key(name)
+        if wanted and wanted not in labels and name not in missing:
+            missing.append(name)
+    return missing
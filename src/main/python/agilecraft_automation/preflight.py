@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------
+#
+# (C) 2019 Isaak Meier
+# Released under MIT License
+# email isaakmeier12@gmail.com
+# icon made by Eucalyp from www.flaticon.com
+# -----------------------------------------------------------
+
+from selenium.webdriver.common.by import By
+import functools
+import threading
+import time
+
+# Counts the matches of every locator in one go, once the Add Defect form is showing.
+# Also hashes the form's structure (every element's tag, id and classes). If that's
+# the hash that last passed, the locators aren't evaluated at all.
+#
+# Counts: -1 the locator isn't valid css/xpath, -2 its frame can't be looked into.
+PREFLIGHT_JS = """
+var checks = arguments[0], knownHash = arguments[1];
+var form = document.getElementById('AddDefectForm');
+if (!form || !form.getClientRects().length) {
+    return {ready: false};
+}
+var elements = form.getElementsByTagName('*'), hash = 2166136261;
+for (var i = 0; i < elements.length; i++) {
+    var text = elements[i].tagName + '#' + elements[i].id + '.' + (elements[i].getAttribute('class') || '') + ';';
+    for (var j = 0; j < text.length; j++) {
+        hash = Math.imul(hash ^ text.charCodeAt(j), 16777619) >>> 0;
+    }
+}
+hash = hash.toString(16) + ':' + elements.length;
+if (hash === knownHash) {
+    return {ready: true, hash: hash, skipped: true};
+}
+function count(root, kind, value) {
+    try {
+        if (kind === 'xpath') {
+            return root.evaluate(value, root, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null).snapshotLength;
+        }
+        return root.querySelectorAll(value).length;
+    } catch (e) {
+        return -1;
+    }
+}
+var counts = [];
+for (var i = 0; i < checks.length; i++) {
+    var check = checks[i], root = document;
+    if (check.frame !== null) {
+        var frame = window.frames[check.frame];
+        if (check.kind === 'frame' || !frame) {
+            counts.push(frame ? 1 : 0);
+            continue;
+        }
+        try {
+            root = frame.document;
+        } catch (e) {
+            counts.push(-2);
+            continue;
+        }
+    }
+    counts.push(count(root, check.kind, check.value));
+}
+return {ready: true, hash: hash, counts: counts};
+"""
+
+# How each selenium strategy is checked in the page.
+PREFLIGHT_STRATEGIES = {
+    By.CSS_SELECTOR: lambda value: ("css", value),
+    By.XPATH: lambda value: ("xpath", value),
+    By.TAG_NAME: lambda value: ("css", value),
+    By.ID: lambda value: ("css", f'[id="{value}"]'),
+    By.NAME: lambda value: ("css", f'[name="{value}"]'),
+    By.CLASS_NAME: lambda value: ("css", f".{value}"),
+}
+
+FOUND = "found"
+MISSING = "missing"
+AMBIGUOUS = "ambiguous"
+# An option that isn't in the page yet because an earlier step loads its list
+# (Release after Product). chosen.js builds every other list, entries and their
+# data-option-array-index included, when the page sets it up, and fast fill relies on that.
+LATER = "later"
+INVALID = "invalid"
+UNCHECKED = "unchecked"
+
+
+class Check:
+    # One locator of one step.
+
+    # Attributes:
+    #     step (str): the step's name
+    #     role (str): "target", "toggle", "option", "select" or "frame"
+    #     kind (str): "css", "xpath" or "frame"
+    #     value (str): the selector
+    #     frame (int): iframe the locator is looked up in, None for the page itself
+    #     required (bool): whether the form is broken without it, options of a list an earlier step loads aren't
+    def __init__(self, step, role, kind, value, frame=None, required=True):
+        self.step = step
+        self.role = role
+        self.kind = kind
+        self.value = value
+        self.frame = frame
+        self.required = required
+
+    def __repr__(self):
+        return f"{self.step} {self.role}"
+
+
+class PreflightReport:
+    # What the preflight found, one (Check, status, count) per locator.
+
+    def __init__(self, form_hash, results=None, skipped=False):
+        self.form_hash = form_hash
+        self.results = results or []
+        self.skipped = skipped
+
+    def with_status(self, *statuses):
+        # Returns:
+        #     list -- the checks that ended up with one of the statuses
+        return [check for check, status, _ in self.results if status in statuses]
+
+    def broken(self):
+        # Returns:
+        #     list -- required checks that can't work as they are
+        return [check for check, status, _ in self.results if check.required and status in (MISSING, INVALID)]
+
+    def ok(self):
+        return not self.broken()
+
+
+class PreflightError(Exception):
+    # The form doesn't match form_plan.json anymore. Raised before anything was filled in.
+    def __init__(self, report):
+        Exception.__init__(self, "The Add Defect form has changed and form_plan.json needs updating. Nothing was filled in. "
+                           "These can't be found: " + ", ".join(repr(check) for check in report.broken()))
+        self.report = report
+
+
+class FormPreflight:
+    # Checks every locator a carrier/platform plan needs in one script call, right
+    # after the form opens, instead of finding out from a timeout halfway through.
+    #
+    # The structure hash of the last form that passed is kept per carrier/platform,
+    # and later jobs only compare hashes until the page changes.
+
+    def __init__(self, form_plan):
+        self.form_plan = form_plan
+        self._checks = {}
+        self._known_good = {}
+        self._lock = threading.Lock()
+
+    def checks_for(self, carrier, platform):
+        # Returns:
+        #     list -- the Checks for this carrier and platform, built once
+        key = (carrier, platform)
+        with self._lock:
+            if key not in self._checks:
+                self._checks[key] = self._build(self.form_plan.steps_for(carrier, platform))
+            return self._checks[key]
+
+    def script_arguments(self, carrier, platform):
+        # Returns:
+        #     tuple -- the two arguments PREFLIGHT_JS takes
+        checks = [{"kind": check.kind, "value": check.value, "frame": check.frame} for check in self.checks_for(carrier, platform)]
+        with self._lock:
+            return checks, self._known_good.get((carrier, platform))
+
+    def evaluate(self, carrier, platform, result):
+        # Turns what PREFLIGHT_JS returned into a report, and remembers the hash if the form passed.
+
+        # Returns:
+        #     PreflightReport -- or None if the form wasn't showing yet
+        if not result["ready"]:
+            return None
+        if result.get("skipped"):
+            return PreflightReport(result["hash"], skipped=True)
+        results = [(check, self._status(check, count), count) for check, count in zip(self.checks_for(carrier, platform), result["counts"])]
+        report = PreflightReport(result["hash"], results)
+        if report.ok():
+            with self._lock:
+                self._known_good[(carrier, platform)] = report.form_hash
+        return report
+
+    def _status(self, check, count):
+        if count == -1:
+            return INVALID
+        if count == -2:
+            return UNCHECKED
+        if count == 0:
+            return MISSING if check.required else LATER
+        return AMBIGUOUS if count > 1 else FOUND
+
+    def _build(self, steps):
+        checks = []
+        # A step with a wait loads something the next step needs, so that step's options can't be there yet.
+        loaded_later = False
+        for step in steps:
+            if step.action == "type_in_frame":
+                checks.append(Check(step.name, "frame", "frame", str(step.frame), step.frame))
+                checks.append(Check(step.name, "target", *PREFLIGHT_STRATEGIES[step.target[0]](step.target[1]), step.frame))
+            elif step.target is not None:
+                checks.append(Check(step.name, "target", *PREFLIGHT_STRATEGIES[step.target[0]](step.target[1])))
+            if step.select is not None:
+                checks.append(Check(step.name, "select", "css", f'select[id="{step.select}"]'))
+            if step.toggle is not None:
+                checks.append(Check(step.name, "toggle", *PREFLIGHT_STRATEGIES[step.toggle[0]](step.toggle[1])))
+            if step.option is not None:
+                checks.append(Check(step.name, "option", *PREFLIGHT_STRATEGIES[step.option[0]](step.option[1]), required=not loaded_later))
+            loaded_later = step.wait is not None and step.action != "scroll"
+        return checks
+
+
+@functools.lru_cache(maxsize=None)
+def preflight_for(form_plan):
+    # Every job using the same plan shares one FormPreflight, and with it the known good hashes.
+
+    # Returns:
+    #     FormPreflight -- for the plan
+    return FormPreflight(form_plan)
+
+
+def record_report(timeline, report, seconds, abort=True):
+    # Puts the report on the timeline and stops the job if the form is broken.
+    # Shared by both engines, they only differ in how they run PREFLIGHT_JS.
+
+    # Raises:
+    #     PreflightError: something the plan needs is missing and abort is on
+    timeline.emit("preflight", "form", seconds, ok=report.ok(), skipped=report.skipped,
+                  broken=[repr(check) for check in report.broken()],
+                  ambiguous=[repr(check) for check in report.with_status(AMBIGUOUS)])
+    if abort and not report.ok():
+        raise PreflightError(report)
+
+
+def run_preflight(driver, preflight, carrier, platform, timeout=5, poll=0.1):
+    # Waits for the form to show up and checks it.
+
+    # Returns:
+    #     PreflightReport -- what was found
+
+    # Raises:
+    #     TimeoutError: the form never showed up
+    checks, known_hash = preflight.script_arguments(carrier, platform)
+    deadline = time.monotonic() + timeout
+    while True:
+        report = preflight.evaluate(carrier, platform, driver.execute_script(PREFLIGHT_JS, checks, known_hash))
+        if report is not None:
+            return report
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"The Add Defect form didn't open within {timeout} seconds.")
+        time.sleep(poll)
@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------
+#
+# (C) 2019 Isaak Meier
+# Released under MIT License
+# email isaakmeier12@gmail.com
+# icon made by Eucalyp from www.flaticon.com
+# -----------------------------------------------------------
+
+from collections import deque
+import itertools
+import multiprocessing
+import queue
+import threading
+import time
+
+from .scheduler import CANCELLED, DONE, QUEUED, RUNNING, Job
+
+# Message kinds workers send back to the scheduler.
+PROGRESS = "progress"
+EVENT = "event"
+FINISHED = "finished"
+
+# Sent instead of None to a worker that's busy when the scheduler shuts down
+# without waiting: it leaves the defect (and its browser) as it is and exits.
+LEAVE = "leave"
+
+
+class QueueSink:
+    # Sends timing events back to the scheduler's process, which owns the real sink.
+    def __init__(self, outbox, worker_id, job_id):
+        self.outbox = outbox
+        self.worker_id = worker_id
+        self.job_id = job_id
+
+    def emit(self, event):
+        self.outbox.put((EVENT, self.worker_id, self.job_id, event))
+
+
+def worker_main(worker_id, config, inbox, outbox):
+    # Runs in the worker process. Owns its own DriverPool and fills out one
+    # defect at a time on a thread of its own, so the worker can still be told
+    # to leave in the middle of one. Stops once it gets None or LEAVE.
+
+    # Arguments:
+    #     worker_id {int} -- tags every message sent back
+    #     config {dict} -- "settings", "plan_path", "chrome_driver_path", "headless" (None for the setting),
+    #                      "keep_for_user" and "max_browsers"
+    #     inbox {Queue} -- jobs for this worker only
+    #     outbox {Queue} -- messages for the scheduler, shared by every worker
+    from .automation import DefectAutomation, create_pool
+    from .form_plan import load_form_plan
+
+    settings = config["settings"]
+    quit_open = settings["supervisor"]["close_open_forms"]
+    form_plan = load_form_plan(config["plan_path"])
+    pool = create_pool(settings, config["chrome_driver_path"], headless=config["headless"], size=1, max_browsers=config["max_browsers"])
+    automation = None
+    runner = None
+    message = LEAVE
+    try:
+        while True:
+            message = inbox.get()
+            if message is None or message == LEAVE:
+                break
+            job_id, carrier, platform, overrides, names, creds = message
+            automation = DefectAutomation(carrier, names, platform, creds, pool, settings, form_plan, overrides,
+                                          keep_for_user=config["keep_for_user"],
+                                          sink=QueueSink(outbox, worker_id, job_id),
+                                          on_progress=lambda text, job_id=job_id: outbox.put((PROGRESS, worker_id, job_id, text)))
+            runner = threading.Thread(target=run_job, args=(automation, outbox, worker_id, job_id),
+                                      name=f"defect-{job_id}", daemon=True)
+            runner.start()
+    finally:
+        if message is None and runner is not None:
+            runner.join()
+        elif runner is not None and runner.is_alive():
+            # Left in the middle of a defect: the browser stays open with the half filled
+            # form, like a form that's done, and isn't tracked (or stopped) anymore.
+            session = getattr(automation, "session", None)
+            if session is not None and pool.supervisor is not None and not quit_open:
+                pool.supervisor.forget(session.driver)
+        pool.close(quit_open)
+        if pool.supervisor is not None:
+            # Stops whatever is still tracked, e.g. a browser that was still starting up.
+            pool.supervisor.close()
+
+
+def run_job(automation, outbox, worker_id, job_id):
+    # The worker's defect thread.
+    try:
+        result = automation.run()
+    except Exception as e:
+        result = str(e)
+    outbox.put((FINISHED, worker_id, job_id, result))
+
+
+class Worker:
+    # The scheduler's handle on one worker process.
+    def __init__(self, worker_id, process, inbox):
+        self.id = worker_id
+        self.process = process
+        self.inbox = inbox
+        self.job = None
+        # When the job last showed signs of life, None until it has a browser.
+        self.progressed = None
+
+
+class ProcessScheduler:
+    # Same interface as JobScheduler, but every defect runs in a worker process
+    # with its own chromedriver, so a hung wait or a crashed driver only takes
+    # down that worker. The scheduler restarts it and fails the job it had.
+    #
+    # Nothing happens in the background on this side: whoever owns the scheduler
+    # calls poll() regularly (the GUI from a QTimer), and every callback runs
+    # on that thread.
+
+    def __init__(self, config, prepare_job, on_finished, on_progress=None, sink=None, max_workers=4, stall_timeout=None):
+        # Arguments:
+        #     config {dict} -- passed to worker_main, see there
+        #     prepare_job {callable} -- called with a Job, returns (names, creds) to send along with it
+        #     on_finished {callable} -- called with the Job once it's done
+        #     on_progress {callable} -- called with the Job and a short status string
+        #     sink {object} -- where the workers' timing events end up
+        #     max_workers {int} -- how many worker processes run at most
+        #     stall_timeout {float} -- seconds a job can go without progress once it has a browser
+        #                              before its worker is killed, None to wait forever. Waiting
+        #                              for a browser doesn't count, that can take as long as the
+        #                              user leaves an earlier form open.
+        self.config = config
+        self.prepare_job = prepare_job
+        self.on_finished = on_finished
+        self.on_progress = on_progress
+        self.sink = sink
+        self.max_workers = max(max_workers, 1)
+        self.stall_timeout = stall_timeout
+        self.jobs = {}
+        self.restarts = 0
+        self._ids = itertools.count(1)
+        self._worker_ids = itertools.count(1)
+        self._pending = deque()
+        self._workers = {}
+        # Spawned rather than forked, a forked copy of a Qt app is not safe to use.
+        self._context = multiprocessing.get_context("spawn")
+        self._outbox = self._context.Queue()
+        self._closed = False
+
+    def submit(self, carrier, platform, overrides=None):
+        # Queues a single defect. It's handed to a worker on the next poll().
+
+        # Returns:
+        #     Job -- the queued job
+        job = Job(next(self._ids), carrier, platform, overrides)
+        self.jobs[job.id] = job
+        self._pending.append(job)
+        return job
+
+    def submit_batch(self, entries):
+        # Queues a list of (carrier, platform, overrides) tuples in order.
+
+        # Returns:
+        #     list -- the queued jobs
+        return [self.submit(carrier, platform, overrides) for carrier, platform, overrides in entries]
+
+    def active(self):
+        # Returns:
+        #     list -- jobs that are queued or running
+        return [job for job in self.jobs.values() if job.state in (QUEUED, RUNNING)]
+
+    def forget(self, job_id):
+        # Drops a finished job so the jobs dict doesn't grow forever.
+        return self.jobs.pop(job_id, None)
+
+    def poll(self, timeout=0):
+        # Handles every message the workers sent, replaces dead or stuck workers
+        # and hands queued jobs to idle ones.
+
+        # Arguments:
+        #     timeout {float} -- seconds to wait for the first message, 0 returns right away
+        try:
+            message = self._outbox.get(timeout=timeout) if timeout else self._outbox.get_nowait()
+            while True:
+                self._handle(*message)
+                message = self._outbox.get_nowait()
+        except queue.Empty:
+            pass
+        self._supervise()
+        self._dispatch()
+
+    def shutdown(self, wait=False):
+        # Stops the workers. With wait, every queued job is run first,
+        # otherwise anything still queued is cancelled.
+        while not wait and self._pending:
+            self._pending.popleft().state = CANCELLED
+        while wait and self.active():
+            self.poll(timeout=0.5)
+        self._closed = True
+        # A busy worker isn't killed, that would take the form the user is waiting
+        # for with it. It's told to leave the defect where it is instead.
+        for worker in self._workers.values():
+            worker.inbox.put(LEAVE if worker.job is not None else None)
+        for worker in self._workers.values():
+            worker.process.join(timeout=10)
+            if worker.process.is_alive():
+                # Its browsers are in the registry, the next kill_orphans stops them.
+                worker.process.terminate()
+        self._workers.clear()
+
+    def _handle(self, kind, worker_id, job_id, payload):
+        if kind == EVENT and self.sink is not None:
+            self.sink.emit(payload)
+        job = self.jobs.get(job_id)
+        worker = self._workers.get(worker_id)
+        if job is None or worker is None or worker.job is not job:
+            # Left over from a worker that was already given up on.
+            return
+        if kind == EVENT:
+            if (payload["type"] == "step" and payload["name"] == "acquire_browser") or worker.progressed is not None:
+                worker.progressed = time.monotonic()
+        elif kind == PROGRESS:
+            if worker.progressed is not None:
+                worker.progressed = time.monotonic()
+            if self.on_progress is not None:
+                self.on_progress(job, payload)
+        elif kind == FINISHED:
+            worker.job = None
+            self._finish(job, payload)
+
+    def _supervise(self):
+        for worker in list(self._workers.values()):
+            if not worker.process.is_alive():
+                self._replace(worker, f"The worker running this defect crashed (exit code {worker.process.exitcode}).")
+            elif worker.job is not None and self.stall_timeout and worker.progressed is not None \
+                    and time.monotonic() - worker.progressed > self.stall_timeout:
+                worker.process.terminate()
+                worker.process.join(timeout=5)
+                self._replace(worker, f"This defect made no progress for {self.stall_timeout} seconds, its worker was stopped.")
+
+    def _replace(self, worker, reason):
+        # Fails the dead worker's job. The next _dispatch starts a fresh worker if there's work for it.
+        del self._workers[worker.id]
+        self.restarts += 1
+        if worker.job is not None:
+            self._finish(worker.job, reason)
+
+    def _dispatch(self):
+        if self._closed:
+            return
+        while self._pending:
+            worker = next((worker for worker in self._workers.values() if worker.job is None), None)
+            if worker is None:
+                if len(self._workers) >= self.max_workers:
+                    return
+                worker = self._start_worker()
+            job = self._pending.popleft()
+            try:
+                names, creds = self.prepare_job(job)
+            except Exception as e:
+                self._finish(job, str(e))
+                continue
+            job.state = RUNNING
+            worker.job = job
+            worker.progressed = None
+            worker.inbox.put((job.id, job.carrier, job.platform, job.overrides, names, creds))
+
+    def _start_worker(self):
+        worker_id = next(self._worker_ids)
+        inbox = self._context.Queue()
+        process = self._context.Process(target=worker_main, args=(worker_id, self.config, inbox, self._outbox),
+                                        name=f"defect-worker-{worker_id}", daemon=True)
+        process.start()
+        worker = Worker(worker_id, process, inbox)
+        self._workers[worker_id] = worker
+        return worker
+
+    def _finish(self, job, result):
+        job.result = result
+        job.state = DONE
+        self.on_finished(job)
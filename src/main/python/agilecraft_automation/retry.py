@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------
+#
+# (C) 2019 Isaak Meier
+# Released under MIT License
+# email isaakmeier12@gmail.com
+# icon made by Eucalyp from www.flaticon.com
+# -----------------------------------------------------------
+
+# What selenium calls the W3C WebDriver errors the async engine gets back,
+# so one set of policies in settings.json covers both engines.
+W3C_ERROR_NAMES = {
+    "element click intercepted": "ElementClickInterceptedException",
+    "element not interactable": "ElementNotInteractableException",
+    "stale element reference": "StaleElementReferenceException",
+    "no such element": "NoSuchElementException",
+    "no such frame": "NoSuchFrameException",
+    "timeout": "TimeoutException",
+}
+
+
+class RetryPolicy:
+    # How often one kind of error gets another try, and how long to wait before each.
+
+    # Attributes:
+    #     attempts (int): tries in total, counting the first
+    #     backoff (float): seconds before the second try
+    #     factor (float): each later wait is this many times longer
+    #     max_backoff (float): no wait is longer than this
+    def __init__(self, attempts=1, backoff=0.0, factor=1.0, max_backoff=10.0):
+        self.attempts = attempts
+        self.backoff = backoff
+        self.factor = factor
+        self.max_backoff = max_backoff
+
+    def delay(self, attempt):
+        # Returns:
+        #     float -- seconds to wait after the given (1 based) try failed
+        return min(self.backoff * self.factor ** (attempt - 1), self.max_backoff)
+
+
+class RetryPolicies:
+    # The "retries" section of settings.json: a policy per exception class name.
+    # An error is matched by its own class first, then its base classes, so a
+    # policy for WebDriverException covers every selenium error without its own.
+
+    def __init__(self, settings):
+        # Arguments:
+        #     settings {dict} -- the "retries" section of settings.json
+        self.policies = {}
+        for name, spec in settings["policies"].items():
+            self.policies[name] = RetryPolicy(spec.get("attempts", 1), spec.get("backoff", 0.0),
+                                              spec.get("factor", 1.0), settings["max_backoff"])
+
+    def policy_for(self, error):
+        # Returns:
+        #     RetryPolicy -- the policy for the error, None if it's never retried
+        names = [cls.__name__ for cls in type(error).__mro__]
+        code = getattr(error, "error", None)
+        if isinstance(code, str) and code in W3C_ERROR_NAMES:
+            names.insert(0, W3C_ERROR_NAMES[code])
+        for name in names:
+            if name in self.policies:
+                return self.policies[name]
+        return None
+
+    def delay_for(self, error, attempt):
+        # Returns:
+        #     float -- seconds to wait before trying again, None if the step shouldn't be tried again
+        policy = self.policy_for(error)
+        if policy is None or attempt >= policy.attempts:
+            return None
+        return policy.delay(attempt)
+
+
+class StepFailed(Exception):
+    # A step failed for good. Says how far the defect got, since with keep_for_user
+    # the half filled form is left open and can be finished by hand.
+    def __init__(self, step, error, completed, total):
+        Exception.__init__(self, f"{error} (stopped at '{step}', {completed} of {total} steps were done)")
+        self.step = step
+        self.error = error
+
+
+def create_policies(settings):
+    # Returns:
+    #     RetryPolicies -- from the "retries" section of settings.json, None when retrying is turned off
+    if not settings["retries"]["enabled"]:
+        return None
+    return RetryPolicies(settings["retries"])
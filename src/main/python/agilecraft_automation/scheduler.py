@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------
+#
+# (C) 2019 Isaak Meier
+# Released under MIT License
+# email isaakmeier12@gmail.com
+# icon made by Eucalyp from www.flaticon.com
+# -----------------------------------------------------------
+
+from concurrent.futures import ThreadPoolExecutor
+import itertools
+import threading
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+CANCELLED = "cancelled"
+
+
+class Job:
+    # One defect waiting to be filled out.
+
+    # Attributes:
+    #     id (int): unique for the lifetime of the scheduler
+    #     carrier (str): ATT, Sprint, TMO, or Verizon
+    #     platform (str): iOS or Android
+    #     overrides (dict): per defect tweaks, e.g. "names", "title" or "description"
+    #     state (str): queued, running, done or cancelled
+    #     result (str): "Success" or the error message once the job is done
+    def __init__(self, job_id, carrier, platform, overrides):
+        self.id = job_id
+        self.carrier = carrier
+        self.platform = platform
+        self.overrides = overrides or {}
+        self.state = QUEUED
+        self.result = None
+        self.future = None
+
+    def __repr__(self):
+        return f"<Job {self.id} {self.carrier} {self.platform} {self.state}>"
+
+
+class JobScheduler:
+    # Queues defects and runs them on a fixed number of worker threads.
+    # Results are stored on the Job that produced them, so it doesn't matter
+    # what order the jobs finish in.
+
+    def __init__(self, run_job, on_finished, max_workers=4):
+        # Arguments:
+        #     run_job {callable} -- called with a Job on a worker thread, returns "Success" or an error message
+        #     on_finished {callable} -- called with the Job on the worker thread once it's done
+        #     max_workers {int} -- how many jobs can run at the same time
+        self.run_job = run_job
+        self.on_finished = on_finished
+        self.jobs = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max(max_workers, 1), thread_name_prefix="defect")
+
+    def submit(self, carrier, platform, overrides=None):
+        # Queues a single defect.
+
+        # Returns:
+        #     Job -- the queued job
+        # The future is set before the lock is let go, shutdown() may be looking at active() already.
+        with self._lock:
+            job = Job(next(self._ids), carrier, platform, overrides)
+            job.future = self._executor.submit(self._run, job)
+            self.jobs[job.id] = job
+        return job
+
+    def submit_batch(self, entries):
+        # Queues a list of (carrier, platform, overrides) tuples in order.
+
+        # Returns:
+        #     list -- the queued jobs
+        return [self.submit(carrier, platform, overrides) for carrier, platform, overrides in entries]
+
+    def active(self):
+        # Returns:
+        #     list -- jobs that are queued or running
+        with self._lock:
+            return [job for job in self.jobs.values() if job.state in (QUEUED, RUNNING)]
+
+    def forget(self, job_id):
+        # Drops a finished job so the jobs dict doesn't grow forever.
+        with self._lock:
+            return self.jobs.pop(job_id, None)
+
+    def shutdown(self, wait=False):
+        # Stops the workers. With wait, every queued job is run first,
+        # otherwise anything still queued is cancelled.
+        if not wait:
+            for job in self.active():
+                if job.future.cancel():
+                    job.state = CANCELLED
+        self._executor.shutdown(wait=wait)
+
+    def _run(self, job):
+        job.state = RUNNING
+        try:
+            job.result = self.run_job(job)
+        except Exception as e:
+            job.result = str(e)
+        job.state = DONE
+        self.on_finished(job)
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------
+#
+# (C) 2019 Isaak Meier
+# Released under MIT License
+# email isaakmeier12@gmail.com
+# icon made by Eucalyp from www.flaticon.com
+# -----------------------------------------------------------
+
+import json
+import os
+import tempfile
+import threading
+import time
+
+# One SessionCache per file, see create_session_cache.
+_caches = {}
+_caches_lock = threading.Lock()
+
+# Fields Chrome's Network.setCookie understands, mapped from what Network.getAllCookies returns.
+CDP_COOKIE_FIELDS = ("name", "value", "domain", "path", "secure", "httpOnly", "sameSite", "expires")
+
+
+class SessionCache:
+    # Remembers the cookies of a logged in browser, per user, in a file only the
+    # current user can read. A new browser (even after the app restarts) gets them
+    # injected and goes straight to the defects grid instead of through SSO.
+    #
+    # The cookies are as good as a password while they last, which is why the
+    # file is private and entries are dropped after max_age_hours.
+
+    def __init__(self, path, max_age_hours=8):
+        # Arguments:
+        #     path {str} -- json file to keep the cookies in
+        #     max_age_hours {float} -- cookies older than this aren't tried anymore
+        self.path = os.path.expanduser(path)
+        self.max_age = max_age_hours * 3600
+        self._lock = threading.Lock()
+        self._sessions = self._read()
+
+    def restore(self, driver, user):
+        # Puts the user's saved cookies into the browser.
+
+        # Returns:
+        #     bool -- False if there was nothing usable to restore
+        cookies = self.usable_cookies(user)
+        if not cookies:
+            return False
+        driver.execute_cdp_cmd("Network.setCookies", {"cookies": cookies})
+        return True
+
+    def save(self, driver, user):
+        # Stores every cookie the browser has after a successful login. The SSO
+        # cookies live on a different domain from AgileCraft, so this asks Chrome
+        # for all of them rather than just the current page's.
+        self.remember(user, driver.execute_cdp_cmd("Network.getAllCookies", {})["cookies"])
+
+    def usable_cookies(self, user):
+        # Returns:
+        #     list -- the user's saved cookies ready for Network.setCookies, or None if they're too old
+        with self._lock:
+            entry = self._sessions.get(user)
+        if entry is None:
+            return None
+        now = time.time()
+        cookies = [cookie for cookie in entry["cookies"] if "expires" not in cookie or cookie["expires"] > now]
+        if now - entry["saved"] > self.max_age or not cookies:
+            self.forget(user)
+            return None
+        return cookies
+
+    def remember(self, user, cookies):
+        # Stores cookies as returned by Network.getAllCookies.
+        cookies = [{key: cookie[key] for key in CDP_COOKIE_FIELDS if key in cookie} for cookie in cookies]
+        for cookie in cookies:
+            # Session cookies come back with expires -1, which setCookie would treat as already expired.
+            if cookie.get("expires", 0) <= 0:
+                cookie.pop("expires", None)
+        with self._lock:
+            self._sessions[user] = {"saved": time.time(), "cookies": cookies}
+            self._write()
+
+    def forget(self, user):
+        # Drops a user's cookies, e.g. once the site has expired them.
+        with self._lock:
+            if self._sessions.pop(user, None) is not None:
+                self._write()
+
+    def _read(self):
+        try:
+            with open(self.path) as cache_file:
+                return json.load(cache_file)
+        except (OSError, ValueError):
+            return {}
+
+    def _write(self):
+        # Writes to a private temp file and swaps it in, so a crash never leaves half a file.
+        directory = os.path.dirname(self.path) or "."
+        try:
+            os.makedirs(directory, exist_ok=True)
+            handle, temp_path = tempfile.mkstemp(dir=directory, prefix=".sessions-")
+            with os.fdopen(handle, "w") as cache_file:
+                json.dump(self._sessions, cache_file)
+            os.replace(temp_path, self.path)
+        except OSError:
+            # Not being able to cache just means the next browser logs in normally.
+            pass
+
+
+def create_session_cache(settings):
+    # Builds the cache described by the "session_cache" section of settings.json.
+    # Everything in the process that asks for the same file gets the same cache, so
+    # cookies one browser saves are seen right away by the others (and by the direct
+    # backend), and two caches never overwrite each other's writes.
+
+    # Returns:
+    #     SessionCache -- or None when caching is turned off
+    if not settings["enabled"]:
+        return None
+    path = os.path.expanduser(settings["path"])
+    with _caches_lock:
+        if path not in _caches:
+            _caches[path] = SessionCache(path, settings["max_age_hours"])
+        return _caches[path]
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------
+#
+# (C) 2019 Isaak Meier
+# Released under MIT License
+# email isaakmeier12@gmail.com
+# icon made by Eucalyp from www.flaticon.com
+# -----------------------------------------------------------
+
+import copy
+import json
+
+# Everything the app can be tuned with. settings.json only needs to hold the
+# values that differ from these, anything missing falls back to the default.
+DEFAULTS = {
+    "site": {
+        # Where AgileCraft lives. The offline benchmarks point this at a local mock.
+        "base_url": "https://xci.agilecraft.com"
+    },
+    "browser": {
+        # "lean" leaves out what the automation never looks at: images, web fonts and
+        # anything matching blocked_urls aren't downloaded, extensions and the GPU are
+        # off, and a page counts as loaded once its HTML is parsed. "default" is Chrome
+        # as it comes.
+        "profile": "default",
+        # Run Chrome without a window. The command line always runs headless unless told --visible.
+        "headless": False,
+        # Lean profile only. Url patterns to block, "*" matches anything.
+        "blocked_urls": [
+            "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico",
+            "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+            "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+            "*hotjar.com*", "*nr-data.net*", "*newrelic.com*", "*fullstory.com*"
+        ]
+    },
+    "driver_pool": {
+        # How many logged in browsers to keep waiting for the next defect.
+        "size": 2,
+        # Hard cap on how many Chrome windows can be open at once.
+        "max_browsers": 4,
+        # With the async scheduler, how many defects share one Chrome as tabs.
+        # 1 gives every defect its own browser.
+        "tabs_per_browser": 1
+    },
+    "supervisor": {
+        # A browser is quit and replaced after this many defects, 0 for no limit.
+        "max_jobs": 25,
+        # ...or once chromedriver and its Chrome use more than this many MB together. Needs psutil. 0 for no limit.
+        "max_rss_mb": 1500,
+        # Browsers nobody has used for this many seconds are quit, 0 keeps them.
+        "max_idle_seconds": 900,
+        # Seconds between memory and CPU samples (shown in the window) and idle checks.
+        "interval": 5,
+        # Every run notes the chromedriver and Chrome processes it started here, so the
+        # ones a crashed run left behind are stopped the next time the app starts.
+        "registry": "~/.agilecraft_automation/browsers",
+        # On exit, also close browsers with a form you haven't saved yet.
+        "close_open_forms": False
+    },
+    "startup": {
+        # Once the window is up, start chromedriver and a browser in the background, so
+        # the first click doesn't wait for Chrome to launch. Threads and async schedulers only.
+        "prewarm": True,
+        # Log the warmed browser in with the saved credentials too.
+        "sign_in": True
+    },
+    "scheduler": {
+        # How many defects are filled out at the same time, the rest wait in the queue.
+        "max_workers": 4,
+        # "threads" runs every defect inside the app. "processes" gives each worker its
+        # own process and browsers, so a hung or crashed driver can't take the app down.
+        # "async" runs every defect on one event loop, no threads at all, which is the
+        # cheapest way to keep 20+ defects going at once.
+        "mode": "threads",
+        # Process mode only: a defect that makes no progress for this many seconds
+        # (after it got a browser) has its worker killed and restarted.
+        "stall_timeout": 120
+    },
+    "preflight": {
+        # Once the form is open, check every locator in form_plan.json with one script
+        # call before filling anything in. The form's structure is hashed, and once a
+        # form passes, later defects only compare the hash until the site changes.
+        "enabled": True,
+        # Stop the defect right away when a locator is missing. Off only records it.
+        "abort": True,
+        # Seconds to wait for the form to show up.
+        "timeout": 5
+    },
+    "retries": {
+        # A step that fails with one of these errors is tried again on the same form,
+        # after backoff seconds (times factor for every further try), instead of the
+        # whole defect failing. attempts counts the first try. A retry looks at what
+        # the failed try already filled in first, so nothing is entered twice.
+        # Errors that aren't listed (by class name, or a base class) fail the defect.
+        "enabled": True,
+        "policies": {
+            "ElementClickInterceptedException": {"attempts": 4, "backoff": 0.5, "factor": 2},
+            "ElementNotInteractableException": {"attempts": 3, "backoff": 0.5, "factor": 2},
+            "StaleElementReferenceException": {"attempts": 3, "backoff": 0.2, "factor": 2},
+            "TimeoutException": {"attempts": 2, "backoff": 1, "factor": 2},
+            "UnresolvedNamesError": {"attempts": 2, "backoff": 2, "factor": 1}
+        },
+        "max_backoff": 10
+    },
+    "fast_fill": {
+        # Set chosen.js dropdowns with one script call instead of two clicks each.
+        # Fields that don't take the value are still clicked.
+        "enabled": True
+    },
+    "direct_submit": {
+        # Post defects straight to the site instead of filling the form in a browser,
+        # using the cookies of the last browser login. The defect is filed right away,
+        # there's no open form to check first. Needs a "submit" section and a "field"
+        # for every step in form_plan.json. Thread mode only.
+        "enabled": False,
+        # When a defect can't be posted (no recent login, or the form plan is missing
+        # something), fill it out in a browser instead. That also refreshes the login.
+        "fallback": True,
+        # Connections kept open to the site, and seconds to wait for an answer.
+        "max_connections": 8,
+        "timeout": 30
+    },
+    "notify": {
+        # Type the notify list in chunks of chunk_size names per script call instead
+        # of one keystroke round trip per name.
+        "bulk": True,
+        "chunk_size": 25,
+        # Afterwards, wait up to confirm_timeout seconds for every name to become a tag.
+        # If the tag count stops changing for settle_ms first, the missing names are reported.
+        "confirm_timeout": 10,
+        "settle_ms": 500
+    },
+    "instrumentation": {
+        # Every step and wait is timed and appended to this json lines file.
+        # "python -m agilecraft_automation report" summarizes it.
+        "enabled": True,
+        "events_file": "~/.agilecraft_automation/events.jsonl"
+    },
+    "store": {
+        # The carrier/platform rosters and your login. The first time the app starts
+        # it imports names.json into this file.
+        "path": "~/.agilecraft_automation/agilecraft.db"
+    },
+    "session_cache": {
+        # Cookies from the last login are kept here (readable only by you) and
+        # reused by new browsers, so they skip SSO until the site expires them.
+        "enabled": True,
+        "path": "~/.agilecraft_automation/sessions.json",
+        "max_age_hours": 8
+    },
+    "waits": {
+        # Seconds to wait for the page to settle after a given step before moving on anyway.
+        "timeouts": {
+            "product": 10,
+            "release": 10,
+            "scroll": 5
+        },
+        "default_timeout": 5,
+        # Anything matching these that's visible means the page is still loading.
+        "overlay_selectors": [".blockUI.blockOverlay", ".loading-overlay", ".k-loading-mask"],
+        # How long the DOM has to stay still before the page counts as settled.
+        "settle_ms": 250,
+        # Seconds between checks.
+        "poll": 0.1
+    }
+}
+
+
+def merge(defaults, overrides):
+    # Recursively lays the overrides on top of a copy of the defaults.
+
+    # Returns:
+    #     dict -- the merged settings
+    merged = copy.deepcopy(defaults)
+    for key, value in overrides.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = merge(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
+def load_settings(path):
+    # Reads the settings file and fills in the defaults.
+    # A missing file just means the defaults are used.
+
+    # Returns:
+    #     dict -- the full settings
+    try:
+        with open(path) as json_file:
+            overrides = json.load(json_file)
+    except FileNotFoundError:
+        overrides = {}
+    return merge(DEFAULTS, overrides)
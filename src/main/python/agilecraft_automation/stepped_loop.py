@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------
+#
+# (C) 2019 Isaak Meier
+# Released under MIT License
+# email isaakmeier12@gmail.com
+# icon made by Eucalyp from www.flaticon.com
+# -----------------------------------------------------------
+
+import asyncio
+import selectors
+
+
+class SteppedEventLoop(asyncio.SelectorEventLoop):
+    # An asyncio event loop that another event loop (Qt's) runs one step at a time,
+    # instead of it blocking in run_forever.
+    #
+    # The loop never waits on its own. It tells the host which sockets it's waiting
+    # on (watch), and step() returns how long until its next timer is due, from the
+    # loop's own call_at/call_later schedule. The host runs step() when one of those
+    # sockets is ready or the time is up, and right away after wake() was called.
+    #
+    # run_until_complete still works as usual and blocks, e.g. for a shutdown.
+
+    def __init__(self, watch, wake):
+        # Arguments:
+        #     watch {callable} -- called with (fd, readable, writable) whenever what the loop waits for
+        #                         on a socket changes, with both False once it doesn't wait on it anymore
+        #     wake {callable} -- called when work is added outside of a step, e.g. a new task
+        self._stepped = _SteppedSelector(self, watch)
+        self._wake = wake
+        asyncio.SelectorEventLoop.__init__(self, self._stepped)
+
+    def step(self):
+        # Runs whatever is due now, without waiting for anything.
+
+        # Returns:
+        #     float -- seconds until the loop has something to do, 0 for right away and
+        #              None for once a watched socket is ready
+        self._stepped.stepping = True
+        try:
+            self.run_forever()
+        finally:
+            self._stepped.stepping = False
+        return self._stepped.next_step
+
+    def call_soon(self, callback, *args, context=None):
+        handle = asyncio.SelectorEventLoop.call_soon(self, callback, *args, context=context)
+        self._woken()
+        return handle
+
+    def call_at(self, when, callback, *args, context=None):
+        # call_later ends up here as well.
+        handle = asyncio.SelectorEventLoop.call_at(self, when, callback, *args, context=context)
+        self._woken()
+        return handle
+
+    def _woken(self):
+        # Inside a step the new work is part of what step() returns.
+        if not self.is_running() and not self.is_closed():
+            self._wake()
+
+
+class _SteppedSelector(selectors.DefaultSelector):
+    # The SteppedEventLoop's selector. Passes every change of what's watched on to the
+    # host, and while stepping only looks at the sockets and stops the loop after one pass.
+
+    def __init__(self, loop, watch):
+        selectors.DefaultSelector.__init__(self)
+        self.loop = loop
+        self.watch = watch
+        self.stepping = False
+        self.next_step = None
+
+    def register(self, fileobj, events, data=None):
+        key = selectors.DefaultSelector.register(self, fileobj, events, data)
+        self._changed(key.fd, events)
+        return key
+
+    def unregister(self, fileobj):
+        key = selectors.DefaultSelector.unregister(self, fileobj)
+        self._changed(key.fd, 0)
+        return key
+
+    def modify(self, fileobj, events, data=None):
+        key = selectors.DefaultSelector.modify(self, fileobj, events, data)
+        self._changed(key.fd, events)
+        return key
+
+    def select(self, timeout=None):
+        # timeout is what the loop would wait: 0 with callbacks ready to run, the time
+        # to its next timer, or None with nothing scheduled at all.
+        if not self.stepping:
+            return selectors.DefaultSelector.select(self, timeout)
+        events = selectors.DefaultSelector.select(self, 0)
+        # Whatever runs for these events can schedule more, so the host comes back right away.
+        self.next_step = 0 if events or timeout == 0 else timeout
+        self.loop.stop()
+        return events
+
+    def _changed(self, fd, events):
+        self.watch(fd, bool(events & selectors.EVENT_READ), bool(events & selectors.EVENT_WRITE))
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------
+#
+# (C) 2019 Isaak Meier
+# Released under MIT License
+# email isaakmeier12@gmail.com
+# icon made by Eucalyp from www.flaticon.com
+# -----------------------------------------------------------
+
+import json
+import os
+import queue
+import sqlite3
+import threading
+
+# Bumped whenever the tables change. 1 also means names.json has been migrated.
+SCHEMA_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rosters (
+    carrier TEXT NOT NULL,
+    platform TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    PRIMARY KEY (carrier, platform)
+);
+CREATE TABLE IF NOT EXISTS roster_names (
+    carrier TEXT NOT NULL,
+    platform TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    PRIMARY KEY (carrier, platform, position),
+    FOREIGN KEY (carrier, platform) REFERENCES rosters (carrier, platform) ON DELETE CASCADE
+);
+CREATE TABLE IF NOT EXISTS credentials (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    user TEXT NOT NULL,
+    pass TEXT NOT NULL
+);
+"""
+
+
+class RosterStore:
+    # The names for every carrier/platform button and the AgileCraft login, in SQLite.
+    #
+    # Everything is read into memory once, so lookups never touch the disk. Changes
+    # update memory right away and are written by a background thread, one
+    # transaction per change, so the GUI never waits on a write and a crash leaves
+    # either the old roster or the new one, never half of each.
+
+    def __init__(self, path, legacy_path=None, on_error=None):
+        # Arguments:
+        #     path {str} -- the database file, created if it doesn't exist
+        #     legacy_path {str} -- names.json to import the first time the database is opened
+        #     on_error {callable} -- called with the message if a background write fails
+        self.path = os.path.expanduser(path)
+        self.on_error = on_error
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        if not os.path.exists(self.path):
+            # The login is in here, so only the current user gets to read it.
+            os.close(os.open(self.path, os.O_CREAT | os.O_WRONLY, 0o600))
+        else:
+            os.chmod(self.path, 0o600)
+        self._connection = sqlite3.connect(self.path, check_same_thread=False)
+        # A rollback journal instead of WAL: it only exists during a write, while a -wal
+        # file keeps the login around until a checkpoint. Reads come from memory anyway.
+        self._connection.execute("PRAGMA journal_mode=DELETE")
+        self._connection.execute("PRAGMA foreign_keys=ON")
+        with self._connection:
+            self._connection.executescript(SCHEMA)
+        if self._connection.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+            self._migrate(legacy_path)
+        self._rosters, self._creds = self._load()
+        self._writes = queue.Queue()
+        self._writer = threading.Thread(target=self._write_loop, name="roster-store", daemon=True)
+        self._writer.start()
+
+    def rosters(self):
+        # Returns:
+        #     list -- (carrier, platform) of every roster, in the order the buttons are shown
+        with self._lock:
+            return list(self._rosters)
+
+    def has_roster(self, carrier, platform):
+        with self._lock:
+            return (carrier, platform) in self._rosters
+
+    def names(self, carrier, platform):
+        # Returns:
+        #     list -- the names to notify for this carrier and platform
+
+        # Raises:
+        #     KeyError: there's no roster for it
+        with self._lock:
+            return list(self._rosters[(carrier, platform)])
+
+    def set_names(self, carrier, platform, names):
+        # Replaces one roster. Only that roster's rows are rewritten.
+        names = list(names)
+        with self._lock:
+            position = list(self._rosters).index((carrier, platform)) if (carrier, platform) in self._rosters else len(self._rosters)
+            self._rosters[(carrier, platform)] = names
+
+        def write(connection):
+            connection.execute("INSERT OR IGNORE INTO rosters (carrier, platform, position) VALUES (?, ?, ?)", (carrier, platform, position))
+            connection.execute("DELETE FROM roster_names WHERE carrier = ? AND platform = ?", (carrier, platform))
+            connection.executemany("INSERT INTO roster_names (carrier, platform, position, name) VALUES (?, ?, ?, ?)",
+                                   [(carrier, platform, number, name) for number, name in enumerate(names)])
+        self._writes.put(write)
+
+    def creds(self):
+        # Returns:
+        #     dict -- "user" and "pass", or None if they were never set
+        with self._lock:
+            return dict(self._creds) if self._creds else None
+
+    def set_creds(self, user, password):
+        with self._lock:
+            self._creds = {"user": user, "pass": password}
+
+        def write(connection):
+            connection.execute("INSERT OR REPLACE INTO credentials (id, user, pass) VALUES (1, ?, ?)", (user, password))
+        self._writes.put(write)
+
+    def flush(self):
+        # Blocks until every queued change is on disk.
+        self._writes.join()
+
+    def close(self):
+        # Writes whatever is still queued and closes the database.
+        if self._writer.is_alive():
+            self._writes.put(None)
+            self._writer.join()
+        self._connection.close()
+
+    def _write_loop(self):
+        while True:
+            write = self._writes.get()
+            try:
+                if write is None:
+                    return
+                with self._connection:
+                    write(self._connection)
+            except sqlite3.Error as e:
+                if self.on_error is not None:
+                    self.on_error(f"Couldn't save your changes: {e}")
+            finally:
+                self._writes.task_done()
+
+    def _migrate(self, legacy_path):
+        # One time import of names.json, in a single transaction so it either all lands or is tried again next start.
+        data = {}
+        if legacy_path and os.path.exists(legacy_path):
+            with open(legacy_path) as json_file:
+                data = json.load(json_file)
+        with self._connection:
+            for position, (button, names) in enumerate((key, value) for key, value in data.items() if key not in ("user", "pass")):
+                carrier, _, platform = button.partition(" ")
+                self._connection.execute("INSERT OR IGNORE INTO rosters (carrier, platform, position) VALUES (?, ?, ?)", (carrier, platform, position))
+                self._connection.executemany("INSERT OR REPLACE INTO roster_names (carrier, platform, position, name) VALUES (?, ?, ?, ?)",
+                                             [(carrier, platform, number, name) for number, name in enumerate(names)])
+            if data.get("user"):
+                self._connection.execute("INSERT OR REPLACE INTO credentials (id, user, pass) VALUES (1, ?, ?)", (data["user"], data.get("pass", "")))
+            self._connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def _load(self):
+        rosters = {}
+        for carrier, platform in self._connection.execute("SELECT carrier, platform FROM rosters ORDER BY position"):
+            rosters[(carrier, platform)] = []
+        for carrier, platform, name in self._connection.execute("SELECT carrier, platform, name FROM roster_names ORDER BY carrier, platform, position"):
+            rosters[(carrier, platform)].append(name)
+        row = self._connection.execute("SELECT user, pass FROM credentials WHERE id = 1").fetchone()
+        creds = {"user": row[0], "pass": row[1]} if row else None
+        return rosters, creds
+
+
+def create_store(settings, legacy_path=None, on_error=None):
+    # Opens the store described by the "store" section of settings.json.
+
+    # Returns:
+    #     RosterStore -- ready to read from
+    return RosterStore(settings["path"], legacy_path, on_error)
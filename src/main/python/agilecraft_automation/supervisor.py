@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------
+#
+# (C) 2019 Isaak Meier
+# Released under MIT License
+# email isaakmeier12@gmail.com
+# icon made by Eucalyp from www.flaticon.com
+# -----------------------------------------------------------
+
+import json
+import os
+import tempfile
+import threading
+import time
+
+try:
+    import psutil
+except ImportError:
+    # Without psutil browsers are still recycled by job count and idle time,
+    # they just can't be measured, and leftovers from a crash aren't found.
+    psutil = None
+
+# One ResourceSupervisor per registry folder, see create_supervisor.
+_supervisors = {}
+_supervisors_lock = threading.Lock()
+
+
+def driver_pid(driver):
+    # Returns:
+    #     int -- the pid of a selenium driver's chromedriver, None if it can't be told
+    try:
+        return driver.service.process.pid
+    except AttributeError:
+        return None
+
+
+class Usage:
+    # What a group of processes is using.
+
+    # Attributes:
+    #     rss (int): resident memory in bytes
+    #     cpu (float): percent of one core since the last sample
+    #     processes (int): how many processes were counted
+    def __init__(self, rss=0, cpu=0.0, processes=0):
+        self.rss = rss
+        self.cpu = cpu
+        self.processes = processes
+
+    def megabytes(self):
+        return self.rss / 2 ** 20
+
+
+class ResourceSupervisor:
+    # Keeps track of the chromedriver processes this process starts, and the Chrome
+    # processes under them, so browsers can be measured and nothing outlives the app.
+    #
+    # Every chromedriver that's tracked is written to a registry file named after
+    # this process. If the app crashes the file stays behind, and the next start
+    # stops whatever in it is still running (kill_orphans). Processes are told apart
+    # by pid and start time, so a reused pid is never mistaken for one of ours.
+    #
+    # A background thread runs the registered tasks (like recycling idle browsers)
+    # every interval seconds.
+
+    def __init__(self, registry, interval=5):
+        # Arguments:
+        #     registry {str} -- folder for the registry files, shared by every process of the app
+        #     interval {float} -- seconds between runs of the tasks
+        self.registry = os.path.expanduser(registry)
+        self.path = os.path.join(self.registry, f"{os.getpid()}.json")
+        self.interval = interval
+        self._roots = {}
+        self._cpu_samples = {}
+        self._tasks = []
+        self._written = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def available(self):
+        # Returns:
+        #     bool -- whether processes can be measured and stopped, which needs psutil
+        return psutil is not None
+
+    def track(self, key, pid):
+        # Starts watching a chromedriver and everything it launches.
+
+        # Arguments:
+        #     key {object} -- what the caller will refer to it by, usually the driver
+        #     pid {int} -- chromedriver's pid
+        if psutil is None or pid is None:
+            return
+        try:
+            process = psutil.Process(pid)
+        except psutil.Error:
+            return
+        with self._lock:
+            self._roots[key] = process
+            self._write()
+
+    def forget(self, key):
+        # Stops watching a chromedriver, e.g. because its browser is left with the user.
+
+        # Returns:
+        #     list -- the processes that were in its tree a moment ago, for reap() once it's quit
+        with self._lock:
+            root = self._roots.pop(key, None)
+            if root is not None:
+                self._write()
+        return self._tree(root) if root is not None else []
+
+    def reap(self, processes, timeout=3):
+        # Stops whatever is still running of processes (from forget) after a quit,
+        # so a browser that didn't exit cleanly doesn't linger.
+
+        # Returns:
+        #     int -- how many processes had to be stopped
+        alive = []
+        for process in processes:
+            try:
+                if process.is_running():
+                    process.terminate()
+                    alive.append(process)
+            except psutil.Error:
+                pass
+        if not alive:
+            return 0
+        _, still_alive = psutil.wait_procs(alive, timeout=timeout)
+        for process in still_alive:
+            try:
+                process.kill()
+            except psutil.Error:
+                pass
+        return len(alive)
+
+    def usage(self, key):
+        # Returns:
+        #     Usage -- what one tracked chromedriver and its browser use, None if it can't be measured
+        with self._lock:
+            root = self._roots.get(key)
+        if root is None:
+            return None
+        return self._measure(self._tree(root))
+
+    def totals(self):
+        # Adds up every process this one has started, however deep. That covers
+        # every chromedriver and browser, and the worker processes of the process scheduler.
+
+        # Returns:
+        #     Usage -- the totals, None without psutil
+        if psutil is None:
+            return None
+        try:
+            children = psutil.Process().children(recursive=True)
+        except psutil.Error:
+            return None
+        usage = self._measure(children)
+        # Samples of processes that are gone only take up space.
+        running = {child.pid for child in children}
+        with self._lock:
+            self._cpu_samples = {pid: process for pid, process in self._cpu_samples.items() if pid in running}
+        return usage
+
+    def kill_orphans(self):
+        # Stops the chromedriver and Chrome processes of runs that didn't shut down
+        # properly: a crashed app, or a worker process that was killed.
+
+        # Returns:
+        #     int -- how many processes were stopped
+        if psutil is None:
+            return 0
+        try:
+            names = os.listdir(self.registry)
+        except OSError:
+            return 0
+        stopped = 0
+        for name in names:
+            path = os.path.join(self.registry, name)
+            if not name.endswith(".json") or path == self.path:
+                continue
+            try:
+                with open(path) as registry_file:
+                    entry = json.load(registry_file)
+            except (OSError, ValueError):
+                continue
+            if self._running(entry["owner"], entry["created"]) is not None:
+                continue
+            processes = []
+            for pid, created in entry["processes"]:
+                process = self._running(pid, created)
+                if process is not None:
+                    processes.append(process)
+            stopped += self.reap(processes)
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        return stopped
+
+    def add_task(self, task):
+        # Runs task on the supervisor's thread every interval seconds, once start() was called.
+        with self._lock:
+            self._tasks.append(task)
+
+    def start(self):
+        # Starts the background thread, if it isn't running yet.
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="resource-supervisor", daemon=True)
+            self._thread.start()
+
+    def close(self):
+        # Stops everything still tracked (browsers that are mid defect when the app exits)
+        # and removes the registry file, since nothing of this run is left to find.
+        self._stop.set()
+        with self._lock:
+            roots = list(self._roots.values())
+            self._roots.clear()
+        for root in roots:
+            self.reap(self._tree(root))
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            with self._lock:
+                tasks = list(self._tasks)
+            for task in tasks:
+                try:
+                    task()
+                except Exception:
+                    # One task failing shouldn't stop the others from running next time.
+                    pass
+            # Browsers start helper processes as they go, keep the registry up to date with them.
+            with self._lock:
+                if self._roots:
+                    self._write()
+
+    def _tree(self, root):
+        try:
+            return [root] + root.children(recursive=True)
+        except psutil.Error:
+            return [root]
+
+    def _measure(self, processes):
+        usage = Usage()
+        for process in processes:
+            # cpu_percent compares with the previous call on the same object, so the objects are kept.
+            with self._lock:
+                sampled = self._cpu_samples.get(process.pid)
+                if sampled is not None and sampled == process:
+                    process = sampled
+                else:
+                    self._cpu_samples[process.pid] = process
+            try:
+                usage.rss += process.memory_info().rss
+                usage.cpu += process.cpu_percent(None)
+                usage.processes += 1
+            except psutil.Error:
+                pass
+        return usage
+
+    def _running(self, pid, created):
+        # Returns:
+        #     psutil.Process -- the process, None if it's gone or the pid now belongs to another one
+        try:
+            process = psutil.Process(pid)
+            return process if abs(process.create_time() - created) < 0.01 else None
+        except psutil.Error:
+            return None
+
+    def _write(self):
+        # Same temp file and swap as the session cache, so a crash never leaves half a file.
+        # Called with the lock held, and only touches the disk when something changed.
+        processes = []
+        for root in self._roots.values():
+            for process in self._tree(root):
+                try:
+                    processes.append([process.pid, process.create_time()])
+                except psutil.Error:
+                    pass
+        if processes == self._written:
+            return
+        self._written = processes
+        try:
+            if not processes:
+                if os.path.exists(self.path):
+                    os.remove(self.path)
+                return
+            os.makedirs(self.registry, exist_ok=True)
+            handle, temp_path = tempfile.mkstemp(dir=self.registry, prefix=".browsers-")
+            with os.fdopen(handle, "w") as registry_file:
+                json.dump({"owner": os.getpid(), "created": psutil.Process().create_time(), "processes": processes}, registry_file)
+            os.replace(temp_path, self.path)
+        except OSError:
+            # Without the registry a crash can leave browsers behind, nothing worse.
+            pass
+
+
+class RecyclePolicy:
+    # When a pooled browser is quit instead of being used again. The next defect
+    # that needs a browser launches a fresh one.
+
+    def __init__(self, max_jobs=0, max_rss_mb=0, max_idle=0, supervisor=None):
+        # Arguments:
+        #     max_jobs {int} -- defects a browser is used for before it's replaced, 0 for no limit
+        #     max_rss_mb {float} -- memory of chromedriver plus its browser before it's replaced, 0 for no limit
+        #     max_idle {float} -- seconds an idle browser is kept, 0 to keep it
+        #     supervisor {ResourceSupervisor} -- measures memory, None to never check it
+        self.max_jobs = max_jobs
+        self.max_rss_mb = max_rss_mb
+        self.max_idle = max_idle
+        self.supervisor = supervisor
+
+    def reason(self, session, key=None):
+        # Arguments:
+        #     session {object} -- anything with .jobs
+        #     key {object} -- what the session's chromedriver is tracked by, None if it has none of its own
+
+        # Returns:
+        #     str -- why the session should be replaced, None if it can be used again
+        if self.max_jobs and session.jobs >= self.max_jobs:
+            return f"used for {session.jobs} defects"
+        if self.max_rss_mb and self.supervisor is not None and key is not None:
+            usage = self.supervisor.usage(key)
+            if usage is not None and usage.megabytes() > self.max_rss_mb:
+                return f"using {usage.megabytes():.0f} MB"
+        return None
+
+    def idle_too_long(self, idle_since):
+        return bool(self.max_idle) and time.time() - idle_since > self.max_idle
+
+
+def create_supervisor(settings):
+    # Everything in the process shares one supervisor per registry folder, like the session cache.
+
+    # Returns:
+    #     ResourceSupervisor -- for the "supervisor" section of settings.json
+    registry = os.path.expanduser(settings["registry"])
+    with _supervisors_lock:
+        if registry not in _supervisors:
+            _supervisors[registry] = ResourceSupervisor(registry, settings["interval"])
+        return _supervisors[registry]
+
+
+def create_policy(settings, supervisor=None):
+    # Returns:
+    #     RecyclePolicy -- for the "supervisor" section of settings.json
+    return RecyclePolicy(settings["max_jobs"], settings["max_rss_mb"], settings["max_idle_seconds"], supervisor)
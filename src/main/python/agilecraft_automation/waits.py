@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------
+#
+# (C) 2019 Isaak Meier
+# Released under MIT License
+# email isaakmeier12@gmail.com
+# icon made by Eucalyp from www.flaticon.com
+# -----------------------------------------------------------
+
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.support.ui import WebDriverWait
+import time
+
+# Runs in the page on every poll. The first call hooks XHR and fetch so we can
+# count requests in flight, and starts a MutationObserver that remembers when the
+# DOM last changed. Navigating away drops the hooks, so they're put back whenever
+# they're missing. The page counts as ready once its HTML is parsed, no overlay is
+# showing, no requests are in flight and the DOM has been quiet for the settle
+# window. Images and subframes still loading don't hold it up, so this doesn't
+# undo the lean profile's "eager" page loads.
+READY_JS = """
+var overlaySelectors = arguments[0], settleMs = arguments[1];
+var state = window.__agilecraftReadiness;
+if (!state) {
+    state = window.__agilecraftReadiness = {inflight: 0, lastChange: Date.now()};
+    var send = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.send = function() {
+        state.inflight++;
+        state.lastChange = Date.now();
+        this.addEventListener('loadend', function() {
+            state.inflight = Math.max(0, state.inflight - 1);
+            state.lastChange = Date.now();
+        });
+        return send.apply(this, arguments);
+    };
+    if (window.fetch) {
+        var fetch = window.fetch;
+        window.fetch = function() {
+            state.inflight++;
+            state.lastChange = Date.now();
+            var done = function() {
+                state.inflight = Math.max(0, state.inflight - 1);
+                state.lastChange = Date.now();
+            };
+            return fetch.apply(this, arguments).then(
+                function(r) { done(); return r; },
+                function(e) { done(); throw e; });
+        };
+    }
+    new MutationObserver(function() { state.lastChange = Date.now(); })
+        .observe(document.documentElement, {childList: true, subtree: true, attributes: true});
+    return false;
+}
+if (document.readyState === 'loading' || state.inflight > 0) {
+    return false;
+}
+for (var i = 0; i < overlaySelectors.length; i++) {
+    var overlays = document.querySelectorAll(overlaySelectors[i]);
+    for (var j = 0; j < overlays.length; j++) {
+        if (overlays[j].offsetWidth || overlays[j].offsetHeight || overlays[j].getClientRects().length) {
+            return false;
+        }
+    }
+}
+return Date.now() - state.lastChange >= settleMs;
+"""
+
+AT_BOTTOM_JS = "return window.innerHeight + window.pageYOffset >= document.body.scrollHeight - 2;"
+
+
+class ReadinessWaiter:
+    # Waits for the page to actually be ready instead of sleeping a fixed amount.
+    # Every wait is recorded in `history` as (name, seconds, timed_out) so slow steps show up.
+
+    def __init__(self, driver, settings, on_wait=None):
+        # Arguments:
+        #     driver {WebDriver} -- the browser to watch
+        #     settings {dict} -- the "waits" section of settings.json
+        #     on_wait {callable} -- also told about every wait, with (name, seconds, ok)
+        self.driver = driver
+        self.timeouts = settings["timeouts"]
+        self.default_timeout = settings["default_timeout"]
+        self.overlay_selectors = settings["overlay_selectors"]
+        self.settle_ms = settings["settle_ms"]
+        self.poll = settings["poll"]
+        self.history = []
+        self.on_wait = on_wait
+
+    def install(self):
+        # Hooks the page early, so requests started by the next click are counted.
+        self.driver.execute_script(READY_JS, self.overlay_selectors, self.settle_ms)
+
+    def wait_until_ready(self, name):
+        # Blocks until no overlay is up and the network and DOM have settled.
+        self.wait_for(name, lambda driver: driver.execute_script(READY_JS, self.overlay_selectors, self.settle_ms))
+
+    def wait_until_scrolled(self, name):
+        # Blocks until the window has reached the bottom of the page and the page is ready.
+        self.wait_for(name, lambda driver: driver.execute_script(AT_BOTTOM_JS)
+                      and driver.execute_script(READY_JS, self.overlay_selectors, self.settle_ms))
+
+    def wait_for(self, name, condition):
+        # Polls the condition until it's true or the step's timeout runs out.
+        # Running out of time isn't an error here, the next element wait will fail
+        # loudly if the page really isn't usable. It is recorded though.
+        timeout = self.timeouts.get(name, self.default_timeout)
+        started = time.perf_counter()
+        timed_out = False
+        try:
+            WebDriverWait(self.driver, timeout, poll_frequency=self.poll).until(condition)
+        except TimeoutException:
+            timed_out = True
+        seconds = time.perf_counter() - started
+        self.history.append((name, seconds, timed_out))
+        if self.on_wait is not None:
+            self.on_wait(f"ready:{name}", seconds, not timed_out)
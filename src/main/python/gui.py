@@ -0,0 +1,624 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------
+# The window of the AgileCraft Automation Application, started by main.py.
+#
+# (C) 2019 Isaak Meier
+# Released under MIT License
+# email isaakmeier12@gmail.com
+# icon made by Eucalyp from www.flaticon.com
+# -----------------------------------------------------------
+
+from fbs_runtime.application_context.PyQt5 import ApplicationContext
+from agilecraft_automation.instrumentation import StartupClock, create_sink
+from agilecraft_automation.process_pool import ProcessScheduler
+from agilecraft_automation.scheduler import JobScheduler
+from agilecraft_automation.settings import load_settings
+from agilecraft_automation.store import create_store
+from agilecraft_automation.supervisor import create_supervisor
+from datetime import datetime
+from PyQt5.QtWidgets import *
+from PyQt5.QtCore import *
+import importlib
+import math
+import threading
+import time
+import webbrowser
+import json
+import sys
+import os
+
+# What each scheduler mode needs that pulls in selenium. Those imports take longer than
+# building the whole window, so they're done on a background thread once it's showing.
+ENGINE_MODULES = {
+    "threads": ["script_runner", "agilecraft_automation.automation", "agilecraft_automation.direct_submit"],
+    "processes": [],
+    "async": ["agilecraft_automation.async_engine"],
+}
+
+class JobSignals(QObject):
+    # The scheduler runs jobs on its worker threads.
+    # Emitting these hands the job id (and progress text) back to the GUI thread.
+    finished = pyqtSignal(int)
+    progress = pyqtSignal(int, str)
+
+class StoreSignals(QObject):
+    # The roster store saves on its own thread, failures come back to the GUI through this.
+    failed = pyqtSignal(str)
+
+class EngineSignals(QObject):
+    # The engine is loaded and the first browser warmed up on background threads.
+    # These bring the form plan (or the error) and the warm up's result to the GUI thread.
+    loaded = pyqtSignal(object)
+    failed = pyqtSignal(str)
+    warmed = pyqtSignal(str)
+
+class SupervisorSignals(QObject):
+    # The resource supervisor samples on its own thread, these bring the numbers to the GUI.
+    sampled = pyqtSignal(object)
+    swept = pyqtSignal(int)
+
+class EventLoopHost:
+    # Runs the async scheduler's event loop inside Qt's. Every socket the loop waits
+    # on gets a QSocketNotifier, and its next timer a single shot QTimer, so the loop
+    # runs as soon as chromedriver answers or a sleep is over, and never blocks the window.
+
+    def __init__(self):
+        # Imported here, like the rest of the engine, so the window doesn't wait for it.
+        from agilecraft_automation.stepped_loop import SteppedEventLoop
+        self.notifiers = {}
+        self.timer = QTimer()
+        self.timer.setSingleShot(True)
+        self.timer.setTimerType(Qt.PreciseTimer)
+        self.timer.timeout.connect(self.step)
+        self.loop = SteppedEventLoop(self.watch, self.wake)
+
+    def watch(self, fd, readable, writable):
+        for kind, wanted in ((QSocketNotifier.Read, readable), (QSocketNotifier.Write, writable)):
+            notifier = self.notifiers.pop((fd, kind), None)
+            if notifier is not None:
+                notifier.setEnabled(False)
+                notifier.deleteLater()
+            if wanted:
+                notifier = QSocketNotifier(fd, kind)
+                notifier.activated.connect(self.step)
+                self.notifiers[(fd, kind)] = notifier
+
+    def wake(self):
+        self.timer.start(0)
+
+    def step(self):
+        if self.loop.is_closed():
+            return
+        wait = self.loop.step()
+        if wait is None:
+            self.timer.stop()
+        else:
+            self.timer.start(math.ceil(wait * 1000))
+
+class AppContext(ApplicationContext):           # 1. Subclass ApplicationContext
+    # This class makes the whole view using PyQt.
+    # It also handles data updates through menu items.
+    # When a button is pressed, we get the correct data for the defect
+    # from the roster store and queue a job on the JobScheduler, which runs
+    # a ScriptRunner for it on one of a fixed number of worker threads.
+    # Selenium isn't imported until the window is up, see load_engine.
+
+    def __init__(self, launched=None):
+        # Arguments:
+        #     launched {float} -- perf_counter() when the process started, the startup times count from there
+        ApplicationContext.__init__(self)
+        self.launched = launched if launched is not None else time.perf_counter()
+
+    def run(self):                              # 2. Implement run()
+        # Creates the main window and calls setup functions.
+        # Makes top level QMainWindow, and displays it.
+        # Sets up app and returns an exit code.
+        self.window = QMainWindow()
+        self.window.show()
+        self.init_defaults()
+        self.setup_layout()
+        self.setup_buttons()
+        self.setup_menus()
+        # Fires as soon as the event loop runs, right after the window is first drawn.
+        QTimer.singleShot(0, self.on_window_shown)
+        return self.app.exec_()
+
+    def init_defaults(self):
+        # Makes some stuff.
+        # Attributes:
+        #     label (QLabel): A label that displays text to the user.
+        #     settings (dict): Tuning values from settings.json.
+        #     store (RosterStore): The names for each button and the user's login.
+        #     form_plan (FormPlan): The Add Defect form steps and locators from form_plan.json, None until the engine has loaded.
+        #     driver_pool (DriverPool): Warm, logged in browsers shared by every ScriptRunner (thread mode only).
+        #     submitter (DirectSubmitter): Posts defects without a browser, None unless direct_submit is on (thread mode only).
+        #     scheduler (JobScheduler, ProcessScheduler or AsyncScheduler): Queue of defects waiting for a worker, None until the engine has loaded.
+        #     pending (list): Defects clicked before the scheduler was there, they're queued once it is.
+        #     event_sink (JsonLinesSink): Where step timings are written.
+        #     startup (StartupClock): Records how long until the window, the engine, the first browser and the first defect.
+        #     supervisor (ResourceSupervisor): Tracks every browser's processes, recycles idle ones and stops leftovers.
+        self.label = QLabel(self.opening_message())
+        self.label.setTextInteractionFlags(Qt.TextSelectableByMouse)
+        self.label.setMaximumWidth(300)
+        self.label.setWordWrap(True)
+
+        self.editor = QTextEdit()
+        self.editor_done_button = QPushButton("Done")
+        self.editor_done_button.setDefault(True)
+        self.editor_done_button.setAutoDefault(False)
+        self.editor_done_button.clicked.connect(self.finish_edit_names)
+        self.editor_cancel_button = QPushButton("Cancel")
+        self.editor_cancel_button.clicked.connect(self.finish_edit_names)
+        self.edit_name_mode = False
+
+        self.chrome_driver_path= self.get_resource('chromedriver') # 2. Set chrome driver path in the script_runner.
+        self.settings = load_settings(self.get_resource('settings.json'))
+
+        # Rosters and credentials are saved in the background, names.json is only read the very first time.
+        self.store_signals = StoreSignals()
+        self.store_signals.failed.connect(self.label.setText)
+        self.store = create_store(self.settings["store"], self.get_resource('names.json'), self.store_signals.failed.emit)
+        self.app.aboutToQuit.connect(self.store.close)
+
+        # Defects are queued and run a few at a time, results come back by job id.
+        self.job_signals = JobSignals()
+        self.job_signals.finished.connect(self.complete_script)
+        self.job_signals.progress.connect(self.update_job_progress)
+        self.job_progress = {}
+        self.event_sink = create_sink(self.settings["instrumentation"])
+        self.startup = StartupClock(self.event_sink, self.launched)
+
+        # The scheduler is built once load_engine has imported selenium and read the form plan.
+        self.form_plan = None
+        self.driver_pool = None
+        self.submitter = None
+        self.scheduler = None
+        self.engine_error = None
+        self.pending = []
+        self.first_click = None
+        self.engine_signals = EngineSignals()
+        self.engine_signals.loaded.connect(self.start_scheduler)
+        self.engine_signals.failed.connect(self.engine_failed)
+        self.engine_signals.warmed.connect(self.browser_warmed)
+
+        # Memory and CPU of every browser (and worker) go in the status bar.
+        self.supervisor = create_supervisor(self.settings["supervisor"])
+        self.supervisor_signals = SupervisorSignals()
+        self.supervisor_signals.sampled.connect(self.show_usage)
+        self.supervisor_signals.swept.connect(self.show_swept)
+        self.usage_label = QLabel()
+
+    def on_window_shown(self):
+        self.startup.mark("window")
+        if self.supervisor.available:
+            self.window.statusBar().addPermanentWidget(self.usage_label)
+            self.supervisor.add_task(lambda: self.supervisor_signals.sampled.emit(self.supervisor.totals()))
+            # Worker processes that were killed leave their browsers behind.
+            self.supervisor.add_task(self.supervisor.kill_orphans)
+        self.supervisor.start()
+        plan_path = self.get_resource('form_plan.json')
+        threading.Thread(target=self.load_engine, args=(plan_path,), name="load-engine", daemon=True).start()
+
+    def load_engine(self, plan_path):
+        # Runs on a background thread while the window is already showing, so the
+        # user never waits on the selenium imports to see the app.
+        # Browsers an earlier run crashed without closing are stopped first.
+        swept = self.supervisor.kill_orphans()
+        if swept:
+            self.supervisor_signals.swept.emit(swept)
+        try:
+            for module in ENGINE_MODULES.get(self.settings["scheduler"]["mode"], ENGINE_MODULES["threads"]):
+                importlib.import_module(module)
+            from agilecraft_automation.form_plan import load_form_plan
+            form_plan = load_form_plan(plan_path)
+        except Exception as e:
+            self.engine_signals.failed.emit(f"Couldn't start the automation: {e}")
+            return
+        self.engine_signals.loaded.emit(form_plan)
+
+    def start_scheduler(self, form_plan):
+        # Called on the GUI thread once the engine has loaded. Queues whatever was
+        # clicked in the meantime, or warms up a browser for the first click.
+        self.form_plan = form_plan
+        if self.settings["scheduler"]["mode"] == "processes":
+            self.setup_process_scheduler()
+        elif self.settings["scheduler"]["mode"] == "async":
+            self.setup_async_scheduler()
+        else:
+            self.setup_thread_scheduler()
+        self.app.aboutToQuit.connect(self.scheduler.shutdown)
+        self.app.aboutToQuit.connect(self.stop_browsers)
+        self.startup.mark("engine")
+        if self.pending:
+            entries, self.pending = self.pending, []
+            self.scheduler.submit_batch(entries)
+            self.show_progress()
+        else:
+            self.warm_up()
+
+    def engine_failed(self, error):
+        self.engine_error = error
+        self.pending = []
+        self.startup.mark("engine", ok=False, error=error)
+        self.label.setText(error)
+
+    def warm_up(self):
+        # Starts chromedriver and one browser, logged in if there are saved credentials,
+        # so the first defect doesn't wait for Chrome to launch.
+        startup = self.settings["startup"]
+        if not startup["prewarm"]:
+            return
+        creds = self.store.creds() if startup["sign_in"] else None
+        if creds is not None and creds["user"] == "":
+            creds = None
+        if self.driver_pool is not None:
+            threading.Thread(target=self.warm_pool, args=(creds,), name="warm-up", daemon=True).start()
+        elif self.settings["scheduler"]["mode"] == "async":
+            self.scheduler.warm(creds, self.browser_warmed)
+
+    def warm_pool(self, creds):
+        # Runs on a background thread. One browser is enough, more are launched as defects need them.
+        try:
+            self.driver_pool.warm(creds, count=1)
+        except Exception as e:
+            self.engine_signals.warmed.emit(str(e))
+            return
+        self.engine_signals.warmed.emit("Success")
+
+    def show_usage(self, usage):
+        if usage is not None:
+            self.usage_label.setText(f"Browsers: {usage.processes} processes, {usage.megabytes():.0f} MB, {usage.cpu:.0f}% CPU")
+
+    def show_swept(self, count):
+        self.window.statusBar().showMessage(f"Stopped {count} browser processes an earlier run left behind.", 10000)
+
+    def stop_browsers(self):
+        # The last thing on exit, after the pool and the scheduler have closed what they own.
+        # Stops browsers that were still filling a defect, and those of workers that didn't exit cleanly.
+        self.supervisor.close()
+        self.supervisor.kill_orphans()
+
+    def browser_warmed(self, result):
+        # A failed warm up is only recorded. The first defect runs into the same problem and reports it.
+        self.startup.mark("browser", ok=result == "Success", result=result)
+
+    def setup_thread_scheduler(self):
+        # Every defect runs on a worker thread in this process.
+        # Browsers are shared between defects instead of opening a new one per click.
+        from agilecraft_automation.automation import create_pool
+        from agilecraft_automation.direct_submit import create_submitter
+        self.driver_pool = create_pool(self.settings, self.chrome_driver_path)
+        self.app.aboutToQuit.connect(lambda: self.driver_pool.close(self.settings["supervisor"]["close_open_forms"]))
+        self.submitter = create_submitter(self.settings, self.form_plan)
+        if self.submitter is not None:
+            self.app.aboutToQuit.connect(self.submitter.close)
+        self.scheduler = JobScheduler(
+            self.run_job,
+            lambda job: self.job_signals.finished.emit(job.id),
+            max_workers=self.settings["scheduler"]["max_workers"])
+
+    def setup_process_scheduler(self):
+        # Every worker is its own process with its own browsers. The scheduler only
+        # does something when polled, so a timer polls it from the GUI thread.
+        scheduler_settings = self.settings["scheduler"]
+        max_workers = max(scheduler_settings["max_workers"], 1)
+        config = {
+            "settings": self.settings,
+            "plan_path": self.get_resource('form_plan.json'),
+            "chrome_driver_path": self.chrome_driver_path,
+            "headless": None,
+            "keep_for_user": True,
+            "max_browsers": max(self.settings["driver_pool"]["max_browsers"] // max_workers, 1),
+        }
+        self.driver_pool = None
+        self.scheduler = ProcessScheduler(
+            config,
+            lambda job: (self.job_names(job), self.creds),
+            lambda job: self.job_signals.finished.emit(job.id),
+            on_progress=lambda job, text: self.job_signals.progress.emit(job.id, text),
+            sink=self.event_sink,
+            max_workers=max_workers,
+            stall_timeout=scheduler_settings["stall_timeout"])
+        self.scheduler_timer = QTimer()
+        self.scheduler_timer.timeout.connect(self.scheduler.poll)
+        self.scheduler_timer.start(100)
+
+    def setup_layout(self):
+        # Creates the layout.
+        # Attributes:
+        #     widget (QWidget): central widget of the window
+        #     top_level_layout (QVBoxLayout): layout on the widget,
+        #     owns the buttons and label layout as well as the editor frame
+        #     button_frame (QFrame): hideable frame for all the buttons
+        #     button_layout (QVBoxLayout): lays out the buttons. Not hideable.
+        self.widget = QWidget()
+        self.window.setCentralWidget(self.widget)
+
+        self.top_level_layout  = QHBoxLayout()
+        buttons_and_label_layout = QVBoxLayout()
+        self.editor_frame = QFrame()
+
+        self.button_frame = QFrame()
+        self.button_layout = QVBoxLayout()
+        self.button_frame.setLayout(self.button_layout)
+        buttons_and_label_layout.addWidget(self.button_frame)
+        buttons_and_label_layout.addWidget(self.label)
+
+        editor_layout = QVBoxLayout()
+        self.editor_frame.setLayout(editor_layout)
+        editor_layout.addWidget(self.editor)
+        editor_button_layout = QHBoxLayout()
+        editor_button_layout.addWidget(self.editor_cancel_button)
+        editor_button_layout.addWidget(self.editor_done_button)
+        editor_layout.addLayout(editor_button_layout)
+
+        self.top_level_layout.addLayout(buttons_and_label_layout)
+        self.top_level_layout.addWidget(self.editor_frame)
+        self.editor_frame.hide()
+        self.widget.setLayout(self.top_level_layout)
+
+    def setup_buttons(self):
+        # Builds all the buttons.
+
+        # Attributes:
+        #     button (QPushButton): one per roster in the store, gets connected to the on_button_clicked function.
+        for carrier, platform in self.store.rosters():
+            button = QPushButton(f"{carrier} {platform}")
+            button.clicked.connect(self.on_button_clicked)
+            self.button_layout.addWidget(button)
+
+    def setup_menus(self):
+        # Creates and adds menu items and connects them to their respective actions.
+        menu = self.window.menuBar().addMenu('Settings')
+        action = menu.addAction('Set username and password')
+        action.triggered.connect(self.update_user_pass)
+        action = menu.addAction('Edit names')
+        action.triggered.connect(self.begin_edit_names)
+        menu = self.window.menuBar().addMenu('Batch')
+        action = menu.addAction('Run batch from file...')
+        action.triggered.connect(self.choose_batch_file)
+
+    def update_user_pass(self):
+        # Creates a popup to change username and password.
+        self.exPopup = QWidget()
+        popup_layout = QFormLayout()
+
+        self.user_box = QLineEdit()
+        user_label = QLabel("Email: ")
+        self.user_box.setFixedWidth(200)
+        popup_layout.addRow(user_label, self.user_box)
+
+        self.pass_box = QLineEdit()
+        pass_label = QLabel("Password: ")
+        self.pass_box.setFixedWidth(200)
+        self.pass_box.setEchoMode(QLineEdit.Password)
+        popup_layout.addRow(pass_label, self.pass_box)
+
+        show_pass_checkbox = QCheckBox("Show password")
+        show_pass_checkbox.stateChanged.connect(self.show_pass)
+        popup_layout.addWidget(show_pass_checkbox)
+
+        submit_button = QPushButton('Update Credentials')
+        submit_button.setDefault(True)
+        submit_button.clicked.connect(self.write_user_creds)
+        popup_layout.addWidget(submit_button)
+
+        self.exPopup.setLayout(popup_layout)
+        self.exPopup.setFixedWidth(400)
+        self.exPopup.show()
+
+    def write_names(self, new_names):
+        # Saves the edited roster. The store writes it in the background.
+        carrier, platform = self.currently_editing_button.split()
+        self.store.set_names(carrier, platform, new_names)
+
+    def show_pass(self, state):
+        # Hides and unhides the password text.
+        if state == Qt.Checked:
+            self.pass_box.setEchoMode(QLineEdit.Normal)
+        else:
+            self.pass_box.setEchoMode(QLineEdit.Password)
+
+    def write_user_creds(self):
+        # Saves the new user creds to the store and closes popup.
+        self.store.set_creds(self.user_box.text(), self.pass_box.text())
+        self.exPopup.close()
+        self.label.setText("Your credentials have been successfully updated.")
+
+    def read_creds(self):
+        # Reads the user's credentials from the store.
+        # Returns:
+        #     dict -- user password dict
+        creds = self.store.creds()
+        if creds is None or creds["user"] == "":
+            self.label.setText("Please set your email and password for AgileCraft in the Settings menu.")
+            return ""
+        return creds
+
+    def begin_edit_names(self):
+        # Allows users to update the names associated with a button.
+        # Opens specific name data for a button in a custom editor.
+        self.edit_name_mode = True
+        self.editor_frame.show()
+        self.window.setWindowTitle("Editing...")
+        self.label.setText("Edit Mode:\nClick a button to display its names.\nOnly one name per line, please.")
+        self.window.setFixedSize(self.top_level_layout.sizeHint())
+
+    def finish_edit_names(self):
+        sending_button = self.widget.sender()
+        if sending_button.text() == "Done":
+            new_names = self.editor.toPlainText().split("\n")
+            self.write_names(new_names)
+            self.label.setText(f"Successfully updated names for {self.currently_editing_button}")
+        else:
+            self.label.setText("Finished editing.")
+        self.editor.setText("")
+        self.editor_frame.hide()
+        self.edit_name_mode = False
+        self.window.setWindowTitle("Complete.")
+        self.window.setFixedSize(self.top_level_layout.sizeHint())
+
+    def open_editor(self, specific_names):
+        names_str = "\n".join(specific_names)
+        self.editor.setText(names_str)
+
+    def opening_message(self):
+        # Gets part of day from hour and makes a welcome message.
+        #
+        # Returns:
+        #     str -- part of day
+        hour = datetime.now().hour
+        day_part = (
+            "morning" if 5 <= hour <= 11
+            else
+            "afternoon" if 12 <= hour <= 17
+            else
+            "evening" if 18 <= hour <= 22
+            else
+            "time to hit the sack.."
+        )
+        return "Good {0}. Please select your choice.\n".format(day_part)
+
+    def on_button_clicked(self):
+        # If any button is clicked this gets called.
+        # Gets the name of the button that called this method from the main widget.
+        # In edit mode the button's names go to the editor, otherwise the
+        # button name is split into carrier and platform and queued as a job.
+        sending_button = self.widget.sender()
+        text = sending_button.text()
+        splitName = text.split()
+        carrier = splitName[0]
+        platform = splitName[1]
+
+        # If edit mode is on, send these names to the editor and chill with the rest of the function
+        if self.edit_name_mode:
+            self.currently_editing_button = text
+            self.open_editor(self.store.names(carrier, platform))
+            return
+        self.run_batch([(carrier, platform, {})])
+
+    def choose_batch_file(self):
+        # Lets the user pick a json file with a list of defects to file in one go.
+        # Each entry looks like {"carrier": "TMO", "platform": "iOS", "overrides": {"title": "..."}},
+        # "overrides" is optional and can also hold a "names" list to use instead of the roster.
+        path, _ = QFileDialog.getOpenFileName(self.window, "Choose a batch file", "", "JSON files (*.json)")
+        if not path:
+            return
+        try:
+            with open(path) as json_file:
+                entries = [(entry["carrier"], entry["platform"], entry.get("overrides", {})) for entry in json.load(json_file)]
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            self.label.setText(f"Couldn't read that batch file: {e}")
+            return
+        unknown = [f"{carrier} {platform}" for carrier, platform, _ in entries if not self.store.has_roster(carrier, platform)]
+        if unknown:
+            self.label.setText(f"The batch file has entries with no names set up: {', '.join(unknown)}")
+            return
+        self.run_batch(entries)
+
+    def run_batch(self, entries):
+        # Queues a list of (carrier, platform, overrides) defects on the scheduler.
+        # Only as many run at once as the scheduler has workers, the rest wait their turn.
+        creds = self.read_creds()
+        if creds == "":
+            return
+        self.creds = creds
+        if self.first_click is None:
+            self.first_click = time.perf_counter()
+        if self.scheduler is None:
+            if self.engine_error is not None:
+                self.label.setText(self.engine_error)
+                return
+            # Still starting up, they're queued as soon as the scheduler is there.
+            self.pending.extend(entries)
+            self.label.setText("Starting up, your defects will begin in a moment...")
+            self.window.setWindowTitle("In progress")
+            return
+        self.scheduler.submit_batch(entries)
+        self.show_progress()
+        self.window.setWindowTitle("In progress")
+
+    def setup_async_scheduler(self):
+        # Every defect is a task on one asyncio event loop, which Qt's event loop runs
+        # on the GUI thread (see EventLoopHost), so there are no worker threads at all.
+        from agilecraft_automation.async_engine import AsyncScheduler
+        config = {
+            "settings": self.settings,
+            "form_plan": self.form_plan,
+            "chrome_driver_path": self.chrome_driver_path,
+            "headless": None,
+            "keep_for_user": True,
+        }
+        self.driver_pool = None
+        self.loop_host = EventLoopHost()
+        self.scheduler = AsyncScheduler(
+            config,
+            lambda job: (self.job_names(job), self.creds),
+            lambda job: self.job_signals.finished.emit(job.id),
+            on_progress=lambda job, text: self.job_signals.progress.emit(job.id, text),
+            sink=self.event_sink,
+            max_workers=self.settings["scheduler"]["max_workers"],
+            loop=self.loop_host.loop)
+
+    def run_job(self, job):
+        # Runs on a scheduler worker thread.
+        # Fills out one defect and returns "Success" or the error message.
+        # With direct_submit on the defect is posted instead, and the browser is only the fallback.
+        from script_runner import ScriptRunner
+        from agilecraft_automation.direct_submit import DirectDefect
+        on_progress = lambda text: self.job_signals.progress.emit(job.id, text)
+        sr = ScriptRunner(job.carrier, self.job_names(job), job.platform, self.creds, self.driver_pool, self.settings, self.form_plan, job.overrides,
+                          sink=self.event_sink, on_progress=on_progress)
+        if self.submitter is None:
+            return sr.run()
+        fallback = sr.run if self.settings["direct_submit"]["fallback"] else None
+        direct = DirectDefect(job.carrier, self.job_names(job), job.platform, self.creds, self.submitter, self.form_plan, job.overrides,
+                              fallback=fallback, sink=self.event_sink, on_progress=on_progress)
+        return direct.run()
+
+    def job_names(self, job):
+        # Returns:
+        #     list -- the names to notify for a job, from its overrides or the button's roster
+        return job.overrides["names"] if "names" in job.overrides else self.store.names(job.carrier, job.platform)
+
+    def update_job_progress(self, job_id, text):
+        # Remembers which step a running job is on and refreshes the label.
+        self.job_progress[job_id] = text
+        self.show_progress()
+
+    def show_progress(self):
+        # Shows each running job's current step, and how many are still waiting in the queue.
+        active = self.scheduler.active()
+        if not active:
+            return
+        lines = []
+        for job in active:
+            if job.id in self.job_progress:
+                lines.append(f"{job.carrier} {job.platform} (job {job.id}): {self.job_progress[job.id]}")
+        queued = len(active) - len(lines)
+        if queued:
+            lines.append(f"{queued} waiting to start...")
+        self.label.setText("\n".join(lines))
+
+    def complete_script(self, job_id):
+        # Called on the GUI thread when a job finishes with Success or an error.
+        # The result is looked up by the job's id, so jobs can finish in any order.
+        job = self.scheduler.forget(job_id)
+        self.job_progress.pop(job_id, None)
+        if job is None:
+            return
+        # Only the first defect since launch is recorded.
+        self.startup.mark("first_defect", ok=job.result == "Success", since_click=round(time.perf_counter() - self.first_click, 4))
+        self.show_progress()
+        if job.result != "Success":
+            self.handle_error(job.result, job)
+        elif not self.scheduler.active():
+            self.label.setText("Done.")
+            self.window.setWindowTitle("Complete")
+
+    def handle_error(self, error, job):
+        # Creates a popup to display the error to the user
+        error_popup = QMessageBox(QMessageBox.NoIcon, "Oh no!", f"Oops, we encountered an error on {job.carrier} {job.platform} (job {job.id}). If you don't know why, send this to Isaak: \n\n"+ error, QMessageBox.Ok, self.window)
+        error_popup.show()
+        error_popup.raise_()
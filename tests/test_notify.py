@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------
+# Checks which roster names count as already on the notify list.
+#
+#     python -m pytest tests
+#
+# (C) 2019 Isaak Meier
+# Released under MIT License
+# email isaakmeier12@gmail.com
+# -----------------------------------------------------------
+
+import os
+import sys
+import unittest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SOURCE = os.path.normpath(os.path.join(HERE, '..', 'src', 'main', 'python'))
+sys.path.insert(0, SOURCE)
+
+from agilecraft_automation.notify import missing_names
+
+
+class MissingNamesTest(unittest.TestCase):
+
+    def test_partial_label_is_not_a_match(self):
+        self.assertEqual(missing_names(["Al"], ["Alice"]), ["Al"])
+
+    def test_decorated_label_matches_its_name(self):
+        self.assertEqual(missing_names(["Bob Smith"], ["bob  smith <bob.smith@example.com>"]), [])
+
+    def test_name_with_parentheses_needs_its_own_tag(self):
+        self.assertEqual(missing_names(["Bob (QA)"], ["Bob (Dev)"]), ["Bob (QA)"])
+        self.assertEqual(missing_names(["Bob (QA)"], ["Bob (QA)"]), [])
+
+    def test_order_and_duplicates(self):
+        self.assertEqual(missing_names(["Cy", "Al", "Cy"], ["Bo"]), ["Cy", "Al"])
+
+
+if __name__ == '__main__':
+    unittest.main()